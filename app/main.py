@@ -1,38 +1,55 @@
-from flask import Flask, jsonify, render_template, send_from_directory
-from sqlalchemy.orm import Session
+from flask import Flask, jsonify, make_response, render_template, request, send_from_directory, url_for
 from sqlalchemy import func
-from utils.db import SessionLocal
 from utils.models import SelectedQuote, MergedQuote
-from utils.paths import DB_PATH
+from utils.dashboard_artifacts import ASSETS_DIR, build_dashboard_artifacts, current_artifact_key, load_latest_manifest
+from utils.model_registry import HotModel
+from utils.publish import publication_version, snapshot_session
 import os
-import pandas as pd
-import joblib
-import matplotlib.pyplot as plt
-import numpy as np
-import seaborn as sns
-from sklearn.metrics import ConfusionMatrixDisplay, roc_curve, roc_auc_score, classification_report
+import threading
 
 # Define Flask app
 app = Flask(__name__, template_folder=os.path.join(os.path.dirname(__file__), 'templates'),
             static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 
+# Current model, followed without a restart when a new version is promoted
+current_model = HotModel()
+
+# Dashboard plots are content-addressed, so browsers may cache them for a year
+DASHBOARD_ASSET_MAX_AGE = 365 * 24 * 3600
+dashboard_build_lock = threading.Lock()
+
+# Response headers naming the publications a response was built from: the
+# selected_quotes version, and every source table's version ("table=version, ...")
+PUBLICATION_HEADER = "X-Publication-Version"
+SOURCES_HEADER = "X-Publication-Sources"
+
+def with_publication(response, version, sources=None):
+    """Tag a response with its selected_quotes version and, if given, all {table: version} read."""
+    response.headers[PUBLICATION_HEADER] = str(version or 0)
+    sources = sources or {SelectedQuote.__tablename__: version}
+    response.headers[SOURCES_HEADER] = ", ".join(f"{table}={v or 0}" for table, v in sources.items())
+    return response
+
 @app.route("/")
 def home():
     return render_template("home.html")
 
 @app.route("/selected_quotes")
 def selected_quotes_html():
-    db: Session = SessionLocal()
-    try:
+    # Version and rows come from one snapshot, never from a half-published table
+    with snapshot_session() as db:
+        version = publication_version(db, SelectedQuote.__tablename__)
         quotes = db.query(SelectedQuote).all()
-        return render_template("selected_quotes.html", quotes=quotes)
-    finally:
-        db.close()
+        return with_publication(make_response(render_template("selected_quotes.html", quotes=quotes)), version)
 
 @app.route("/api/selected_quotes")
 def selected_quotes_api():
-    db: Session = SessionLocal()
-    try:
+    with snapshot_session() as db:
+        version = publication_version(db, SelectedQuote.__tablename__)
+        # A publication never changes once written, so its version is a strong ETag
+        etag = f"selected_quotes-{version or 0}"
+        if etag in request.if_none_match:
+            return with_publication(make_response("", 304), version)
         quotes = db.query(SelectedQuote).all()
         result = [
             {
@@ -43,6 +60,8 @@ def selected_quotes_api():
                 "quotation_response_id": q.quotation_response_id,
                 "unit_price": q.unit_price,
                 "profit_margin": q.profit_margin,
+                "markup": q.markup,
+                "expected_profit": q.expected_profit,
                 "delivery_days": q.delivery_days,
                 "rfq_sent_at": q.rfq_sent_at.isoformat() if q.rfq_sent_at else None,
                 "supplier_performance_score": q.supplier_performance_score,
@@ -50,14 +69,18 @@ def selected_quotes_api():
             }
             for q in quotes
         ]
-        return jsonify(result)
-    finally:
-        db.close()
+        response = jsonify(result)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return with_publication(response, version)
 
 @app.route("/supplier_performance")
 def supplier_performance():
-    db = SessionLocal()
-    try:
+    with snapshot_session() as db:
+        # Built from both tables, so both versions are reported
+        sources = {table: publication_version(db, table)
+                   for table in (SelectedQuote.__tablename__, MergedQuote.__tablename__)}
+        version = sources[SelectedQuote.__tablename__]
         query = (
             db.query(
                 MergedQuote.supplier_name,
@@ -79,139 +102,56 @@ def supplier_performance():
             }
             for row in query
         ]
-        return render_template("supplier_performance.html", performance=performance)
-    finally:
-        db.close()
+        return with_publication(
+            make_response(render_template("supplier_performance.html", performance=performance)), version, sources)
+
+def refresh_dashboard_async():
+    """Build dashboard artifacts on a background thread, one build at a time."""
+    if not dashboard_build_lock.acquire(blocking=False):
+        return
+
+    def build():
+        try:
+            build_dashboard_artifacts()
+        except Exception as e:
+            print(f"❌ Dashboard build failed: {e}")
+        finally:
+            dashboard_build_lock.release()
+
+    threading.Thread(target=build, daemon=True).start()
 
 @app.route("/model_dashboard")
 def model_dashboard():
-    from sklearn.model_selection import train_test_split
-    from sklearn.calibration import calibration_curve
-
-    # Load model and scaler
-    model = joblib.load("src/models/best_logistic_model.pkl")
-    scaler = joblib.load("src/models/minmax_scaler.pkl")
-
-    # Load and prepare data
-    df = pd.read_sql_query("SELECT * FROM training_quotations", f"sqlite:///{DB_PATH}")
-    X = df.drop(columns=["id", "won"])
-    y = df["won"]
-
-    non_binary_columns = ['unit_price', 'delivery_days', 'performance_score', 'response_time', 'rfq_complexity_score']
-
-    # Split data
-    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
-    X_train_scaled = X_train.copy()
-    X_train_scaled[non_binary_columns] = scaler.transform(X_train[non_binary_columns])
-    X_val_scaled = X_val.copy()
-    X_val_scaled[non_binary_columns] = scaler.transform(X_val[non_binary_columns])
-
-    # Predictions
-    y_train_pred = model.predict(X_train_scaled)
-    y_val_pred = model.predict(X_val_scaled)
-    y_train_proba = model.predict_proba(X_train_scaled)[:, 1]
-    y_val_proba = model.predict_proba(X_val_scaled)[:, 1]
-
-    # Classification reports
-    class_report_train = classification_report(y_train, y_train_pred, output_dict=True)
-    class_report_val = classification_report(y_val, y_val_pred, output_dict=True)
-
-    os.makedirs(app.static_folder, exist_ok=True)
-
-    # Confusion matrices
-    fig, ax = plt.subplots(1, 2, figsize=(12, 5))
-    ConfusionMatrixDisplay.from_predictions(y_train, y_train_pred, ax=ax[0], cmap="Blues", colorbar=False)
-    ax[0].set_title("Confusion Matrix - Train Set")
-    ConfusionMatrixDisplay.from_predictions(y_val, y_val_pred, ax=ax[1], cmap="Greens", colorbar=False)
-    ax[1].set_title("Confusion Matrix - Validation Set")
-    cm_path = os.path.join(app.static_folder, "confusion_matrix.png")
-    plt.tight_layout()
-    plt.savefig(cm_path)
-    plt.close()
-
-    # ROC curve
-    fpr, tpr, _ = roc_curve(y_val, y_val_proba)
-    auc_score = roc_auc_score(y_val, y_val_proba)
-    plt.figure(figsize=(6, 5))
-    plt.plot(fpr, tpr, label=f"AUC = {auc_score:.3f}")
-    plt.plot([0, 1], [0, 1], linestyle='--', color='gray')
-    plt.xlabel("False Positive Rate")
-    plt.ylabel("True Positive Rate")
-    plt.title("ROC Curve (Validation)")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    roc_path = os.path.join(app.static_folder, "roc_curve.png")
-    plt.savefig(roc_path)
-    plt.close()
-
-    # Feature importance
-    coefs = model.coef_[0]
-    features = X.columns
-    coef_df = pd.DataFrame({'Feature': features, 'Coefficient': coefs})
-    coef_df['Abs_Coefficient'] = coef_df['Coefficient'].abs()
-    coef_df.sort_values(by='Abs_Coefficient', ascending=False, inplace=True)
-    feat_imp_path = os.path.join(app.static_folder, "feature_importance.png")
-    plt.figure(figsize=(10, 6))
-    sns.barplot(data=coef_df.head(10), x='Coefficient', y='Feature', palette='coolwarm')
-    plt.title("Top 10 Most Influential Features - Logistic Regression")
-    plt.xlabel("Coefficient Value")
-    plt.ylabel("Feature")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(feat_imp_path)
-    plt.close()
-
-    # Calibration curve
-    true_fraction, predicted_prob = calibration_curve(y_val, y_val_proba, n_bins=10)
-    plt.figure(figsize=(6, 6))
-    plt.plot(predicted_prob, true_fraction, marker='o', label='Model')
-    plt.plot([0, 1], [0, 1], linestyle='--', color='gray', label='Perfect Calibration')
-    plt.xlabel('Predicted Probability')
-    plt.ylabel('Observed Frequency of Positives')
-    plt.title('Calibration Curve - Validation Set')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    calib_path = os.path.join(app.static_folder, "calibration_curve.png")
-    plt.savefig(calib_path)
-    plt.close()
-
-    # Probability distribution histogram
-    proba_df = pd.DataFrame({
-        'Predicted_Probability': y_val_proba,
-        'Actual_Label': y_val
-    })
-    plt.figure(figsize=(10, 6))
-    sns.histplot(
-        data=proba_df,
-        x='Predicted_Probability',
-        hue='Actual_Label',
-        bins=20,
-        kde=False,
-        stat='density',
-        palette='Set2',
-        multiple='stack'
-    )
-    plt.title('Predicted Probability Distribution by Class')
-    plt.xlabel('Predicted Probability (Class = 1)')
-    plt.ylabel('Density')
-    plt.legend(title='True Class', labels=['Negative (0)', 'Positive (1)'])
-    plt.grid(True)
-    plt.tight_layout()
-    proba_hist_path = os.path.join(app.static_folder, "proba_histogram.png")
-    plt.savefig(proba_hist_path)
-    plt.close()
-
-    return render_template("model_dashboard.html",
-        confusion_matrix_image="static/confusion_matrix.png",
-        roc_curve_image="static/roc_curve.png",
-        feature_importance_image="static/feature_importance.png",
-        calibration_curve_image="static/calibration_curve.png",
-        proba_histogram_image="static/proba_histogram.png",
-        class_report_train=class_report_train,
-        class_report_val=class_report_val
-    )
+    # Artifacts are precomputed per (model version, data version); a view only renders them
+    manifest = load_latest_manifest()
+    model_version, _ = current_model.get()
+    # Rebuild when the model or the training data changed since the shown build
+    if manifest is None or manifest["key"] != current_artifact_key(model_version):
+        refresh_dashboard_async()
+    if manifest is None:
+        return render_template("model_dashboard.html", pending=True), 503
+
+    asset = lambda name: url_for("dashboard_asset", filename=manifest["images"][name])
+    response = make_response(render_template("model_dashboard.html",
+        pending=False,
+        confusion_matrix_image=asset("confusion_matrix"),
+        roc_curve_image=asset("roc_curve"),
+        feature_importance_image=asset("feature_importance"),
+        calibration_curve_image=asset("calibration_curve"),
+        proba_histogram_image=asset("proba_histogram"),
+        class_report_train=manifest["class_report_train"],
+        class_report_val=manifest["class_report_val"]
+    ))
+    response.set_etag(manifest["key"])
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+@app.route("/model_dashboard/assets/<path:filename>")
+def dashboard_asset(filename):
+    # Names are content hashes, so a file never changes once published
+    response = send_from_directory(ASSETS_DIR, filename, max_age=DASHBOARD_ASSET_MAX_AGE)
+    response.headers["Cache-Control"] = f"public, max-age={DASHBOARD_ASSET_MAX_AGE}, immutable"
+    return response
 
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+"""
+Local load benchmark for the FastAPI service: sync vs async database sessions.
+
+Starts two uvicorn servers on this machine:
+  * sync  - the client_requests page route on the synchronous SessionLocal/get_db
+            (how every route worked before the async session layer)
+  * async - the real app in utils.main, on AsyncSessionLocal/get_async_db
+then fires the same concurrent request mix at each and reports throughput
+and p50/p99 latency.
+
+Usage (with PYTHONPATH pointing at src/ and a populated database):
+    python benchmarks/api_load.py --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+from fastapi import Depends, FastAPI, Query
+from sqlalchemy.orm import Session
+
+from utils.db import get_db
+from utils.main import client_request_query
+from utils.schemas import StoredClientRequestPage
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+sync_app = FastAPI()
+
+@sync_app.get("/hubspot/client_requests", response_model=StoredClientRequestPage)
+def get_saved_requests_sync(after_id: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000),
+                            db: Session = Depends(get_db)):
+    rows = db.execute(client_request_query(after_id).limit(limit + 1)).mappings().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {"items": rows, "next_cursor": rows[-1]["id"] if has_more else None}
+
+def start_server(app_path, port):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT_DIR / "src"), str(ROOT_DIR / "benchmarks")]))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=env,
+    )
+
+async def wait_until_up(client, url, timeout=20.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            await client.get(url, params={"limit": 1})
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+async def run_load(url, n_requests, concurrency, page_size):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        await wait_until_up(client, url)
+        latencies = []
+        remaining = iter(range(n_requests))
+
+        async def worker():
+            for i in remaining:
+                # Spread requests over the table so they are not all served from the same page
+                params = {"after_id": (i * page_size) % 10000, "limit": page_size}
+                started = time.perf_counter()
+                response = await client.get(url, params=params)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "req_per_sec": n_requests / elapsed,
+        "p50_ms": np.percentile(latencies_ms, 50),
+        "p99_ms": np.percentile(latencies_ms, 99),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async session load benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    variants = [("sync", "api_load:sync_app"), ("async", "utils.main:app")]
+    results = {}
+    for offset, (name, app_path) in enumerate(variants):
+        port = args.port + offset
+        server = start_server(app_path, port)
+        try:
+            url = f"http://127.0.0.1:{port}/hubspot/client_requests"
+            results[name] = asyncio.run(run_load(url, args.requests, args.concurrency, args.page_size))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, page size {args.page_size}")
+    print(f"{'variant':<8} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['req_per_sec']:>10.1f} {r['p50_ms']:>10.2f} {r['p99_ms']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
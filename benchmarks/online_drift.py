@@ -0,0 +1,126 @@
+"""
+Online (incremental) training vs full batch refit as labeled data arrives.
+
+Synthetic quotations (utils.generate_training_dataset) arrive in batches.
+After each batch the online learner (utils.online_training) is updated
+with that batch only, while the batch model is refit from scratch on the
+whole history the way training_lr_model.py does it (undersampled
+majority class, MinMaxScaler, LogisticRegression with fixed params, no
+search). Both are scored on the same held-out set, so the table shows how
+far the online model's F1/AUC drift from the refit and what each update
+costs.
+
+With --drift, feature ranges move over time: prices inflate by that rate
+per batch (labels keep depending on the relative price), so later batches
+fall outside the range the online scaler was fit on during warm-up. The
+held-out set is inflated to the current batch's level at each step.
+
+Runs in memory and does not touch the database or the model registry.
+
+Usage (with PYTHONPATH pointing at src/):
+    python benchmarks/online_drift.py --batches 20 --batch-size 20000
+    python benchmarks/online_drift.py --drift 0.05    # prices inflate 5% per batch
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score, roc_auc_score
+from sklearn.preprocessing import MinMaxScaler
+
+from utils.generate_training_dataset import generate_training_arrays
+from utils.online_training import SCALED_INDICES, OnlineLearner
+from utils.training_data import FEATURE_COLUMNS, LABEL_COLUMN
+
+PRICE_INDEX = FEATURE_COLUMNS.index("unit_price")
+
+# Fixed batch-model params (the usual winner of training_lr_model's search)
+BATCH_PARAMS = {"penalty": "l2", "C": 10, "solver": "lbfgs"}
+
+
+def draw(rows, seed):
+    arrays = generate_training_arrays(rows, seed)
+    X = np.column_stack([arrays[col] for col in FEATURE_COLUMNS]).astype(np.float64)
+    return X, arrays[LABEL_COLUMN].astype(np.int8)
+
+
+def inflate(X, factor):
+    """Copy of X with unit_price multiplied by factor."""
+    X = X.copy()
+    X[:, PRICE_INDEX] *= factor
+    return X
+
+
+def undersample(X, y, rng):
+    """Keep every minority row and as many random majority rows."""
+    counts = np.bincount(y, minlength=2)
+    minority = int(np.argmin(counts))
+    majority_idx = np.flatnonzero(y != minority)
+    keep = np.concatenate([np.flatnonzero(y == minority),
+                           rng.choice(majority_idx, size=counts[minority], replace=False)])
+    return X[keep], y[keep]
+
+
+def batch_refit(X, y, rng):
+    X_train, y_train = undersample(X, y, rng)
+    scaler = MinMaxScaler()
+    X_train = X_train.copy()
+    X_train[:, SCALED_INDICES] = scaler.fit_transform(X_train[:, SCALED_INDICES])
+    model = LogisticRegression(max_iter=1000, random_state=42, **BATCH_PARAMS).fit(X_train, y_train)
+
+    def predict_proba(X_eval):
+        X_scaled = X_eval.copy()
+        X_scaled[:, SCALED_INDICES] = scaler.transform(X_scaled[:, SCALED_INDICES])
+        return model.predict_proba(X_scaled)[:, 1]
+    return predict_proba
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online training vs full batch refit")
+    parser.add_argument("--batches", type=int, default=20, help="arrival batches")
+    parser.add_argument("--batch-size", type=int, default=20_000, help="labeled rows per batch")
+    parser.add_argument("--holdout", type=int, default=100_000, help="held-out evaluation rows")
+    parser.add_argument("--drift", type=float, default=0.0, help="price inflation per batch, e.g. 0.05")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    X_eval, y_eval = draw(args.holdout, args.seed)
+    rng = np.random.default_rng(args.seed)
+    learner = OnlineLearner()
+    X_seen, y_seen = [], []
+
+    print(f"{'batch':>5} {'rows':>9} | {'online F1':>9} {'AUC':>7} {'update s':>8} | "
+          f"{'refit F1':>9} {'AUC':>7} {'refit s':>8} | {'ΔF1':>7} {'ΔAUC':>7}")
+    online_total = refit_total = 0.0
+    for batch in range(1, args.batches + 1):
+        X, y = draw(args.batch_size, args.seed + batch)
+        level = (1 + args.drift) ** (batch - 1)
+        X = inflate(X, level)
+        X_seen.append(X)
+        y_seen.append(y)
+
+        started = time.perf_counter()
+        learner.partial_fit(X, y)
+        online_seconds = time.perf_counter() - started
+        X_now = inflate(X_eval, level)
+        online_probs = learner.predict_proba(X_now)
+
+        started = time.perf_counter()
+        refit_predict = batch_refit(np.concatenate(X_seen), np.concatenate(y_seen), rng)
+        refit_seconds = time.perf_counter() - started
+        refit_probs = refit_predict(X_now)
+
+        online_total += online_seconds
+        refit_total += refit_seconds
+        online_f1, online_auc = f1_score(y_eval, online_probs > 0.5), roc_auc_score(y_eval, online_probs)
+        refit_f1, refit_auc = f1_score(y_eval, refit_probs > 0.5), roc_auc_score(y_eval, refit_probs)
+        print(f"{batch:>5} {learner.rows_seen:>9} | {online_f1:>9.4f} {online_auc:>7.4f} {online_seconds:>8.3f} | "
+              f"{refit_f1:>9.4f} {refit_auc:>7.4f} {refit_seconds:>8.3f} | "
+              f"{online_f1 - refit_f1:>+7.4f} {online_auc - refit_auc:>+7.4f}")
+
+    print(f"Total update time: online {online_total:.2f}s, batch refit {refit_total:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Constrained quote assignment (utils.quote_assignment) vs the greedy rule.
+
+Synthetic client requests each get candidate quotes from random
+suppliers. A quote's score mixes a per-supplier quality (shared by all
+requests, so good suppliers attract many of them) with per-quote noise;
+--skew is the weight of the quality. The greedy pick and the constrained
+solver are timed on the same candidates, with their total score, served
+requests and heaviest supplier load.
+
+Runs in memory and does not touch the database.
+
+Usage (with PYTHONPATH pointing at src/):
+    python benchmarks/quote_assignment.py --requests 50000 --candidates 20 --capacity 150
+    python benchmarks/quote_assignment.py --max-share 0.01 --skew 0.8
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.quote_assignment import assign_quotes
+
+
+def make_candidates(requests, candidates, suppliers, skew, seed):
+    rng = np.random.default_rng(seed)
+    supplier_id = np.stack([rng.choice(suppliers, candidates, replace=False) for _ in range(requests)]).ravel()
+    quality = rng.random(suppliers)
+    return pd.DataFrame({
+        "id": np.arange(requests * candidates),
+        "client_request_id": np.repeat(np.arange(requests), candidates),
+        "supplier_id": supplier_id,
+        "final_score": skew * quality[supplier_id] + (1 - skew) * rng.random(requests * candidates),
+    })
+
+
+def report(name, chosen, seconds):
+    load = chosen["supplier_id"].value_counts()
+    print(f"{name:<12} {seconds:>8.2f} {len(chosen):>9,} {chosen['final_score'].sum():>12.1f} "
+          f"{load.max():>9} {load.max() / max(len(chosen), 1):>9.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Constrained quote assignment vs greedy")
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--candidates", type=int, default=20, help="quotes per request")
+    parser.add_argument("--suppliers", type=int, default=500)
+    parser.add_argument("--capacity", type=int, default=None, help="max requests per supplier")
+    parser.add_argument("--max-share", type=float, default=None, help="max share of requests per supplier")
+    parser.add_argument("--skew", type=float, default=0.5, help="weight of supplier quality in the score")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    candidates = make_candidates(args.requests, args.candidates, args.suppliers, args.skew, args.seed)
+    capacity = None if args.capacity is None else dict.fromkeys(range(args.suppliers), args.capacity)
+
+    print(f"{args.requests:,} requests x {args.candidates} quotes, {args.suppliers} suppliers, "
+          f"capacity {args.capacity}, max share {args.max_share}, skew {args.skew}")
+    print(f"{'rule':<12} {'seconds':>8} {'served':>9} {'score':>12} {'max load':>9} {'max share':>9}")
+    started = time.perf_counter()
+    greedy = assign_quotes(candidates)
+    report("greedy", greedy, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    constrained = assign_quotes(candidates, capacity, args.max_share)
+    report("constrained", constrained, time.perf_counter() - started)
@@ -0,0 +1,157 @@
+"""
+Open-loop load test for the online scoring service (utils.scoring_service).
+
+Starts the service under uvicorn (pinned to one CPU core where the OS
+allows it), sends single-quote /score requests at a fixed arrival rate and
+reports achieved throughput, p50/p99 latency, the mean micro-batch size
+and the server's CPU time per request. Latency is measured from each
+request's scheduled send time, so a server that falls behind shows up in
+the tail instead of being hidden. On a single-core machine the load
+generator shares the server's core, which inflates the tail.
+
+Usage (with PYTHONPATH pointing at src/ and a trained model in src/models):
+    python benchmarks/scoring_load.py --rate 1000 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import psutil
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+def start_server(port, cpu):
+    env = dict(os.environ, PYTHONPATH=str(ROOT_DIR / "src"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "utils.scoring_service:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=env,
+    )
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(server.pid, {cpu})
+        # Keep the load generator off the server's core
+        others = os.sched_getaffinity(0) - {cpu}
+        if others:
+            os.sched_setaffinity(0, others)
+    return server
+
+def random_quote(rng):
+    return {
+        "unit_price": round(float(rng.uniform(8, 16)), 2),
+        "delivery_days": int(rng.integers(3, 12)),
+        "performance_score": round(float(rng.uniform(0, 5)), 2),
+        "response_time": round(float(rng.uniform(0, 72)), 2),
+        "rfq_complexity_score": round(float(rng.uniform(1.7, 4.3)), 2),
+        "is_urgent": bool(rng.random() < 0.15),
+        "is_custom": bool(rng.random() < 0.2),
+    }
+
+async def post_json(reader, writer, path, body):
+    """One keep-alive HTTP/1.1 POST; returns (status, body bytes)."""
+    payload = json.dumps(body).encode()
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+    )
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = int(re.search(rb"(?i)content-length:\s*(\d+)", head).group(1))
+    return status, await reader.readexactly(length)
+
+async def connect(port):
+    for _ in range(100):
+        try:
+            return await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"scoring service did not come up on port {port}")
+
+async def run_load(port, rate, duration, connections, server_pid=None):
+    """
+    Open-loop load: request i is due at i / rate. Requests are spread
+    round-robin over keep-alive connections; a connection still waiting on an
+    earlier response sends late, and that delay counts towards latency.
+    """
+    rng = np.random.default_rng(0)
+    n_requests = int(rate * duration)
+    quotes = [random_quote(rng) for _ in range(n_requests)]
+    latencies = np.full(n_requests, np.nan)
+    errors = 0
+
+    streams = [await connect(port) for _ in range(connections)]
+    await post_json(*streams[0], "/score", quotes[0])  # warm-up
+
+    async def worker(reader, writer, positions, started):
+        nonlocal errors
+        for i in positions:
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            status, _ = await post_json(reader, writer, "/score", quotes[i])
+            if status == 200:
+                latencies[i] = time.perf_counter() - (started + i / rate)
+            else:
+                errors += 1
+
+    server = psutil.Process(server_pid) if server_pid else None
+    cpu_before = sum(server.cpu_times()[:2]) if server else None
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        worker(reader, writer, range(c, n_requests, connections), started)
+        for c, (reader, writer) in enumerate(streams)
+    ))
+    elapsed = time.perf_counter() - started
+    server_cpu = sum(server.cpu_times()[:2]) - cpu_before if server else float("nan")
+
+    writer = streams[0][1]
+    writer.write(b"GET /score/stats HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    head = await streams[0][0].readuntil(b"\r\n\r\n")
+    length = int(re.search(rb"(?i)content-length:\s*(\d+)", head).group(1))
+    stats = json.loads(await streams[0][0].readexactly(length))
+    for _, writer in streams:
+        writer.close()
+
+    latencies_ms = latencies[~np.isnan(latencies)] * 1000
+    return {
+        "sent": n_requests,
+        "errors": errors,
+        "achieved_rps": len(latencies_ms) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "mean_batch_size": stats["mean_batch_size"],
+        "server_cpu_ms_per_request": server_cpu * 1000 / n_requests,
+        "server_cpu_share": server_cpu / elapsed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring service load test")
+    parser.add_argument("--rate", type=float, default=1000, help="requests per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--connections", type=int, default=64, help="keep-alive client connections")
+    parser.add_argument("--cpu", type=int, default=0, help="core to pin the server to (-1 to disable)")
+    args = parser.parse_args()
+
+    server = start_server(args.port, None if args.cpu < 0 else args.cpu)
+    try:
+        result = asyncio.run(run_load(args.port, args.rate, args.duration, args.connections, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{result['sent']} requests at {args.rate:.0f} req/s target, {result['errors']} errors")
+    print(f"achieved {result['achieved_rps']:.1f} req/s, p50 {result['p50_ms']:.2f} ms, "
+          f"p99 {result['p99_ms']:.2f} ms, mean batch {result['mean_batch_size']}")
+    print(f"server CPU {result['server_cpu_ms_per_request']:.3f} ms/request "
+          f"({result['server_cpu_share']:.0%} of a core), {os.cpu_count()} CPU(s) shared with the load generator"
+          if os.cpu_count() == 1 else
+          f"server CPU {result['server_cpu_ms_per_request']:.3f} ms/request ({result['server_cpu_share']:.0%} of a core)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import json
+import os
+import httpx
+from utils.consumer import save_to_db
+from utils.paths import CONSUMER_CHECKPOINT_PATH
+
+CRM_PAGE_URL = "http://localhost:8000/hubspot/simulate_requests/page"
+PAGE_SIZE = 500
+MAX_IN_FLIGHT = 4      # concurrent page requests
+QUEUE_SIZE = 8         # fetched pages buffered before fetchers wait on the writer
+POLL_INTERVAL = 30     # seconds to wait before polling again at the end of the feed
+MAX_RETRIES = 3
+
+def load_checkpoint(path=CONSUMER_CHECKPOINT_PATH):
+    """Return the feed cursor to resume from (0 when no checkpoint exists)."""
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return json.load(f)["cursor"]
+
+def save_checkpoint(cursor, path=CONSUMER_CHECKPOINT_PATH):
+    """Atomically persist the cursor up to which every page has been saved."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"cursor": cursor}, f)
+    os.replace(tmp_path, path)
+
+class CRMConsumer:
+    """
+    Pulls pages of the CRM feed concurrently and saves them with a single writer.
+
+    Fetchers claim page cursors in order and push pages onto a bounded queue,
+    so they stop issuing requests while the database writer is behind. Pages
+    can be saved out of order; the checkpoint only advances over a contiguous
+    run of saved pages, and save_to_db dedupes whatever is re-read on restart.
+    A fetch or save that fails stops the whole drain with its error.
+    """
+
+    def __init__(self, url=CRM_PAGE_URL, page_size=PAGE_SIZE, max_in_flight=MAX_IN_FLIGHT,
+                 queue_size=QUEUE_SIZE, checkpoint_path=CONSUMER_CHECKPOINT_PATH):
+        self.url = url
+        self.page_size = page_size
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.checkpoint_path = checkpoint_path
+        self.totals = {"pages": 0, "inserted": 0, "skipped": 0, "invalid": 0}
+
+    async def fetch_page(self, client, cursor):
+        for attempt in range(1, MAX_RETRIES + 1):
+            try:
+                response = await client.get(self.url, params={"cursor": cursor, "limit": self.page_size})
+                response.raise_for_status()
+                return response.json()
+            except httpx.HTTPError as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                print(f"Fetching cursor {cursor} failed ({e}), retrying...")
+                await asyncio.sleep(2 ** attempt)
+
+    async def drain(self, client, max_pages=None):
+        """Consume the feed from the checkpoint until its end (or max_pages pages)."""
+        start = load_checkpoint(self.checkpoint_path)
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        state = {"next_cursor": start, "claimed": 0, "end": None}
+
+        async def fetcher():
+            while True:
+                if state["end"] is not None and state["next_cursor"] >= state["end"]:
+                    return
+                if max_pages is not None and state["claimed"] >= max_pages:
+                    return
+                cursor = state["next_cursor"]
+                state["next_cursor"] += self.page_size
+                state["claimed"] += 1
+
+                page = await self.fetch_page(client, cursor)
+                if page["next_cursor"] is None:
+                    end = cursor + len(page["items"])
+                    state["end"] = end if state["end"] is None else min(state["end"], end)
+                if page["items"]:
+                    await queue.put((cursor, page["items"]))
+
+        async def writer():
+            checkpoint = start
+            saved = {}
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return checkpoint
+                cursor, items = item
+                stats = await asyncio.to_thread(save_to_db, items)
+                for key in ("inserted", "skipped", "invalid"):
+                    self.totals[key] += stats[key]
+                self.totals["pages"] += 1
+
+                saved[cursor] = cursor + len(items)
+                while checkpoint in saved:
+                    checkpoint = saved.pop(checkpoint)
+                save_checkpoint(checkpoint, self.checkpoint_path)
+                print(f"Page @{cursor}: {stats['inserted']} inserted, {stats['skipped']} skipped, "
+                      f"{stats['invalid']} invalid ({stats['rows_per_sec']:.0f} rows/sec)")
+
+        # A failed fetch or save cancels the other tasks, so no fetcher is
+        # left waiting on a queue that nobody drains
+        try:
+            async with asyncio.TaskGroup() as tasks:
+                writer_task = tasks.create_task(writer())
+                await asyncio.wait([tasks.create_task(fetcher()) for _ in range(self.max_in_flight)])
+                await queue.put(None)
+        except ExceptionGroup as group:
+            raise group.exceptions[0]
+        return writer_task.result(), state["end"] is not None
+
+    async def run(self, once=False, max_pages=None, poll_interval=POLL_INTERVAL):
+        """Run until the end of the feed (once=True) or forever, polling for new entries."""
+        limits = httpx.Limits(max_connections=self.max_in_flight,
+                              max_keepalive_connections=self.max_in_flight)
+        async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+            while True:
+                checkpoint, at_end = await self.drain(client, max_pages=max_pages)
+                if once or max_pages is not None:
+                    return checkpoint
+                if at_end:
+                    await asyncio.sleep(poll_interval)
+
+def print_totals(totals, checkpoint):
+    print(f"{totals['pages']} CRM pages consumed: {totals['inserted']} inserted, {totals['skipped']} skipped, "
+          f"{totals['invalid']} invalid. Checkpoint at cursor {checkpoint}.")
+
+def consume_crm_feed(max_pages=None, page_size=PAGE_SIZE, max_in_flight=MAX_IN_FLIGHT):
+    """Consume the feed from the checkpoint to its end (or max_pages pages), blocking until done."""
+    consumer = CRMConsumer(page_size=page_size, max_in_flight=max_in_flight)
+    checkpoint = asyncio.run(consumer.run(once=True, max_pages=max_pages))
+    print_totals(consumer.totals, checkpoint)
+    return consumer.totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Async CRM consumer")
+    parser.add_argument("--once", action="store_true", help="stop at the end of the feed instead of polling")
+    parser.add_argument("--max-pages", type=int, default=None, help="stop after this many pages")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT)
+    parser.add_argument("--reset", action="store_true", help="ignore the checkpoint and start from the beginning")
+    args = parser.parse_args()
+
+    if args.reset:
+        save_checkpoint(0)
+
+    consumer = CRMConsumer(page_size=args.page_size, max_in_flight=args.max_in_flight)
+    checkpoint = asyncio.run(consumer.run(once=args.once, max_pages=args.max_pages))
+    print_totals(consumer.totals, checkpoint)
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,70 @@
-import random
-import datetime
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from utils.models import Supplier, RFQSent, QuotationResponse, RealQuotationData  
 from utils.db import SessionLocal
 
-def calculate_rfq_complexity(product_type: str, quantity: int) -> float:
-    """Calculate complexity score based on product type and quantity."""
-    base = 1.0 if quantity < 50 else 2.0 if quantity < 200 else 3.0
-    if "custom" in product_type.lower():
-        base += 1.0
-    return round(base + random.uniform(-0.3, 0.3), 2)
+# Compiles every quotation response not compiled yet, inside SQLite.
+# Feature rules:
+#   response_time        hours between RFQ sent_at and response received_at
+#   rfq_complexity_score 1/2/3 by quantity (<50, <200, else), +1 for custom products,
+#                        plus uniform(-0.3, 0.3) noise (random() spans the signed 64-bit range)
+#   is_urgent            response deadline within 2 whole days of sent_at
+#   won                  left NULL until the quote is scored
+COMPILE_SQL = text("""
+INSERT INTO real_quotation_data (
+    quotation_response_id, unit_price, delivery_days, performance_score,
+    response_time, rfq_complexity_score, is_urgent, is_custom, won
+)
+SELECT
+    qr.id,
+    qr.unit_price,
+    qr.delivery_days,
+    s.performance_score,
+    round((julianday(qr.received_at) - julianday(r.sent_at)) * 24.0, 2),
+    round(
+        CASE WHEN cr.quantity < 50 THEN 1.0 WHEN cr.quantity < 200 THEN 2.0 ELSE 3.0 END
+        + CASE WHEN instr(lower(cr.product_type), 'custom') > 0 THEN 1.0 ELSE 0.0 END
+        + random() / 9223372036854775808.0 * 0.3,
+        2
+    ),
+    julianday(d.response_deadline) - julianday(r.sent_at) < 3,
+    coalesce(cr.is_custom, 0),
+    NULL
+FROM quotation_responses qr
+JOIN rfqs_sent r ON r.id = qr.rfq_id
+JOIN rfq_details d ON d.rfq_id = r.id
+JOIN suppliers s ON s.id = r.supplier_id
+JOIN client_requests cr ON cr.id = r.client_request_id
+WHERE NOT EXISTS (SELECT 1 FROM real_quotation_data done WHERE done.quotation_response_id = qr.id)
+ORDER BY qr.id
+""")
 
-def is_urgent(deadline: datetime.datetime, sent_at: datetime.datetime) -> bool:
-    """Determine if RFQ is urgent based on deadline proximity."""
-    return (deadline - sent_at).days <= 2
+# Rows compiled before real_quotation_data had a quotation_response_id. No
+# query can join them back to their response, and their responses are
+# compiled anew with an id, so they are dropped rather than kept as duplicates
+DROP_LEGACY_SQL = text("DELETE FROM real_quotation_data WHERE quotation_response_id IS NULL")
 
 def compile_test_dataset(db: Session):
-    rfqs = db.query(RFQSent).all()
-    count = 0
-
-    for rfq in rfqs:
-        # Skip if essential linked data is missing
-        if not rfq.quotation_response or not rfq.rfq_details:
-            continue
-
-        quote = rfq.quotation_response
-        supplier = rfq.supplier
-        details = rfq.rfq_details
-
-        response_time = (quote.received_at - rfq.sent_at).total_seconds() / 3600.0  # in hours
-        perf_score = supplier.performance_score
-        complexity = calculate_rfq_complexity(
-            rfq.client_request.product_type,
-            rfq.client_request.quantity
-        )
-        urgent = is_urgent(details.response_deadline, rfq.sent_at)
-        is_custom = bool(rfq.client_request.is_custom)
-
-
-        # Prepare TrainingQuotation object but DO NOT set 'won' field
-        training_entry = RealQuotationData(
-            unit_price=quote.unit_price,
-            delivery_days=quote.delivery_days,
-            performance_score=perf_score,
-            response_time=round(response_time, 2),
-            rfq_complexity_score=complexity,
-            is_urgent=urgent,
-            is_custom=is_custom,
-            won=None  # or just omit this field if your model allows nullable
-        )
-
-        db.add(training_entry)
-        count += 1
-
+    """
+    Append the responses not compiled yet to real_quotation_data with a single
+    INSERT ... SELECT. Compiled responses are excluded with an anti-join on the
+    unique quotation_response_id index rather than a max-id watermark, so a
+    response whose RFQ details arrive after newer responses were compiled is
+    still picked up by the next run. Legacy rows without a response id are
+    replaced in the same transaction.
+    """
+    dropped = db.execute(DROP_LEGACY_SQL).rowcount
+    result = db.execute(COMPILE_SQL)
     db.commit()
-    print(f"{count} x 8 dataset compiled.")
+    if dropped:
+        print(f"{dropped} legacy rows without a quotation_response_id replaced.")
+    print(f"{result.rowcount} x 8 dataset compiled.")
 
-if __name__ == "__main__":
+def compile_real_quotation_data():
     db = SessionLocal()
-    compile_test_dataset(db)
-    db.close()
+    try:
+        compile_test_dataset(db)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    compile_real_quotation_data()
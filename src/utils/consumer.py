@@ -1,57 +1,104 @@
+import time
 import requests
-import random
-from datetime import datetime
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
 from utils.db import SessionLocal
 from utils.models import ClientRequest
 
+# Rows written per executemany/transaction
+CHUNK_SIZE = 5000
+# Bound on bind parameters per IN (...) lookup (SQLite's historic limit is 999)
+LOOKUP_CHUNK_SIZE = 900
+
 def fetch_crm_data():
     """Fetch simulated CRM requests from the local API endpoint."""
     response = requests.get("http://localhost:8000/hubspot/simulate_requests")
     return response.json()
 
-def save_to_db(data):
-    """Insert CRM data into the database, avoiding duplicate entries per customer."""
+def parse_crm_batch(data):
+    """
+    Validate a batch of CRM entries in one vectorized pass.
+
+    Returns a DataFrame with the client_requests columns for the valid
+    entries and the number of entries rejected for a missing customer_id,
+    a missing/invalid delivery_deadline or a quantity that is not a whole
+    number, e.g. "2.5" (a missing quantity counts as 0).
+    """
+    columns = ["customer_id", "product_type", "quantity", "delivery_deadline",
+               "specifications", "color_spec"]
+    df = pd.DataFrame.from_records(data).reindex(columns=columns)
+
+    deadline = pd.to_datetime(df["delivery_deadline"], format="%Y-%m-%d", errors="coerce")
+    has_customer = df["customer_id"].notna() & (df["customer_id"].astype(str) != "")
+    quantity = pd.to_numeric(df["quantity"], errors="coerce")
+    bad_quantity = df["quantity"].notna() & (quantity.isna() | (quantity % 1 != 0))
+    valid = deadline.notna() & has_customer & ~bad_quantity
+
+    df = df[valid].copy()
+    df["deadline"] = deadline[valid].astype(object)
+    df["product_type"] = df["product_type"].fillna("unknown")
+    df["quantity"] = quantity[valid].fillna(0).astype(int)
+    df["specifications"] = df["specifications"].fillna("")
+    df["color_spec"] = df["color_spec"].fillna("")
+    df["is_custom"] = np.random.random(len(df)) < 0.2
+
+    df = df.drop(columns=["delivery_deadline"])
+    return df, int((~valid).sum())
+
+def find_existing_customers(db, customer_ids):
+    """Return the subset of customer_ids that already have a client request."""
+    existing = set()
+    for start in range(0, len(customer_ids), LOOKUP_CHUNK_SIZE):
+        chunk = customer_ids[start:start + LOOKUP_CHUNK_SIZE]
+        existing.update(db.scalars(
+            select(ClientRequest.customer_id).where(ClientRequest.customer_id.in_(chunk))
+        ))
+    return existing
+
+def save_to_db(data, chunk_size=CHUNK_SIZE):
+    """
+    Bulk insert CRM data into the database, avoiding duplicate entries per customer.
+
+    Entries are deduplicated within the batch and against the database with a
+    set-based lookup, then written in chunked executemany transactions.
+    Returns a dict with inserted/skipped/invalid counts and the throughput.
+    """
+    started = time.perf_counter()
+    df, invalid = parse_crm_batch(data)
+
+    # Keep the first entry per customer, then drop customers already stored
+    batch_size = len(df)
+    df = df.drop_duplicates(subset="customer_id", keep="first")
+
     db = SessionLocal()
-    for entry in data:
-
-        deadline_str = entry.get("delivery_deadline")
-        if not deadline_str:
-            print("Skipping entry without delivery_deadline.")
-            continue
-
-        try:
-            deadline_date = datetime.strptime(deadline_str, "%Y-%m-%d").date()
-        except ValueError:
-            print(f"Skipping entry with invalid deadline format: {deadline_str}")
-            continue
-
-        customer_id = entry.get("customer_id")
-        if not customer_id:
-            print("Skipping entry without customer_id.")
-            continue
-        
-        is_custom = random.random() < 0.2
-
-        # Avoid duplicate entries for the same customer
-        existing = db.query(ClientRequest).filter_by(customer_id=customer_id).first()
-        if not existing:
-            new_request = ClientRequest(
-                product_type=entry.get("product_type", "unknown"),
-                quantity=entry.get("quantity", 0),
-                deadline=deadline_date,
-                specifications=entry.get("specifications", ""),
-                color_spec=entry.get("color_spec", ""),
-                is_custom=is_custom,
-                customer_id=customer_id
-            )
-            db.add(new_request)
-
-    db.commit()
-    db.close()
+    try:
+        existing = find_existing_customers(db, df["customer_id"].tolist())
+        df = df[~df["customer_id"].isin(existing)]
 
-if __name__ == "__main__":
-    data = fetch_crm_data()
-    save_to_db(data)
-    print(f"{len(data)} CRM entries processed and saved.")
+        records = df.to_dict("records")
+        stmt = insert(ClientRequest.__table__).on_conflict_do_nothing()
+        inserted = 0
+        for start in range(0, len(records), chunk_size):
+            result = db.connection().execute(stmt, records[start:start + chunk_size])
+            db.commit()
+            inserted += max(result.rowcount, 0)
+    finally:
+        db.close()
 
+    elapsed = time.perf_counter() - started
+    return {
+        "inserted": inserted,
+        "skipped": batch_size - inserted,
+        "invalid": invalid,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(len(data) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
 
+if __name__ == "__main__":
+    data = fetch_crm_data()
+    stats = save_to_db(data)
+    print(f"{len(data)} CRM entries processed: {stats['inserted']} inserted, "
+          f"{stats['skipped']} skipped, {stats['invalid']} invalid "
+          f"({stats['rows_per_sec']:.0f} rows/sec).")
@@ -0,0 +1,210 @@
+"""
+Precomputed model dashboard artifacts.
+
+The dashboard plots and classification reports depend only on the model
+version and the training data, so they are built once per (model version,
+data version) pair instead of on every page view. Plots are saved under
+content-addressed names (SHA-256 of the PNG) in DASHBOARD_DIR/assets, and
+each pair gets a JSON manifest naming its plots and holding its reports.
+The LATEST pointer names the manifest the dashboard should show; all files
+are written atomically, so a viewer never sees a half-written build.
+
+Metrics come from the streaming evaluator (utils.streaming_eval), so the
+training table is never loaded into memory.
+
+    python src/utils/dashboard_artifacts.py           # build if stale
+    python src/utils/dashboard_artifacts.py --force   # rebuild anyway
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.db import engine
+from utils.model_registry import HotModel
+from utils.paths import DASHBOARD_DIR
+from utils.stage_manifest import table_fingerprint
+from utils.streaming_eval import evaluate_training_data
+
+DASHBOARD_DIR = Path(DASHBOARD_DIR)
+ASSETS_DIR = DASHBOARD_DIR / "assets"
+LATEST_POINTER = DASHBOARD_DIR / "LATEST"
+
+DATA_TABLE = "training_quotations"
+
+MODEL_TITLES = {"lightgbm": "LightGBM", "xgboost": "XGBoost"}
+
+
+def write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def data_version(conn):
+    """Short hash of the training table fingerprint (row count, max rowid, checksum)."""
+    payload = json.dumps(table_fingerprint(conn, DATA_TABLE)).encode()
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def artifact_key(model_version, data_version):
+    return hashlib.sha256(f"{model_version}:{data_version}".encode()).hexdigest()[:16]
+
+
+def current_artifact_key(model_version):
+    """Artifact key of model_version with the training data as it is now."""
+    with engine.connect() as conn:
+        return artifact_key(model_version, data_version(conn))
+
+
+def save_figure(fig):
+    """Save a figure under the hash of its PNG bytes; returns the asset file name."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    data = buffer.getvalue()
+    name = f"{hashlib.sha256(data).hexdigest()[:16]}.png"
+    if not (ASSETS_DIR / name).exists():
+        write_atomic(ASSETS_DIR / name, data)
+    return name
+
+
+def render_dashboard(predictor):
+    """
+    Evaluate the model on the train/validation hash split of the training
+    data with the streaming evaluator and render the five dashboard plots.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from sklearn.metrics import ConfusionMatrixDisplay
+
+    train = evaluate_training_data(predictor, split="train")
+    val = evaluate_training_data(predictor, split="validation")
+
+    images = {}
+
+    # Confusion matrices
+    fig, ax = plt.subplots(1, 2, figsize=(12, 5))
+    ConfusionMatrixDisplay(train.confusion_matrix(), display_labels=[0, 1]).plot(
+        ax=ax[0], cmap="Blues", colorbar=False)
+    ax[0].set_title("Confusion Matrix - Train Set")
+    ConfusionMatrixDisplay(val.confusion_matrix(), display_labels=[0, 1]).plot(
+        ax=ax[1], cmap="Greens", colorbar=False)
+    ax[1].set_title("Confusion Matrix - Validation Set")
+    fig.tight_layout()
+    images["confusion_matrix"] = save_figure(fig)
+    plt.close(fig)
+
+    # ROC curve
+    fpr, tpr, _ = val.roc_curve()
+    fig, ax = plt.subplots(figsize=(6, 5))
+    ax.plot(fpr, tpr, label=f"AUC = {val.auc():.3f}")
+    ax.plot([0, 1], [0, 1], linestyle='--', color='gray')
+    ax.set_xlabel("False Positive Rate")
+    ax.set_ylabel("True Positive Rate")
+    ax.set_title("ROC Curve (Validation)")
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+    images["roc_curve"] = save_figure(fig)
+    plt.close(fig)
+
+    # Feature importance: coefficients of the linear model, split gain of tree models
+    is_linear = predictor.kind == "linear"
+    coef_df = pd.DataFrame({'Feature': predictor.feature_names, 'Coefficient': predictor.feature_importance})
+    coef_df['Abs_Coefficient'] = coef_df['Coefficient'].abs()
+    coef_df.sort_values(by='Abs_Coefficient', ascending=False, inplace=True)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.barplot(data=coef_df.head(10), x='Coefficient', y='Feature', hue='Feature',
+                palette='coolwarm', legend=False, ax=ax)
+    ax.set_title("Top 10 Most Influential Features - "
+                 + ("Logistic Regression" if is_linear else MODEL_TITLES.get(predictor.kind, predictor.kind)))
+    ax.set_xlabel("Coefficient Value" if is_linear else "Total Split Gain")
+    ax.set_ylabel("Feature")
+    ax.grid(True)
+    fig.tight_layout()
+    images["feature_importance"] = save_figure(fig)
+    plt.close(fig)
+
+    # Calibration curve
+    true_fraction, predicted_prob = val.calibration_curve(n_bins=10)
+    fig, ax = plt.subplots(figsize=(6, 6))
+    ax.plot(predicted_prob, true_fraction, marker='o', label='Model')
+    ax.plot([0, 1], [0, 1], linestyle='--', color='gray', label='Perfect Calibration')
+    ax.set_xlabel('Predicted Probability')
+    ax.set_ylabel('Observed Frequency of Positives')
+    ax.set_title('Calibration Curve - Validation Set')
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+    images["calibration_curve"] = save_figure(fig)
+    plt.close(fig)
+
+    # Probability distribution histogram (stacked densities, normalized over both classes)
+    edges, negatives, positives, _ = val.score_histogram(n_bins=20)
+    width = np.diff(edges)
+    density = 1.0 / (max(val.n_labeled, 1) * width)
+    colors = sns.color_palette('Set2', 2)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.bar(edges[:-1], negatives * density, width=width, align='edge', color=colors[0],
+           edgecolor='black', alpha=0.75, label='Negative (0)')
+    ax.bar(edges[:-1], positives * density, width=width, align='edge', bottom=negatives * density,
+           color=colors[1], edgecolor='black', alpha=0.75, label='Positive (1)')
+    ax.set_title('Predicted Probability Distribution by Class')
+    ax.set_xlabel('Predicted Probability (Class = 1)')
+    ax.set_ylabel('Density')
+    ax.legend(title='True Class')
+    ax.grid(True)
+    fig.tight_layout()
+    images["proba_histogram"] = save_figure(fig)
+    plt.close(fig)
+
+    return {
+        "images": images,
+        "class_report_train": train.classification_report(),
+        "class_report_val": val.classification_report(),
+    }
+
+
+def build_dashboard_artifacts(force=False):
+    """
+    Make LATEST point at the artifacts of the current model and training data,
+    rendering them only if that pair has not been built before. Returns the
+    artifact key.
+    """
+    model_version, predictor = HotModel().get()
+    if predictor is None:
+        raise FileNotFoundError("No trained model: run training_lr_model.py first")
+
+    key = current_artifact_key(model_version)
+    manifest_path = DASHBOARD_DIR / f"{key}.json"
+    if force or not manifest_path.exists():
+        manifest = {"key": key, "model_version": model_version, **render_dashboard(predictor)}
+        write_atomic(manifest_path, json.dumps(manifest, indent=2).encode())
+        print(f"✅ Dashboard artifacts built for model {model_version} ({key})")
+
+    write_atomic(LATEST_POINTER, key.encode())
+    return key
+
+
+def load_latest_manifest():
+    """Manifest the LATEST pointer names, or None before the first build."""
+    try:
+        key = LATEST_POINTER.read_text().strip()
+        with open(DASHBOARD_DIR / f"{key}.json") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the model dashboard artifacts")
+    parser.add_argument("--force", action="store_true", help="rebuild even if up to date")
+    build_dashboard_artifacts(force=parser.parse_args().force)
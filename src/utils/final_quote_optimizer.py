@@ -1,71 +1,131 @@
-from sqlalchemy.orm import Session
-from utils.db import SessionLocal
-from utils.models import (
-    ClientRequest, Supplier, RFQSent,
-    QuotationResponse, QuoteScore, MergedQuote
-)
+import argparse
+
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
+from utils.db import engine
+from utils.models import MergedQuote
+from utils.publish import record_publication
+
+# How merged_quotes is maintained:
+#   "incremental" a table; each run appends only the scored quotes it does not hold yet
+#                 with one INSERT ... SELECT (unique key on quotation_response_id)
+#   "view"        a SQL view over the joined tables, always current, nothing to refresh
+MERGE_MODES = ("incremental", "view")
+MERGE_MODE = "incremental"
+
+TABLE = MergedQuote.__tablename__
+
+# One row per scored quotation response. Driven by quote_scores and joined on
+# primary keys / unique indexes.
+MERGED_COLUMNS = """
+    cr.id AS client_request_id,
+    CAST(cr.customer_id AS TEXT) AS customer_id,
+    s.id AS supplier_id,
+    s.name AS supplier_name,
+    s.performance_score AS supplier_performance_score,
+    qr.id AS quotation_response_id,
+    qr.unit_price,
+    qr.delivery_days,
+    r.sent_at AS rfq_sent_at,
+    qs.won AS ml_score,
+    qs.performance_score AS heuristic_score"""
+
+MERGED_FROM = """
+FROM quote_scores qs
+JOIN quotation_responses qr ON qr.id = qs.id
+JOIN rfqs_sent r ON r.id = qr.rfq_id
+JOIN suppliers s ON s.id = r.supplier_id
+JOIN client_requests cr ON cr.id = r.client_request_id"""
+
+TARGET_COLUMNS = ("client_request_id, customer_id, supplier_id, supplier_name, supplier_performance_score, "
+                  "quotation_response_id, unit_price, delivery_days, rfq_sent_at, ml_score, heuristic_score")
+
+# Scored quotes missing from merged_quotes, whatever their id: an anti-join on the
+# unique quotation_response_id index, so a quote scored late (below ids already
+# merged) is still picked up. The unique key makes a concurrent rerun a no-op.
+INCREMENTAL_SQL = text(f"""
+INSERT INTO {TABLE} ({TARGET_COLUMNS})
+SELECT {MERGED_COLUMNS}
+{MERGED_FROM}
+WHERE NOT EXISTS (SELECT 1 FROM {TABLE} m WHERE m.quotation_response_id = qs.id)
+ORDER BY qs.id
+ON CONFLICT(quotation_response_id) DO NOTHING
+""")
+
+# The view exposes the quotation response id as id, matching the MergedQuote model
+VIEW_SQL = f"CREATE VIEW {TABLE} AS SELECT qs.id AS id,{MERGED_COLUMNS}{MERGED_FROM}"
+
+
+def merged_quotes_kind(conn):
+    """"table", "view" or None, as recorded in sqlite_master."""
+    return conn.exec_driver_sql(
+        "SELECT type FROM sqlite_master WHERE name = ? AND type IN ('table', 'view')", (TABLE,)
+    ).scalar()
 
-def build_merged_quotes_table():
-    db: Session = SessionLocal()
+
+def ensure_table(conn):
+    """Replace a merged_quotes view with the table; make sure the unique key exists."""
+    if merged_quotes_kind(conn) == "view":
+        conn.exec_driver_sql(f"DROP VIEW {TABLE}")
+    MergedQuote.__table__.create(conn, checkfirst=True)
+    # Tables built before the key was added get it here (as in init_db)
+    for index in MergedQuote.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def ensure_view(conn):
+    """Replace a merged_quotes table (or an outdated view) with the current view definition."""
+    kind = merged_quotes_kind(conn)
+    if kind == "table":
+        conn.exec_driver_sql(f"DROP TABLE {TABLE}")
+    elif kind == "view":
+        current_sql = conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?", (TABLE,)).scalar()
+        if current_sql == VIEW_SQL:
+            return
+        conn.exec_driver_sql(f"DROP VIEW {TABLE}")
+    conn.exec_driver_sql(VIEW_SQL)
+
+
+def build_merged_quotes_table(mode=MERGE_MODE, rebuild=False):
+    """
+    Bring merged_quotes up to date inside SQLite; no rows pass through Python.
+
+    In "incremental" mode the scored quotes not merged yet are appended in a
+    single INSERT ... SELECT transaction, at the cost of one index probe per
+    scored quote plus the new rows; the same transaction records a new
+    publication version.
+    rebuild empties the table first (same transaction, so readers still see
+    the old rows until it commits), e.g. to pick up renamed suppliers. In
+    "view" mode merged_quotes is a view and only its definition is
+    (re)created.
+    """
+    if mode not in MERGE_MODES:
+        raise ValueError(f"Unknown merge mode {mode!r}, expected one of {MERGE_MODES}")
 
     try:
-        results = (
-            db.query(
-                ClientRequest.id.label("client_request_id"),
-                ClientRequest.customer_id.label("customer_id"),  
-                Supplier.id.label("supplier_id"),
-                Supplier.name.label("supplier_name"),
-                Supplier.performance_score.label("supplier_performance_score"),
-                QuotationResponse.id.label("quotation_response_id"),
-                QuotationResponse.unit_price,
-                QuotationResponse.delivery_days,
-                RFQSent.sent_at.label("rfq_sent_at"),
-                QuoteScore.won.label("ml_score"),
-                QuoteScore.performance_score.label("heuristic_score"),
-            )
-            .join(RFQSent, RFQSent.client_request_id == ClientRequest.id)
-            .join(Supplier, Supplier.id == RFQSent.supplier_id)
-            .join(QuotationResponse, QuotationResponse.rfq_id == RFQSent.id)
-            .join(QuoteScore, QuoteScore.id == QuotationResponse.id)
-            .all()
-        )
-
-        # Clear existing data in merged_quotes table to avoid duplicates
-        db.query(MergedQuote).delete()
-        db.commit()
-
-        # Insert fetched data into MergedQuote table
-        merged_quotes = [
-            MergedQuote(
-                client_request_id=row.client_request_id,
-                customer_id=row.customer_id,
-                supplier_id=row.supplier_id,
-                supplier_name=row.supplier_name,
-                supplier_performance_score=row.supplier_performance_score,
-                quotation_response_id=row.quotation_response_id,
-                unit_price=row.unit_price,
-                delivery_days=row.delivery_days,
-                rfq_sent_at=row.rfq_sent_at,
-                ml_score=row.ml_score,
-                heuristic_score=row.heuristic_score,
-            )
-            for row in results
-        ]
-
-        db.bulk_save_objects(merged_quotes)
-        db.commit()
-
-        print(f"Successfully saved {len(merged_quotes)} merged quotes to the database.")
+        with engine.begin() as conn:
+            if mode == "view":
+                ensure_view(conn)
+                print(f"Merged quotes served by the {TABLE} view.")
+                return
+
+            ensure_table(conn)
+            if rebuild:
+                conn.exec_driver_sql(f"DELETE FROM {TABLE}")
+            inserted = conn.execute(INCREMENTAL_SQL).rowcount
+            if inserted or rebuild:
+                version = record_publication(conn, TABLE, inserted)
+        print(f"Successfully saved {inserted} new merged quotes to the database."
+              + (f" (publication {version})" if inserted or rebuild else ""))
 
     except SQLAlchemyError as e:
-        db.rollback()
         print("An error occurred while saving merged quotes:", e)
 
-    finally:
-        db.close()
 
 if __name__ == "__main__":
-    build_merged_quotes_table()
-
-
+    parser = argparse.ArgumentParser(description="Maintain the merged_quotes table or view")
+    parser.add_argument("--mode", choices=MERGE_MODES, default=MERGE_MODE)
+    parser.add_argument("--rebuild", action="store_true", help="re-merge every scored quote (incremental mode)")
+    args = parser.parse_args()
+    build_merged_quotes_table(mode=args.mode, rebuild=args.rebuild)
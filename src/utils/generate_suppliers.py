@@ -1,5 +1,5 @@
 from utils.db import SessionLocal
-from utils.models import Supplier
+from utils.models import Supplier, SupplierProduct
 import random
 
 def generate_suppliers(n=20):
@@ -29,7 +29,8 @@ def generate_suppliers(n=20):
             name=name,
             email=email,
             supported_products=supported_str,
-            performance_score=round(random.uniform(3.0, 5.0), 2)
+            performance_score=round(random.uniform(3.0, 5.0), 2),
+            products=[SupplierProduct(product_type=product) for product in supported]
         )
 
         db.add(new_supplier)
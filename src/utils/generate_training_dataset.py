@@ -1,12 +1,13 @@
-import random
-import math
-from datetime import datetime, timedelta
-from utils.db import SessionLocal
+import argparse
+import time
+import numpy as np
+from utils.db import engine
 from utils.models import TrainingQuotation
 
 NUM_SAMPLES = 10000
 TARGET_WIN_RATE = 0.20
-MAX_WON = int(NUM_SAMPLES * TARGET_WIN_RATE)
+FLIP_RATE = 0.01
+CHUNK_SIZE = 100_000  # rows per executemany/transaction
 
 PRODUCT_TYPES = ["Flyer", "Poster", "T-shirt", "Sticker", "Brochure", "Banner"]
 SPECIFICATIONS = ["A5, 170g", "A3, glossy", "Cotton, size L", "Vinyl, 10x10cm"]
@@ -21,114 +22,133 @@ BASE_PRICE_MATRIX = {
     "Banner": {"4x4": 13.0, "4x0": 12.0, "Full color": 13.5, "B&W": 11.5},
 }
 
-def sigmoid(x: float) -> float:
-    return 1 / (1 + math.exp(-x))
+# BASE_PRICE_MATRIX as a (product, color) lookup array
+PRICE_TABLE = np.array([[BASE_PRICE_MATRIX[p][c] for c in COLORS] for p in PRODUCT_TYPES])
 
-def normalize(value: float, min_val: float, max_val: float) -> float:
+COLUMNS = ["unit_price", "delivery_days", "performance_score", "response_time",
+           "rfq_complexity_score", "is_urgent", "is_custom", "won"]
+
+def sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+def normalize(value, min_val: float, max_val: float):
     if max_val <= min_val:
         return 0.0
     return (value - min_val) / (max_val - min_val)
 
-def calculate_rfq_complexity(description: str, quantity: int) -> float:
-    base = 1.0 if quantity < 50 else 2.0 if quantity < 200 else 3.0
-    if "custom" in description.lower():
-        base += 1.0
-    return round(base + random.uniform(-0.3, 0.3), 2)
-
-def is_urgent(deadline: datetime, sent_at: datetime) -> bool:
-    return (deadline - sent_at).days <= 2
-
-def generate_synthetic_training_data():
-    db = SessionLocal()
-    records = []
-    num_won = 0
-
-    for _ in range(NUM_SAMPLES):
-        quantity = random.randint(50, 1000)
-        base_product_type = random.choice(PRODUCT_TYPES)
-        color_spec = random.choice(COLORS)
-
-        is_custom = random.random() < 0.2
-        description = f"custom {base_product_type}" if is_custom else base_product_type
-
-        sent_at = datetime.utcnow() - timedelta(days=random.randint(0, 30))
-        deadline = sent_at + timedelta(days=random.randint(1, 15))
-
-        complexity = calculate_rfq_complexity(description, quantity)
-        urgent = is_urgent(deadline, sent_at)
-
-        base_price = BASE_PRICE_MATRIX[base_product_type][color_spec]
-        base_price *= 1.2 if is_custom else 1.0
-        unit_price = round(random.uniform(base_price * 0.9, base_price * 1.1), 2)
-
-        delivery_days = random.randint(3, 10)
-        performance_score = round(random.uniform(0.0, 5.0), 2)
-        response_time = round(random.uniform(1, 72), 2)
-        spec = random.choice(SPECIFICATIONS)
-
-        norm_price = normalize(unit_price, 8.0, 14.0)
-        norm_days = normalize(delivery_days, 3, 10)
-        norm_quantity = normalize(quantity, 50, 1000)
-
-        base_score = (1 - norm_price) * 0.5 + (1 - norm_days) * 0.3 + norm_quantity * 0.2
-        prob_win = sigmoid(base_score * 6 + random.uniform(-1, 1))
-
-        score = 100
-        score -= unit_price * 2
-        score -= delivery_days * 1.5
-        score -= response_time * (5 if urgent else 2)
-        score += performance_score * 4
-        score -= complexity * 1.5
-        if urgent and (delivery_days > 3 or response_time > 24):
-            score -= 15
-        score += random.uniform(-20, 20)
-
-        decision_noise = score + random.uniform(-15, 15) > 50
-        win_chance = random.random() < prob_win + random.uniform(-0.2, 0.2)
-
-        if decision_noise and win_chance and num_won < MAX_WON:
-            won = 1
-            num_won += 1
-        else:
-            won = 0
-
-        record = TrainingQuotation(
-            unit_price=unit_price,
-            delivery_days=delivery_days,
-            performance_score=performance_score,
-            response_time=response_time,
-            rfq_complexity_score=complexity,
-            is_urgent=urgent,
-            is_custom=is_custom,
-            won=won
-        )
-
-        records.append(record)
+def calculate_rfq_complexity(quantity: np.ndarray, is_custom: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    base = np.where(quantity < 50, 1.0, np.where(quantity < 200, 2.0, 3.0))
+    base += is_custom  # the RFQ description contains "custom"
+    return np.round(base + rng.uniform(-0.3, 0.3, len(quantity)), 2)
 
-    # 🔁 Label flipping: introduce noise by flipping 1% of each class
-    won_ones = [r for r in records if r.won == 1]
-    won_zeros = [r for r in records if r.won == 0]
+def generate_training_arrays(num_samples=NUM_SAMPLES, seed=None):
+    """
+    Draw num_samples synthetic quotations in one vectorized pass.
 
-    flip_count_1_to_0 = max(1, int(len(won_ones) * 0.01))
-    flip_count_0_to_1 = max(1, int(len(won_zeros) * 0.01))
+    Same distributions as the original per-row generator: base price matrix,
+    sigmoid win probability, the TARGET_WIN_RATE cap (first come, first won)
+    and FLIP_RATE label flipping per class. Returns a dict of column arrays.
+    """
+    rng = np.random.default_rng(seed)
+    n = num_samples
 
-    for r in random.sample(won_ones, flip_count_1_to_0):
-        r.won = 0
+    quantity = rng.integers(50, 1000, n, endpoint=True)
+    product_idx = rng.integers(0, len(PRODUCT_TYPES), n)
+    color_idx = rng.integers(0, len(COLORS), n)
+    is_custom = rng.random(n) < 0.2
 
-    for r in random.sample(won_zeros, flip_count_0_to_1):
-        r.won = 1
+    # Only the deadline - sent_at gap matters: urgent when it is two days or less
+    deadline_days = rng.integers(1, 15, n, endpoint=True)
+    urgent = deadline_days <= 2
 
-    # Adiciona todos os registros com as labels já flipadas
-    db.add_all(records)
-    db.commit()
-    db.close()
+    complexity = calculate_rfq_complexity(quantity, is_custom, rng)
 
-    print(f"{NUM_SAMPLES} samples generated (~{TARGET_WIN_RATE*100}% win rate + 1% flipped noise).")
+    base_price = PRICE_TABLE[product_idx, color_idx] * np.where(is_custom, 1.2, 1.0)
+    unit_price = np.round(rng.uniform(base_price * 0.9, base_price * 1.1), 2)
 
-if __name__ == "__main__":
-    generate_synthetic_training_data()
+    delivery_days = rng.integers(3, 10, n, endpoint=True)
+    performance_score = np.round(rng.uniform(0.0, 5.0, n), 2)
+    response_time = np.round(rng.uniform(1, 72, n), 2)
 
+    norm_price = normalize(unit_price, 8.0, 14.0)
+    norm_days = normalize(delivery_days, 3, 10)
+    norm_quantity = normalize(quantity, 50, 1000)
 
+    base_score = (1 - norm_price) * 0.5 + (1 - norm_days) * 0.3 + norm_quantity * 0.2
+    prob_win = sigmoid(base_score * 6 + rng.uniform(-1, 1, n))
 
+    score = 100 - unit_price * 2 - delivery_days * 1.5
+    score -= response_time * np.where(urgent, 5, 2)
+    score += performance_score * 4
+    score -= complexity * 1.5
+    score -= 15 * (urgent & ((delivery_days > 3) | (response_time > 24)))
+    score += rng.uniform(-20, 20, n)
 
+    decision_noise = score + rng.uniform(-15, 15, n) > 50
+    win_chance = rng.random(n) < prob_win + rng.uniform(-0.2, 0.2, n)
 
+    # Rows are won in order until the win-rate cap is reached
+    candidates = decision_noise & win_chance
+    won = candidates & (np.cumsum(candidates) <= int(n * TARGET_WIN_RATE))
+
+    # 🔁 Label flipping: introduce noise by flipping 1% of each class
+    ones, zeros = np.flatnonzero(won), np.flatnonzero(~won)
+    flip_1_to_0 = rng.choice(ones, size=min(len(ones), max(1, int(len(ones) * FLIP_RATE))), replace=False)
+    flip_0_to_1 = rng.choice(zeros, size=min(len(zeros), max(1, int(len(zeros) * FLIP_RATE))), replace=False)
+    won[flip_1_to_0] = False
+    won[flip_0_to_1] = True
+
+    return {
+        "unit_price": unit_price,
+        "delivery_days": delivery_days,
+        "performance_score": performance_score,
+        "response_time": response_time,
+        "rfq_complexity_score": complexity,
+        "is_urgent": urgent.astype(np.int64),
+        "is_custom": is_custom.astype(np.int64),
+        "won": won.astype(np.int64),
+    }
+
+def bulk_insert_training_data(arrays, chunk_size=CHUNK_SIZE):
+    """Write column arrays to training_quotations with chunked executemany transactions."""
+    table = TrainingQuotation.__tablename__
+    sql = (f"INSERT INTO {table} ({', '.join(COLUMNS)}) "
+           f"VALUES ({', '.join('?' for _ in COLUMNS)})")
+    n = len(arrays[COLUMNS[0]])
+    for start in range(0, n, chunk_size):
+        # tolist() converts to Python scalars in C, far cheaper than per-row ORM objects
+        rows = list(zip(*(arrays[col][start:start + chunk_size].tolist() for col in COLUMNS)))
+        with engine.begin() as conn:
+            conn.exec_driver_sql(sql, rows)
+
+def has_training_data():
+    table = TrainingQuotation.__tablename__
+    with engine.connect() as conn:
+        return bool(conn.exec_driver_sql(f"SELECT EXISTS (SELECT 1 FROM {table})").scalar())
+
+def generate_synthetic_training_data(num_samples=NUM_SAMPLES, seed=None, chunk_size=CHUNK_SIZE, append=False):
+    """
+    Insert num_samples synthetic quotations into training_quotations. A
+    table that already holds rows is left as is unless append is set, so a
+    pipeline rerun does not change the training data and the model is not refit.
+    """
+    if not append and has_training_data():
+        print("training_quotations already populated; no samples generated (use --append to add more).")
+        return
+
+    started = time.perf_counter()
+    arrays = generate_training_arrays(num_samples, seed)
+    generated = time.perf_counter()
+    bulk_insert_training_data(arrays, chunk_size)
+    finished = time.perf_counter()
+
+    print(f"{num_samples} samples generated (~{TARGET_WIN_RATE*100}% win rate + 1% flipped noise) "
+          f"in {generated - started:.2f}s, inserted in {finished - generated:.2f}s.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic training quotations")
+    parser.add_argument("--rows", type=int, default=NUM_SAMPLES)
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible runs")
+    parser.add_argument("--append", action="store_true", help="add rows even if the table is already populated")
+    args = parser.parse_args()
+    generate_synthetic_training_data(num_samples=args.rows, seed=args.seed, append=args.append)
@@ -1,7 +1,37 @@
 #RUN IT ONCE
 
+from sqlalchemy import inspect
 from utils.db import Base, engine
 import utils.models
 
-# Create all tables in the database
-Base.metadata.create_all(bind=engine)
+def add_missing_columns():
+    """Add model columns missing from tables built by an earlier version (SQLite can only add nullable columns)."""
+    inspector = inspect(engine)
+    views = set(inspector.get_view_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name) or table.name in views:
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+
+def init_db():
+    # Create all tables in the database
+    Base.metadata.create_all(bind=engine)
+
+    # create_all() leaves existing tables untouched, so columns and indexes
+    # added to the models after a database was first built are created here
+    add_missing_columns()
+    # Models kept as SQL views (e.g. merged_quotes in "view" mode) cannot be indexed
+    views = set(inspect(engine).get_view_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name in views:
+            continue
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+if __name__ == "__main__":
+    init_db()
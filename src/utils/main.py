@@ -1,10 +1,33 @@
-from fastapi import FastAPI, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from utils.db import get_db
+import json
+from datetime import date, datetime, timedelta
+from fastapi import FastAPI, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from utils.db import AsyncSessionLocal, get_async_db
 from utils.models import ClientRequest as SQLClientRequest
-from utils.schemas import ClientRequestSchema as PydanticClientRequest
-from utils.synthetic_data import generate_bulk_requests
+from utils.schemas import (
+    ClientRequestSchema as PydanticClientRequest, ClientRequestPage, StoredClientRequestPage
+)
+from utils.synthetic_data import generate_bulk_requests, generate_request_page
+
+# Number of entries in the simulated, paginated CRM feed
+SIMULATED_FEED_SIZE = 5000
+
+# Rows fetched per round-trip when streaming client requests
+STREAM_BATCH_SIZE = 1000
+
+CLIENT_REQUEST_COLUMNS = [
+    SQLClientRequest.id,
+    SQLClientRequest.customer_id,
+    SQLClientRequest.product_type,
+    SQLClientRequest.specifications,
+    SQLClientRequest.color_spec,
+    SQLClientRequest.quantity,
+    SQLClientRequest.deadline,
+    SQLClientRequest.is_custom,
+]
 
 app = FastAPI()
 
@@ -17,10 +40,81 @@ def simulate_crm_requests():
     """
     return generate_bulk_requests(n=10)
 
-@app.get("/hubspot/client_requests", response_model=List[PydanticClientRequest])
-def get_saved_requests(db: Session = Depends(get_db)):
+@app.get("/hubspot/simulate_requests/page", response_model=ClientRequestPage)
+def simulate_crm_request_page(cursor: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
     """
-    Fetches all saved client requests from the database.
+    Simulates a cursor-paginated CRM feed.
+    The cursor is the feed position of the first entry; pages are stable,
+    so a consumer can resume from its last checkpointed cursor.
+    """
+    items = generate_request_page(cursor=cursor, limit=limit, feed_size=SIMULATED_FEED_SIZE)
+    next_cursor = cursor + len(items)
+    return {
+        "items": items,
+        "next_cursor": next_cursor if next_cursor < SIMULATED_FEED_SIZE else None,
+    }
+
+def client_request_query(after_id=0, product_type=None, deadline_from=None,
+                         deadline_to=None, is_custom=None):
+    """Keyset query over client_requests (id > after_id, in id order) with optional filters."""
+    query = select(*CLIENT_REQUEST_COLUMNS).where(SQLClientRequest.id > after_id)
+    if product_type is not None:
+        query = query.where(SQLClientRequest.product_type == product_type)
+    if deadline_from is not None:
+        query = query.where(SQLClientRequest.deadline >= datetime.combine(deadline_from, datetime.min.time()))
+    if deadline_to is not None:
+        # Inclusive of the whole deadline_to day
+        query = query.where(SQLClientRequest.deadline < datetime.combine(deadline_to + timedelta(days=1), datetime.min.time()))
+    if is_custom is not None:
+        query = query.where(SQLClientRequest.is_custom == is_custom)
+    return query.order_by(SQLClientRequest.id)
+
+@app.get("/hubspot/client_requests", response_model=StoredClientRequestPage)
+async def get_saved_requests(
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    product_type: Optional[str] = None,
+    deadline_from: Optional[date] = None,
+    deadline_to: Optional[date] = None,
+    is_custom: Optional[bool] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    return db.query(SQLClientRequest).all()
+    Fetches one page of saved client requests, keyset-paginated by id.
+    Pass the returned next_cursor as after_id to read the following page.
+    """
+    query = client_request_query(after_id, product_type, deadline_from, deadline_to, is_custom)
+    rows = (await db.execute(query.limit(limit + 1))).mappings().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": rows,
+        "next_cursor": rows[-1]["id"] if has_more else None,
+    }
+
+@app.get("/hubspot/client_requests/stream")
+async def stream_saved_requests(
+    after_id: int = Query(0, ge=0),
+    product_type: Optional[str] = None,
+    deadline_from: Optional[date] = None,
+    deadline_to: Optional[date] = None,
+    is_custom: Optional[bool] = None,
+):
+    """
+    Streams every matching client request as NDJSON (one JSON object per line).
+    Rows are read through a cursor in batches, so memory stays flat regardless of table size.
+    """
+    query = client_request_query(after_id, product_type, deadline_from, deadline_to, is_custom)
+
+    async def generate_lines():
+        # The session is owned by the generator: it must outlive the route handler
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+            # One chunk per fetched batch rather than per row keeps the event loop responsive
+            async for rows in result.mappings().partitions():
+                yield "".join(
+                    json.dumps(dict(row), default=lambda value: value.isoformat()) + "\n"
+                    for row in rows
+                )
 
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
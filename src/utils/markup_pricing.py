@@ -0,0 +1,57 @@
+"""
+Expected-profit pricing of quotes over a grid of markups.
+
+The win model takes unit_price as a feature, so the price offered to the
+client moves the chance of winning. For every quote, each candidate
+selling price unit_price * markup on the grid is scored with the win
+model, and the markup with the highest expected profit per unit
+
+    P(won | selling price) * (selling price - unit_price)
+
+is kept. The quotes x grid points prediction rows are built with NumPy
+broadcasting and scored in batches of BATCH_ROWS through the common
+predictor interface (utils.predictors), so any registered model family
+works and memory stays bounded.
+"""
+import numpy as np
+
+GRID_POINTS = 64
+
+# Prediction rows (quotes x grid points) per predict_proba call
+BATCH_ROWS = 1_000_000
+
+PRICE_FEATURE = "unit_price"
+
+
+def markup_grid(min_markup, max_markup, points=GRID_POINTS):
+    return np.linspace(min_markup, max_markup, points)
+
+
+def optimal_markups(predictor, X, grid):
+    """
+    Best markup of every quote. X holds the predictor's raw features (rows
+    = quotes, unit_price being the supplier's price). Returns the arrays
+    (markup, expected profit per unit).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    price_index = predictor.feature_names.index(PRICE_FEATURE)
+    n, points = len(X), len(grid)
+    markup, expected_profit = np.empty(n), np.empty(n)
+
+    step = max(1, BATCH_ROWS // points)
+    for start in range(0, n, step):
+        block = X[start:start + step]
+        unit_price = block[:, price_index]
+        prices = unit_price[:, None] * grid
+
+        # One row per (quote, markup): the quote's features at that selling price
+        repriced = np.repeat(block, points, axis=0)
+        repriced[:, price_index] = prices.ravel()
+        p_win = predictor.predict_proba(repriced).reshape(len(block), points)
+
+        expected = p_win * (prices - unit_price[:, None])
+        best = expected.argmax(axis=1)
+        rows = np.arange(len(block))
+        markup[start:start + step] = grid[best]
+        expected_profit[start:start + step] = expected[rows, best]
+    return markup, expected_profit
@@ -0,0 +1,178 @@
+"""
+Latency-aware model bake-off: logistic regression vs LightGBM vs XGBoost.
+
+All three are fit on the same undersampled train split (utils.training_data)
+and scored on the same validation split with the streaming evaluator. Each
+is also measured as it would be served, through the utils.predictors
+interface:
+
+- single-row latency: p50/p99 of predict_proba on one row, as in /score
+- batch throughput: rows/s of predict_proba on THROUGHPUT_ROWS rows, as in run_won_scoring
+- artifact size and load time of the saved model file
+
+Every model is registered; among those whose single-row p99 stays within
+the latency budget, the one with the best selection metric becomes
+CURRENT (or CANDIDATE with --candidate). run_won_scoring and the scoring
+service then serve it without code changes. If no model fits the budget,
+the pointers are left alone.
+
+    python src/utils/model_bakeoff.py
+    python src/utils/model_bakeoff.py --latency-budget-ms 0.2 --metric val_auc
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from utils.model_registry import promote, register_model, set_candidate
+from utils.predictors import LightGBMPredictor, XGBoostPredictor, artifact_file
+from utils.scoring_kernel import ScoringKernel
+from utils.streaming_eval import evaluate_training_data
+from utils.training_data import FEATURE_COLUMNS, load_training_arrays
+from utils.training_lr_model import DEFAULT_SEARCH_MODE, SEARCH_MODES, fit_logistic, non_binary_columns
+
+# Single-row p99 latency (milliseconds) a production model must stay within
+LATENCY_BUDGET_MS = 1.0
+SELECTION_METRICS = ("val_f1", "val_auc")
+DEFAULT_METRIC = "val_f1"
+
+LATENCY_SAMPLES = 2_000
+THROUGHPUT_ROWS = 100_000
+LOAD_REPEATS = 5
+
+LIGHTGBM_PARAMS = {"n_estimators": 300, "learning_rate": 0.05, "num_leaves": 31,
+                   "random_state": 42, "verbose": -1}
+XGBOOST_PARAMS = {"n_estimators": 300, "learning_rate": 0.1, "max_depth": 6,
+                  "tree_method": "hist", "random_state": 42}
+
+
+def fit_lightgbm(X_train, y_train):
+    import lightgbm as lgb
+
+    model = lgb.LGBMClassifier(**LIGHTGBM_PARAMS)
+    model.fit(X_train, y_train, feature_name=FEATURE_COLUMNS)
+    return LightGBMPredictor(model.booster_, FEATURE_COLUMNS), LIGHTGBM_PARAMS
+
+
+def fit_xgboost(X_train, y_train):
+    import xgboost as xgb
+
+    model = xgb.XGBClassifier(objective="binary:logistic", **XGBOOST_PARAMS)
+    model.fit(X_train, y_train)
+    booster = model.get_booster()
+    booster.feature_names = FEATURE_COLUMNS
+    return XGBoostPredictor(booster, FEATURE_COLUMNS), XGBOOST_PARAMS
+
+
+def fit_candidates(X_train, y_train, search=DEFAULT_SEARCH_MODE):
+    """Yield (predictor, params, fit seconds) for each model family."""
+    started = time.perf_counter()
+    model, scaler, params, _ = fit_logistic(X_train, y_train, search)
+    kernel = ScoringKernel.from_sklearn(model, scaler, FEATURE_COLUMNS, non_binary_columns)
+    yield kernel, params, time.perf_counter() - started
+
+    for fit in (fit_lightgbm, fit_xgboost):
+        started = time.perf_counter()
+        predictor, params = fit(X_train, y_train)
+        yield predictor, params, time.perf_counter() - started
+
+
+def measure_serving(predictor, X_sample):
+    """Latency, throughput, artifact size and load time of a predictor."""
+    latencies = np.empty(LATENCY_SAMPLES)
+    for i in range(LATENCY_SAMPLES):
+        row = X_sample[i % len(X_sample)][None, :]
+        started = time.perf_counter()
+        predictor.predict_proba(row)
+        latencies[i] = time.perf_counter() - started
+
+    batch = X_sample[:THROUGHPUT_ROWS]
+    predictor.predict_proba(batch)  # warm-up
+    started = time.perf_counter()
+    predictor.predict_proba(batch)
+    throughput = len(batch) / (time.perf_counter() - started)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / artifact_file(predictor)
+        predictor.save(path)
+        load_seconds = []
+        for _ in range(LOAD_REPEATS):
+            started = time.perf_counter()
+            type(predictor).load(path)
+            load_seconds.append(time.perf_counter() - started)
+        size = path.stat().st_size
+
+    return {
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "throughput_rows_s": float(throughput),
+        "artifact_bytes": int(size),
+        "load_ms": float(np.median(load_seconds) * 1000),
+    }
+
+
+def select_model(results, latency_budget_ms=LATENCY_BUDGET_MS, metric=DEFAULT_METRIC):
+    """Best result by metric among those within the single-row p99 budget, or None."""
+    eligible = [r for r in results if r["serving"]["latency_p99_ms"] <= latency_budget_ms]
+    if not eligible:
+        return None
+    return max(eligible, key=lambda r: r["metrics"][metric])
+
+
+def run_bakeoff(latency_budget_ms=LATENCY_BUDGET_MS, metric=DEFAULT_METRIC, as_candidate=False,
+                search=DEFAULT_SEARCH_MODE):
+    if metric not in SELECTION_METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {SELECTION_METRICS}")
+
+    X_train, y_train = load_training_arrays("train", undersample=True)
+    X_sample, _ = load_training_arrays("validation", undersample=False, chunk_size=THROUGHPUT_ROWS)
+    X_sample = np.ascontiguousarray(X_sample[:THROUGHPUT_ROWS])
+
+    results = []
+    for predictor, params, fit_seconds in fit_candidates(X_train, y_train, search):
+        val = evaluate_training_data(predictor, split="validation")
+        report = val.classification_report()
+        metrics = {"val_f1": report["1"]["f1-score"], "val_auc": val.auc(), "val_accuracy": report["accuracy"]}
+        serving = measure_serving(predictor, X_sample)
+        version = register_model(predictor, {
+            "metrics": metrics,
+            "training_rows": len(X_train),
+            "params": params,
+            "bakeoff": {"fit_seconds": fit_seconds, **serving},
+        })
+        results.append({"kind": predictor.kind, "version": version, "metrics": metrics,
+                        "serving": serving, "fit_seconds": fit_seconds})
+
+    print(f"{'model':<9} {'version':<17} {'F1':>7} {'AUC':>7} {'fit s':>7} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'rows/s':>11} {'size KB':>8} {'load ms':>8}")
+    for r in results:
+        s = r["serving"]
+        print(f"{r['kind']:<9} {r['version']:<17} {r['metrics']['val_f1']:>7.4f} {r['metrics']['val_auc']:>7.4f} "
+              f"{r['fit_seconds']:>7.2f} {s['latency_p50_ms']:>8.3f} {s['latency_p99_ms']:>8.3f} "
+              f"{s['throughput_rows_s']:>11,.0f} {s['artifact_bytes'] / 1024:>8.1f} {s['load_ms']:>8.2f}")
+
+    winner = select_model(results, latency_budget_ms, metric)
+    if winner is None:
+        print(f"❌ No model within the {latency_budget_ms} ms p99 budget; registry pointers unchanged")
+        return None
+    (set_candidate if as_candidate else promote)(winner["version"])
+    role = "CANDIDATE" if as_candidate else "CURRENT"
+    print(f"✅ {winner['kind']} ({winner['version']}) is now {role}: best {metric} "
+          f"within the {latency_budget_ms} ms p99 budget")
+    return winner
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train LR, LightGBM and XGBoost and pick one under a latency budget")
+    parser.add_argument("--latency-budget-ms", type=float, default=LATENCY_BUDGET_MS,
+                        help="max single-row p99 latency of the production model")
+    parser.add_argument("--metric", choices=SELECTION_METRICS, default=DEFAULT_METRIC,
+                        help="validation metric to maximize within the budget")
+    parser.add_argument("--candidate", action="store_true",
+                        help="make the winner CANDIDATE for shadow scoring instead of CURRENT")
+    parser.add_argument("--search", choices=SEARCH_MODES, default=DEFAULT_SEARCH_MODE,
+                        help="logistic regression hyperparameter search")
+    args = parser.parse_args()
+    run_bakeoff(args.latency_budget_ms, args.metric, args.candidate, args.search)
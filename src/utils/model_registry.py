@@ -0,0 +1,313 @@
+"""
+On-disk model registry with hot reload and shadow scoring.
+
+Each trained model is stored under src/models/registry/<version>/, where
+version is the SHA-256 prefix of its artifact (the scoring kernel for
+logistic regression, the booster file for tree models, see
+utils.predictors), next to a metadata.json (model type, metrics, training
+row count, features, creation time).
+Two pointer files select models: CURRENT (used for scoring) and
+CANDIDATE (shadow-scored only). Pointers are replaced atomically with
+os.replace, so readers never see a half-written version.
+
+Long-running processes hold a HotModel, which keeps the predictor in memory
+and reloads it when its pointer file changes. ShadowScorer scores batches
+with the candidate on a background thread and records the disagreement in
+shadow_score_log, so the main scoring path does not wait for it.
+
+    python src/utils/model_registry.py list
+    python src/utils/model_registry.py promote <version>
+    python src/utils/model_registry.py candidate <version>   # or: candidate --clear
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from utils.predictors import artifact_file, load_predictor
+from utils.scoring_kernel import KERNEL_PATH, ScoringKernel
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+REGISTRY_DIR = BASE_DIR / "models" / "registry"
+CURRENT_POINTER = REGISTRY_DIR / "CURRENT"
+CANDIDATE_POINTER = REGISTRY_DIR / "CANDIDATE"
+
+METADATA_FILE = "metadata.json"
+
+# Hex digits of the artifact hash used as version id
+VERSION_LENGTH = 16
+
+# Seconds between pointer checks in HotModel.get()
+RELOAD_CHECK_INTERVAL = 1.0
+
+# Shadow batches allowed to queue before new ones are dropped
+MAX_PENDING_SHADOW_BATCHES = 8
+
+# A shadow_score_log row is written per this many rows or seconds, whichever comes first
+SHADOW_FLUSH_ROWS = 10_000
+SHADOW_FLUSH_INTERVAL = 10.0
+
+
+def model_version(predictor) -> str:
+    return hashlib.sha256(predictor.fingerprint()).hexdigest()[:VERSION_LENGTH]
+
+
+def register_model(predictor, metadata=None, files=(), registry_dir=REGISTRY_DIR):
+    """
+    Store a predictor (plus optional extra files, e.g. the sklearn pickles)
+    under its content hash and return the version. Registering the same
+    model twice is a no-op.
+    """
+    version = model_version(predictor)
+    target = Path(registry_dir) / version
+    if target.exists():
+        return version
+
+    Path(registry_dir).mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{version}-", dir=registry_dir))
+    try:
+        predictor.save(staging / artifact_file(predictor))
+        for path in files:
+            shutil.copy2(path, staging / Path(path).name)
+        info = {
+            "version": version,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "model_type": predictor.kind,
+            "feature_names": predictor.feature_names,
+            **(metadata or {}),
+        }
+        with open(staging / METADATA_FILE, "w") as f:
+            json.dump(info, f, indent=2)
+        os.replace(staging, target)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not target.exists():
+            raise
+    return version
+
+
+def write_pointer(pointer: Path, version):
+    """Atomically point CURRENT/CANDIDATE at a registered version (None removes it)."""
+    if version is None:
+        pointer.unlink(missing_ok=True)
+        return
+    if not (pointer.parent / version / METADATA_FILE).exists():
+        raise ValueError(f"Unknown model version: {version}")
+    tmp_path = pointer.with_name(pointer.name + ".tmp")
+    tmp_path.write_text(version + "\n")
+    os.replace(tmp_path, pointer)
+
+
+def read_pointer(pointer: Path):
+    try:
+        return pointer.read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def promote(version, registry_dir=REGISTRY_DIR):
+    write_pointer(Path(registry_dir) / CURRENT_POINTER.name, version)
+
+
+def set_candidate(version, registry_dir=REGISTRY_DIR):
+    write_pointer(Path(registry_dir) / CANDIDATE_POINTER.name, version)
+
+
+def load_version(version, registry_dir=REGISTRY_DIR):
+    return load_predictor(Path(registry_dir) / version)
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    """Metadata of every registered version, oldest first."""
+    registry_dir = Path(registry_dir)
+    if not registry_dir.exists():
+        return []
+    versions = []
+    for metadata_path in registry_dir.glob(f"*/{METADATA_FILE}"):
+        with open(metadata_path) as f:
+            versions.append(json.load(f))
+    return sorted(versions, key=lambda info: info["created_at"])
+
+
+class HotModel:
+    """
+    In-memory predictor that follows a registry pointer.
+
+    get() returns (version, predictor). At most once per check_interval it
+    stats the pointer file and loads the new version if the pointer moved,
+    so a promotion reaches running processes without a restart. Without a
+    registry, CURRENT falls back to the kernel at KERNEL_PATH.
+    """
+
+    def __init__(self, pointer=CURRENT_POINTER, check_interval=RELOAD_CHECK_INTERVAL,
+                 fallback_path=KERNEL_PATH):
+        self.pointer = Path(pointer)
+        self.check_interval = check_interval
+        self.fallback_path = fallback_path
+        self.lock = threading.Lock()
+        self.loaded = (None, None)
+        self.pointer_mtime = None
+        self.next_check = 0.0
+        self.reload()
+
+    def reload(self):
+        """Load whatever the pointer references now."""
+        with self.lock:
+            try:
+                self.pointer_mtime = self.pointer.stat().st_mtime_ns
+            except FileNotFoundError:
+                self.pointer_mtime = None
+            version = read_pointer(self.pointer)
+            if version is not None:
+                if version != self.loaded[0]:
+                    self.loaded = (version, load_version(version, self.pointer.parent))
+            elif self.fallback_path is not None and Path(self.fallback_path).exists():
+                if self.loaded[0] != "unregistered":
+                    self.loaded = ("unregistered", ScoringKernel.load(self.fallback_path))
+            else:
+                self.loaded = (None, None)
+            self.next_check = time.monotonic() + self.check_interval
+            return self.loaded
+
+    def get(self):
+        if time.monotonic() >= self.next_check:
+            try:
+                mtime = self.pointer.stat().st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self.pointer_mtime:
+                return self.reload()
+            self.next_check = time.monotonic() + self.check_interval
+        return self.loaded
+
+
+class ShadowScorer:
+    """
+    Scores batches with the CANDIDATE model off the main path.
+
+    submit() only queues work: the candidate is scored on a single
+    background thread and the disagreement accumulated in memory. It is
+    written to shadow_score_log as one row per flush_rows rows or
+    flush_interval seconds (and on close), so small online batches do not
+    turn into a commit each. When more than max_pending batches are waiting,
+    new ones are dropped (and counted) instead of slowing the caller down.
+    Does nothing while no candidate is set.
+    """
+
+    def __init__(self, source, candidate=None, max_pending=MAX_PENDING_SHADOW_BATCHES,
+                 flush_rows=SHADOW_FLUSH_ROWS, flush_interval=SHADOW_FLUSH_INTERVAL):
+        self.source = source
+        self.candidate = candidate or HotModel(CANDIDATE_POINTER, fallback_path=None)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.window = None  # accumulated comparison, only touched on the shadow thread
+        self.stats = {"batches": 0, "rows": 0, "dropped": 0}
+
+    def submit(self, X, current_version, current_probs):
+        candidate_version, candidate = self.candidate.get()
+        if candidate is None or candidate_version == current_version:
+            return
+        if not self.pending.acquire(blocking=False):
+            self.stats["dropped"] += 1
+            return
+        future = self.executor.submit(self.compare, X, current_version, current_probs,
+                                      candidate_version, candidate)
+        future.add_done_callback(lambda _: self.pending.release())
+
+    def compare(self, X, current_version, current_probs, candidate_version, candidate):
+        candidate_probs = candidate.predict_proba(X)
+        key = (current_version, candidate_version)
+        if self.window is not None and self.window["key"] != key:
+            self.flush()
+        if self.window is None:
+            self.window = {"key": key, "rows": 0, "abs_diff": 0.0, "max_abs_diff": 0.0,
+                           "flips": 0, "started": time.monotonic()}
+
+        diff = np.abs(current_probs - candidate_probs)
+        self.window["rows"] += len(diff)
+        self.window["abs_diff"] += float(diff.sum())
+        self.window["max_abs_diff"] = max(self.window["max_abs_diff"], float(diff.max()))
+        self.window["flips"] += int(np.count_nonzero((current_probs > 0.5) != (candidate_probs > 0.5)))
+        self.stats["batches"] += 1
+        self.stats["rows"] += len(diff)
+
+        if (self.window["rows"] >= self.flush_rows
+                or time.monotonic() - self.window["started"] >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write the accumulated window as one shadow_score_log row."""
+        window, self.window = self.window, None
+        if window is None:
+            return
+        # Imported lazily so the registry stays usable without a database
+        from utils.db import SessionLocal
+        from utils.models import ShadowScoreLog
+
+        current_version, candidate_version = window["key"]
+        db = SessionLocal()
+        try:
+            db.add(ShadowScoreLog(
+                logged_at=datetime.now(), source=self.source,
+                current_version=current_version, candidate_version=candidate_version,
+                rows=window["rows"], mean_abs_diff=window["abs_diff"] / window["rows"],
+                max_abs_diff=window["max_abs_diff"], decision_flips=window["flips"],
+            ))
+            db.commit()
+        except Exception as e:
+            print(f"❌ Shadow log write failed: {e}")
+        finally:
+            db.close()
+
+    def close(self):
+        """Finish queued comparisons and write the last window."""
+        self.executor.submit(self.flush)
+        self.executor.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Model registry")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show registered versions")
+    promote_parser = commands.add_parser("promote", help="make a version CURRENT")
+    promote_parser.add_argument("version")
+    candidate_parser = commands.add_parser("candidate", help="shadow-score a version")
+    candidate_parser.add_argument("version", nargs="?")
+    candidate_parser.add_argument("--clear", action="store_true", help="stop shadow scoring")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        current, candidate = read_pointer(CURRENT_POINTER), read_pointer(CANDIDATE_POINTER)
+        for info in list_versions():
+            marker = "CURRENT" if info["version"] == current else "CANDIDATE" if info["version"] == candidate else ""
+            metrics = ", ".join(f"{k}={v:.4f}" for k, v in info.get("metrics", {}).items())
+            print(f"{info['version']}  {info['created_at']}  {info.get('model_type', 'linear'):<8}  "
+                  f"rows={info.get('training_rows')}  {metrics}  {marker}")
+    elif args.command == "promote":
+        promote(args.version)
+        print(f"✅ {args.version} is now CURRENT")
+    elif args.command == "candidate":
+        if args.clear:
+            set_candidate(None)
+            print("✅ Candidate cleared")
+        elif args.version:
+            set_candidate(args.version)
+            print(f"✅ {args.version} is now CANDIDATE")
+        else:
+            parser.error("candidate needs a version or --clear")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,14 +15,15 @@ class Customer(Base):
 class ClientRequest(Base):
     __tablename__ = "client_requests"
     id = Column(Integer, primary_key=True, index=True)
-    product_type = Column(String)
+    product_type = Column(String, index=True)
     specifications = Column(String)
     color_spec = Column(String)
     quantity = Column(Integer)
     deadline = Column(DateTime)
     is_custom = Column(Boolean, default=False)
     
-    customer_id = Column(Integer, ForeignKey("customers.id"))
+    # Unique so bulk ingestion can rely on INSERT ... ON CONFLICT DO NOTHING
+    customer_id = Column(Integer, ForeignKey("customers.id"), unique=True, index=True)
     customer = relationship("Customer", back_populates="requests")
     rfqs_sent = relationship("RFQSent", back_populates="client_request")
 
@@ -34,14 +35,25 @@ class Supplier(Base):
     email = Column(String)
     performance_score = Column(Float)  # Simulated value between 0.0 and 5.0
     supported_products = Column(String)
+    capacity = Column(Integer, nullable=True)  # Max client requests per quote selection; NULL = unlimited
 
     rfqs_received = relationship("RFQSent", back_populates="supplier")
+    products = relationship("SupplierProduct", back_populates="supplier")
+
+
+class SupplierProduct(Base):
+    """Normalized supplier -> supported product type association."""
+    __tablename__ = "supplier_products"
+    supplier_id = Column(Integer, ForeignKey("suppliers.id"), primary_key=True)
+    product_type = Column(String, primary_key=True, index=True)
+
+    supplier = relationship("Supplier", back_populates="products")
 
 
 class RFQSent(Base):
     __tablename__ = "rfqs_sent"
     id = Column(Integer, primary_key=True)
-    client_request_id = Column(Integer, ForeignKey("client_requests.id"))
+    client_request_id = Column(Integer, ForeignKey("client_requests.id"), index=True)
     supplier_id = Column(Integer, ForeignKey("suppliers.id"))
     sent_at = Column(DateTime)
     status = Column(String, default="sent") 
@@ -55,7 +67,7 @@ class RFQSent(Base):
 class RFQDetails(Base):
     __tablename__ = "rfq_details"
     id = Column(Integer, primary_key=True)
-    rfq_id = Column(Integer, ForeignKey("rfqs_sent.id"))
+    rfq_id = Column(Integer, ForeignKey("rfqs_sent.id"), index=True)
     expected_format = Column(String)
     payment_terms = Column(String)
     response_deadline = Column(DateTime)
@@ -71,7 +83,7 @@ class RFQDetails(Base):
 class QuotationResponse(Base):
     __tablename__ = "quotation_responses"
     id = Column(Integer, primary_key=True)
-    rfq_id = Column(Integer, ForeignKey("rfqs_sent.id"))
+    rfq_id = Column(Integer, ForeignKey("rfqs_sent.id"), unique=True, index=True)  # one response per RFQ
     unit_price = Column(Float)
     delivery_days = Column(Integer)
     received_at = Column(DateTime)
@@ -104,6 +116,8 @@ class TrainingQuotation(Base):
 class RealQuotationData(Base):
     __tablename__ = "real_quotation_data"
     id = Column(Integer, primary_key=True)
+    # Source response; unique so each response is compiled once
+    quotation_response_id = Column(Integer, ForeignKey("quotation_responses.id"), unique=True, index=True)
     unit_price = Column(Float)
     delivery_days = Column(Integer)
     performance_score = Column(Float)
@@ -117,12 +131,12 @@ class MergedQuote(Base):
     __tablename__ = "merged_quotes"
 
     id = Column(Integer, primary_key=True, autoincrement=True) 
-    client_request_id = Column(Integer, nullable=False)
+    client_request_id = Column(Integer, nullable=False, index=True)
     customer_id = Column(String, nullable=True)  
     supplier_id = Column(Integer, nullable=False)
     supplier_name = Column(String, nullable=False)
     supplier_performance_score = Column(Float, nullable=True)
-    quotation_response_id = Column(Integer, nullable=False)
+    quotation_response_id = Column(Integer, nullable=False, unique=True, index=True)
     unit_price = Column(Float, nullable=False)
     delivery_days = Column(Integer, nullable=False)
     rfq_sent_at = Column(DateTime, nullable=False)
@@ -145,3 +159,31 @@ class SelectedQuote(Base):
     delivery_days = Column(Integer, nullable=False)
     rfq_sent_at = Column(DateTime, nullable=False)
     heuristic_score = Column(Float, nullable=True)
+    markup = Column(Float, nullable=True)
+    expected_profit = Column(Float, nullable=True)  # Per unit: P(won at the selling price) x (selling price - unit_price)
+
+
+class ShadowScoreLog(Base):
+    """Disagreement between the current and candidate model over a window of shadow-scored rows."""
+    __tablename__ = "shadow_score_log"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    logged_at = Column(DateTime, nullable=False)
+    source = Column(String, nullable=False)  # e.g. "batch_scoring", "scoring_service"
+    current_version = Column(String, nullable=False)
+    candidate_version = Column(String, nullable=False, index=True)
+    rows = Column(Integer, nullable=False)
+    mean_abs_diff = Column(Float, nullable=False)
+    max_abs_diff = Column(Float, nullable=False)
+    decision_flips = Column(Integer, nullable=False)  # rows on opposite sides of 0.5
+
+
+class Publication(Base):
+    """One row per atomic publication of a pipeline output table (see utils.publish)."""
+    __tablename__ = "publications"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    table_name = Column(String, nullable=False, index=True)
+    version = Column(Integer, nullable=False)  # 1, 2, ... per table
+    rows = Column(Integer, nullable=False)  # rows written (appended rows for incrementally maintained tables)
+    published_at = Column(DateTime, nullable=False)
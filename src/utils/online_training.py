@@ -0,0 +1,220 @@
+"""
+Incremental (online) training of the win-probability model.
+
+training_lr_model.py refits on the whole history every time. This mode
+keeps a streaming logistic regression, averaged SGDClassifier(loss="log_loss")
+(the averaged weights do not jitter with the last mini-batches), and
+updates it with partial_fit on the labeled outcomes added since the last
+checkpoint only, so a refresh costs time proportional to the new rows.
+
+- scaling: the MinMaxScaler is fit during a warm-up of WARMUP_ROWS rows
+  (kept in the checkpoint; each warm-up update refits scaler and model on
+  all of them) and then frozen. Widening it later would rescale every
+  earlier input under the weights already learned; values outside the
+  warm-up range are scaled past [0, 1] instead.
+- new rows: train-split rows of training_quotations with id above the
+  checkpoint's watermark (ids only grow, see utils.training_data). The
+  validation split is never trained on, so online and batch models are
+  compared on the same held-out rows.
+- class balance: instead of undersampling, each row is weighted by
+  rows seen / (2 * rows of its class seen), the streaming equivalent of
+  class_weight="balanced".
+- state: model, scaler, class counts and watermark are pickled to
+  ONLINE_STATE_PATH next to the batch model files, written atomically.
+
+Once MIN_REGISTER_ROWS rows have been learned since the last registered
+version, an update is evaluated on the validation split, exported as the
+fused scoring kernel and registered, as CANDIDATE by default so it is
+shadow-scored against the batch model. Smaller updates only move the
+checkpoint, so frequent refreshes neither rescan the validation rows nor
+grow the registry.
+
+    python src/utils/online_training.py                 # one update
+    python src/utils/online_training.py --every 300     # refresh every 5 minutes
+    python src/utils/online_training.py --promote       # make the update CURRENT
+    python src/utils/online_training.py --reset         # drop the checkpoint first
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+from sklearn.base import clone
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import MinMaxScaler
+
+from utils.model_registry import promote, register_model, set_candidate
+from utils.scoring_kernel import ScoringKernel
+from utils.training_data import FEATURE_COLUMNS, iter_training_chunks
+from utils.training_lr_model import models_dir, non_binary_columns
+
+ONLINE_STATE_PATH = models_dir / "online_sgd_state.pkl"
+
+# Rows per partial_fit call; new rows are shuffled within each fetched chunk
+MINI_BATCH_SIZE = 10_000
+# L2 penalty of the SGD model (SGDClassifier's alpha)
+ALPHA = 1e-4
+# Rows the scaler is fit on before it is frozen
+WARMUP_ROWS = 10_000
+# New rows learned before an update is validated and registered again
+MIN_REGISTER_ROWS = 10_000
+
+SCALED_INDICES = [FEATURE_COLUMNS.index(col) for col in non_binary_columns]
+
+
+class OnlineLearner:
+    """SGD logistic regression with a warm-up-fitted scaler, updated one batch of new rows at a time."""
+
+    # Attributes persisted in the checkpoint
+    STATE = ("model", "scaler", "rng", "class_counts", "last_id", "rows_seen", "updated_at",
+             "warmup", "registered_rows")
+
+    def __init__(self, alpha=ALPHA, random_state=42):
+        self.model = SGDClassifier(loss="log_loss", penalty="l2", alpha=alpha, average=True,
+                                   random_state=random_state)
+        self.scaler = MinMaxScaler()
+        self.rng = np.random.default_rng(random_state)
+        self.class_counts = np.zeros(2, dtype=np.int64)
+        self.last_id = 0
+        self.rows_seen = 0
+        self.updated_at = None
+        # Rows of the warm-up, None once the scaler is frozen
+        self.warmup = (np.empty((0, len(FEATURE_COLUMNS))), np.empty(0, dtype=np.int8))
+        # rows_seen at the last registered version
+        self.registered_rows = 0
+
+    @property
+    def is_fitted(self):
+        return self.rows_seen > 0 and self.class_counts.min() > 0
+
+    def transform(self, X):
+        X_scaled = np.array(X, dtype=np.float64)
+        X_scaled[:, SCALED_INDICES] = self.scaler.transform(X_scaled[:, SCALED_INDICES])
+        return X_scaled
+
+    def partial_fit(self, X, y):
+        """Update class counts and model (and, during warm-up, the scaler) with one batch of rows
+        (features in FEATURE_COLUMNS order)."""
+        if len(y) == 0:
+            return self
+        y = np.asarray(y, dtype=np.int8)
+        if self.warmup is not None:
+            # Warm-up: refit the scaler on every row so far and restart the model over them
+            X = np.concatenate([self.warmup[0], X])
+            y = np.concatenate([self.warmup[1], y])
+            self.warmup = (X, y) if len(y) < WARMUP_ROWS else None
+            self.scaler = MinMaxScaler().fit(X[:, SCALED_INDICES])
+            self.model = clone(self.model)
+            self.class_counts = np.zeros(2, dtype=np.int64)
+            self.rows_seen = 0
+        X_scaled = self.transform(X)
+
+        self.class_counts += np.bincount(y, minlength=2)
+        class_weight = self.class_counts.sum() / (2.0 * np.maximum(self.class_counts, 1))
+        order = self.rng.permutation(len(y))
+        for start in range(0, len(y), MINI_BATCH_SIZE):
+            batch = order[start:start + MINI_BATCH_SIZE]
+            self.model.partial_fit(X_scaled[batch], y[batch], classes=[0, 1],
+                                   sample_weight=class_weight[y[batch]])
+        self.rows_seen += len(y)
+        self.updated_at = datetime.now().isoformat(timespec="seconds")
+        return self
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(self.transform(X))[:, 1]
+
+    def to_kernel(self):
+        return ScoringKernel.from_sklearn(self.model, self.scaler, FEATURE_COLUMNS, non_binary_columns)
+
+    def save(self, path=ONLINE_STATE_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        # A plain dict, so the checkpoint does not depend on where this class was imported from
+        joblib.dump({name: getattr(self, name) for name in self.STATE}, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=ONLINE_STATE_PATH):
+        """The saved checkpoint, or a fresh learner if there is none."""
+        learner = cls()
+        if path.exists():
+            # Checkpoints from before the warm-up was kept are past it
+            learner.warmup = None
+            for name, value in joblib.load(path).items():
+                setattr(learner, name, value)
+        return learner
+
+
+def update_online_model(as_candidate=True, state_path=ONLINE_STATE_PATH, min_rows=MIN_REGISTER_ROWS):
+    """
+    Train on the rows added since the checkpoint and save the checkpoint.
+    Once min_rows rows have been learned since the last registered
+    version, validate and register the resulting kernel. Returns
+    (new rows, version or None).
+    """
+    from utils.streaming_eval import evaluate_training_data
+
+    learner = OnlineLearner.load(state_path)
+    started = time.perf_counter()
+    new_rows = 0
+    for ids, X, y in iter_training_chunks("train", undersample=False, after_id=learner.last_id):
+        learner.partial_fit(X, y)
+        learner.last_id = int(ids[-1])
+        new_rows += len(y)
+    train_seconds = time.perf_counter() - started
+
+    if new_rows == 0:
+        print(f"No new labeled rows after id {learner.last_id}")
+        return 0, None
+    learner.save(state_path)
+    if not learner.is_fitted:
+        print(f"Only one class seen so far ({learner.rows_seen} rows); not registering a model yet")
+        return new_rows, None
+    pending = learner.rows_seen - learner.registered_rows
+    if learner.registered_rows and pending < min_rows:
+        print(f"Online model updated with {new_rows} rows in {train_seconds:.2f}s; "
+              f"{pending} rows since the last registered version, registering from {min_rows}")
+        return new_rows, None
+
+    kernel = learner.to_kernel()
+    val = evaluate_training_data(kernel, split="validation")
+    report = val.classification_report()
+    version = register_model(kernel, {
+        "metrics": {
+            "val_f1": report["1"]["f1-score"],
+            "val_auc": val.auc(),
+            "val_accuracy": report["accuracy"],
+        },
+        "training_rows": learner.rows_seen,
+        "online": {"last_id": learner.last_id, "new_rows": new_rows, "seconds": train_seconds},
+    })
+    (set_candidate if as_candidate else promote)(version)
+    learner.registered_rows = learner.rows_seen
+    learner.save(state_path)
+
+    role = "CANDIDATE" if as_candidate else "CURRENT"
+    print(f"✅ Online model updated with {new_rows} rows in {train_seconds:.2f}s "
+          f"(seen {learner.rows_seen}, watermark id {learner.last_id}, "
+          f"val F1 {report['1']['f1-score']:.4f}, version {version}, {role})")
+    return new_rows, version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally update the online win-probability model")
+    parser.add_argument("--promote", action="store_true", help="make the updated model CURRENT")
+    parser.add_argument("--reset", action="store_true", help="discard the checkpoint and start over")
+    parser.add_argument("--every", type=float, default=None, metavar="SECONDS",
+                        help="keep running, updating every SECONDS")
+    parser.add_argument("--min-rows", type=int, default=MIN_REGISTER_ROWS,
+                        help="new rows learned before a version is registered again")
+    args = parser.parse_args()
+
+    if args.reset:
+        ONLINE_STATE_PATH.unlink(missing_ok=True)
+    while True:
+        update_online_model(as_candidate=not args.promote, min_rows=args.min_rows)
+        if args.every is None:
+            break
+        time.sleep(args.every)
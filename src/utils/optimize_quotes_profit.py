@@ -1,100 +1,309 @@
-from sqlalchemy.orm import Session
-from utils.db import SessionLocal
-from utils.models import MergedQuote, SelectedQuote
+import argparse
+import json
+
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
 
-def optimize_quotes_simple():
-    db: Session = SessionLocal()
+from utils.db import engine
+from utils.markup_pricing import markup_grid, optimal_markups
+from utils.model_registry import HotModel
+from utils.models import MergedQuote, SelectedQuote
+from utils.publish import publish_rows
+from utils.quote_assignment import assign_quotes
+from utils.run_won_scoring import feature_columns, prepare_features
+
+# Define minimum and maximum markup (e.g., 5% to 20% markup)
+MIN_MARKUP = 1.05  # 5% margin
+MAX_MARKUP = 1.20  # 20% margin
+
+# How each quote's markup (within MIN_MARKUP..MAX_MARKUP) is set and quotes are ranked:
+#   "linear"           markup proportional to the normalized ml_score; ranked by WEIGHTS
+#   "expected_profit"  the grid point maximizing P(won | selling price) x (selling price - unit_price),
+#                      re-scored with the CURRENT win model (utils.markup_pricing); ranked by
+#                      that expected profit
+# "linear" stays the default: the current win model is barely price sensitive, and
+# nearly every quote's expected-profit optimum is the top of the markup range.
+PRICING_MODES = ("linear", "expected_profit")
+PRICING_MODE = "linear"
+
+# Share of quotes priced at a grid end above which a warning is printed: the
+# optimum probably lies outside MIN_MARKUP..MAX_MARKUP
+BOUNDARY_WARNING_SHARE = 0.5
+
+# Define weights: higher for ml_score, lower for profit margin
+WEIGHTS = {'ml_score_norm_scaled': 0.7, 'profit_margin_norm': 0.3}
+
+# Merged quotes per read; chunks end on client_request_id boundaries, so every
+# request's quotes are ranked together and memory stays bounded
+CHUNK_ROWS = 200_000
+
+# Selection constraints (see utils.quote_assignment). With no supplier limit
+# every request simply gets its best quote.
+#   DEFAULT_CAPACITY   max requests per supplier without its own suppliers.capacity
+#   MAX_SHARE          max share of the client requests any one supplier gets
+#   ENFORCE_DEADLINES  only quotes delivered by the client request's deadline qualify
+DEFAULT_CAPACITY = None
+MAX_SHARE = None
+ENFORCE_DEADLINES = False
+
+TABLE = MergedQuote.__tablename__
+
+# Ranking only needs these numeric columns, read straight into typed arrays
+RANK_DTYPES = {'id': 'int64', 'client_request_id': 'int64', 'supplier_id': 'int64',
+               'unit_price': 'float64', 'ml_score': 'float64'}
+
+# The remaining columns are read for the selected quotes only
+SELECTED_DTYPES = {
+    'id': 'int64', 'client_request_id': 'int64', 'customer_id': 'object', 'supplier_id': 'int64',
+    'supplier_name': 'object', 'supplier_performance_score': 'float64',
+    'quotation_response_id': 'int64', 'unit_price': 'float64', 'rfq_sent_at': 'object',
+    'heuristic_score': 'float64', 'delivery_days': 'int64',
+}
+
+# Win-model features other than the price, joined from real_quotation_data for pricing
+PRICING_FEATURES = [column for column in feature_columns if column not in RANK_DTYPES]
+
+# Quotes that can be delivered (sent_at + delivery_days) by the client request's deadline
+ON_TIME_SQL = "(cr.deadline IS NULL OR date(m.rfq_sent_at, '+' || m.delivery_days || ' days') <= date(cr.deadline))"
+
+SELECTED_SQL = (
+    f"SELECT {', '.join(SELECTED_DTYPES)} FROM {TABLE} "
+    f"WHERE id IN (SELECT value FROM json_each(?)) ORDER BY client_request_id"
+)
+
+# Last client_request_id of a chunk starting after the given one (None: the rest fits)
+CHUNK_END_SQL = (
+    f"SELECT client_request_id FROM {TABLE} WHERE client_request_id > ? "
+    f"ORDER BY client_request_id LIMIT 1 OFFSET ?"
+)
+
+# Profit margin range over all quotes, with the same float operations as score_chunk
+PROFIT_MARGIN_RANGE_SQL = f"""
+SELECT min(pm), max(pm) FROM (
+    SELECT (unit_price * markup - unit_price) / (unit_price * markup) AS pm
+    FROM (SELECT unit_price, ? + (ml_score * ? + ?) * ? AS markup FROM {TABLE} WHERE ml_score IS NOT NULL)
+)
+"""
+
+
+def chunk_sql(deadlines=False, features=()):
+    """
+    Query of one chunk of whole client requests: the ranking columns plus
+    the given real_quotation_data columns (NULL, and a has_features of 0,
+    for quotes without a real_quotation_data row); with deadlines, on-time
+    quotes only.
+    """
+    columns = [f"m.{column}" for column in RANK_DTYPES] + [f"rq.{column}" for column in features]
+    joins = []
+    conditions = ["m.client_request_id > ?", "m.client_request_id <= ?"]
+    if features:
+        columns.append("rq.quotation_response_id IS NOT NULL AS has_features")
+        joins.append("LEFT JOIN real_quotation_data rq ON rq.quotation_response_id = m.quotation_response_id")
+    if deadlines:
+        joins.append("JOIN client_requests cr ON cr.id = m.client_request_id")
+        conditions.append(ON_TIME_SQL)
+    return (f"SELECT {', '.join(columns)} FROM {TABLE} m {' '.join(joins)} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY m.client_request_id, m.id")
+
+
+def minmax_params(data_min, data_max):
+    """(scale, offset) with x * scale + offset == MinMaxScaler().fit([min, max]).transform(x)."""
+    data_range = data_max - data_min
+    # As sklearn: a (near) constant column keeps scale 1
+    scale = 1.0 / data_range if data_range >= 10 * np.finfo(np.float64).eps else 1.0
+    return scale, 0.0 - data_min * scale
+
+
+def global_scaling(conn):
+    """
+    Min-max parameters of the whole table, computed in SQLite before any
+    chunk is read, so chunked scoring matches scaling over all quotes.
+    Returns None for an empty table.
+    """
+    ml_min, ml_max = conn.exec_driver_sql(f"SELECT min(ml_score), max(ml_score) FROM {TABLE}").one()
+    if ml_min is None:
+        return None
+    ml_scale, ml_offset = minmax_params(ml_min, ml_max)
+    markup_span = MAX_MARKUP - MIN_MARKUP
+    pm_min, pm_max = conn.exec_driver_sql(
+        PROFIT_MARGIN_RANGE_SQL, (MIN_MARKUP, ml_scale, ml_offset, markup_span)).one()
+    return {
+        'ml_score_norm': (ml_scale, ml_offset),
+        # The normalization is increasing, so its extremes are those of ml_score
+        'ml_score_norm_scaled': minmax_params(ml_min * ml_scale + ml_offset, ml_max * ml_scale + ml_offset),
+        'profit_margin_norm': minmax_params(pm_min, pm_max),
+    }
+
+
+def score_chunk(df, scaling):
+    """
+    Add markup, profit_margin and final_score columns to a chunk of merged
+    quotes, the markup being proportional to the normalized ml_score.
+    """
+    ml_scale, ml_offset = scaling['ml_score_norm']
+    ml_score_norm = df['ml_score'].to_numpy() * ml_scale + ml_offset
+
+    # Selling price and profit margin follow from the markup
+    markup = MIN_MARKUP + ml_score_norm * (MAX_MARKUP - MIN_MARKUP)
+    unit_price = df['unit_price'].to_numpy()
+    selling_price = unit_price * markup
+    profit_margin = (selling_price - unit_price) / selling_price
+
+    scale, offset = scaling['ml_score_norm_scaled']
+    ml_score_norm_scaled = ml_score_norm * scale + offset
+    scale, offset = scaling['profit_margin_norm']
+    profit_margin_norm = profit_margin * scale + offset
+
+    df['markup'] = markup
+    df['profit_margin'] = profit_margin
+    df['final_score'] = (ml_score_norm_scaled * WEIGHTS['ml_score_norm_scaled'] +
+                         profit_margin_norm * WEIGHTS['profit_margin_norm'])
+    return df
+
+
+def price_chunk(df, scaling, predictor, grid):
+    """
+    Expected-profit pricing of a chunk of merged quotes (read with
+    PRICING_FEATURES): markup, profit_margin and expected_profit columns,
+    and final_score = expected profit per unit at the chosen price.
+    Quotes without real_quotation_data features keep the linear markup and
+    are ranked by ml_score x its margin.
+    """
+    df = score_chunk(df, scaling)
+    has_features = df.pop('has_features').to_numpy(dtype=bool)
+    unit_price = df['unit_price'].to_numpy()
+    expected_profit = df['ml_score'].to_numpy() * (unit_price * df['markup'].to_numpy() - unit_price)
+
+    X = prepare_features(df.loc[has_features])[predictor.feature_names].to_numpy(dtype=np.float64)
+    markup, expected_profit[has_features] = optimal_markups(predictor, X, grid)
+    df.loc[has_features, 'markup'] = markup
+    df.loc[has_features, 'profit_margin'] = (markup - 1) / markup
+
+    df['expected_profit'] = expected_profit
+    df['final_score'] = expected_profit
+    return df, int((~has_features).sum())
+
+
+def iter_request_chunks(conn, chunk_rows=CHUNK_ROWS, sql=None):
+    """Yield DataFrames of merged quotes holding complete client requests, in client_request_id order."""
+    sql = sql or chunk_sql()
+    raw = conn.connection.driver_connection
+    last_id = conn.exec_driver_sql(f"SELECT max(client_request_id) FROM {TABLE}").scalar()
+    after_id = -1
+    while last_id is not None and after_id < last_id:
+        end_id = conn.exec_driver_sql(CHUNK_END_SQL, (after_id, chunk_rows - 1)).scalar()
+        end_id = last_id if end_id is None else end_id
+        yield pd.read_sql(sql, raw, params=(after_id, end_id), dtype=RANK_DTYPES)
+        after_id = end_id
+
+
+def supplier_capacity(conn, default=None):
+    """supplier_id -> max client requests, from suppliers.capacity (default where unset)."""
+    if default is None:
+        rows = conn.exec_driver_sql("SELECT id, capacity FROM suppliers WHERE capacity IS NOT NULL")
+    else:
+        rows = conn.exec_driver_sql("SELECT id, coalesce(capacity, ?) FROM suppliers", (default,))
+    return dict(rows.all())
+
+
+def optimize_quotes_simple(chunk_rows=CHUNK_ROWS, capacity=DEFAULT_CAPACITY, max_share=MAX_SHARE,
+                           deadlines=ENFORCE_DEADLINES, pricing=PRICING_MODE):
+    """
+    Select the best quote of every client request and publish them to
+    selected_quotes. Ranking columns are read and scored one chunk of whole
+    client requests at a time; only the winners' full rows are loaded.
+
+    With supplier limits (suppliers.capacity, capacity as the default for
+    suppliers without one, max_share) the chunks' candidates are kept and
+    assigned together by utils.quote_assignment. With deadlines, quotes
+    that cannot be delivered by the request's deadline are not considered.
+
+    In "expected_profit" pricing every quote's markup is searched over a
+    grid with the CURRENT win model and quotes are ranked by the expected
+    profit per unit at that markup, which is published with the selection.
+    """
+    if pricing not in PRICING_MODES:
+        raise ValueError(f"Unknown pricing mode {pricing!r}, expected one of {PRICING_MODES}")
 
     try:
-        # Fetch all merged quotes from the database
-        data = db.query(MergedQuote).all()
-        df = pd.DataFrame([{
-            'client_request_id': q.client_request_id,
-            'customer_id': q.customer_id,
-            'supplier_id': q.supplier_id,
-            'supplier_name': q.supplier_name,
-            'supplier_performance_score': q.supplier_performance_score,
-            'quotation_response_id': q.quotation_response_id,
-            'unit_price': q.unit_price,
-            'ml_score': q.ml_score,
-            'heuristic_score': q.heuristic_score,
-            'rfq_sent_at': q.rfq_sent_at,
-            'delivery_days': q.delivery_days
-        } for q in data])
-
-        if df.empty:
-            print("No quotes found.")
-            return
-
-        # Define minimum and maximum markup (e.g., 5% to 20% markup)
-        MIN_MARKUP = 1.05  # 5% margin
-        MAX_MARKUP = 1.20  # 20% margin
-
-        # Normalize ml_score to [0, 1] range
-        scaler = MinMaxScaler()
-        df['ml_score_norm'] = scaler.fit_transform(df[['ml_score']])
-
-        # Calculate markup proportionally to normalized ml_score
-        df['markup'] = MIN_MARKUP + df['ml_score_norm'] * (MAX_MARKUP - MIN_MARKUP)
-
-        # Calculate selling price and profit margin based on dynamic markup
-        df['selling_price'] = df['unit_price'] * df['markup']
-        df['profit_margin'] = (df['selling_price'] - df['unit_price']) / df['selling_price']
-
-        # Normalize ml_score_norm and profit_margin to [0,1] range for weighted scoring
-        df[['ml_score_norm_scaled', 'profit_margin_norm']] = scaler.fit_transform(df[['ml_score_norm', 'profit_margin']])
-
-        # Define weights: higher for ml_score, lower for profit margin
-        WEIGHTS = {'ml_score_norm_scaled': 0.7, 'profit_margin_norm': 0.3}
-
-        # Compute final weighted score
-        df['final_score'] = (
-            df['ml_score_norm_scaled'] * WEIGHTS['ml_score_norm_scaled'] +
-            df['profit_margin_norm'] * WEIGHTS['profit_margin_norm']
-        )
-
-        # Select the best quote per client_request based on final_score
-        best_quotes = df.loc[df.groupby('client_request_id')['final_score'].idxmax()]
+        predictor = None
+        if pricing == "expected_profit":
+            _, predictor = HotModel().get()
+            if predictor is None:
+                raise FileNotFoundError("No trained model: run training_lr_model.py first")
+            grid = markup_grid(MIN_MARKUP, MAX_MARKUP)
+
+        best_chunks = []
+        with engine.connect() as conn:
+            scaling = global_scaling(conn)
+            if scaling is None:
+                print("No quotes found.")
+                return
+
+            capacities = supplier_capacity(conn, capacity)
+            constrained = bool(capacities) or max_share is not None
+            n_requests = conn.exec_driver_sql(f"SELECT count(DISTINCT client_request_id) FROM {TABLE}").scalar()
+
+            sql = chunk_sql(deadlines, PRICING_FEATURES if predictor is not None else ())
+            priced = ['id', 'profit_margin', 'markup', 'expected_profit']
+            without_features = at_grid_end = n_quotes = 0
+            for chunk in iter_request_chunks(conn, chunk_rows, sql):
+                if predictor is None:
+                    chunk = score_chunk(chunk, scaling)
+                    chunk['expected_profit'] = np.nan
+                else:
+                    chunk, missing = price_chunk(chunk, scaling, predictor, grid)
+                    without_features += missing
+                    at_grid_end += int(np.isin(chunk['markup'].to_numpy(), grid[[0, -1]]).sum())
+                    n_quotes += len(chunk)
+                if constrained:
+                    # Supplier limits tie the requests together: keep every candidate
+                    best_chunks.append(chunk[priced + ['client_request_id', 'supplier_id', 'final_score']])
+                    continue
+                # Select the best quote per client_request based on final_score (first one on ties)
+                best = chunk.loc[chunk.groupby('client_request_id', sort=False)['final_score'].idxmax()]
+                best_chunks.append(best[priced])
+
+            best = pd.concat(best_chunks, ignore_index=True)
+            if constrained:
+                best = assign_quotes(best, capacities, max_share, n_requests)[priced]
+            best_quotes = pd.read_sql(SELECTED_SQL, conn.connection.driver_connection,
+                                      params=(json.dumps(best['id'].tolist()),), dtype=SELECTED_DTYPES)
+        best_quotes = best_quotes.merge(best, on='id', validate='one_to_one')
 
         # Sanity check: ensure only one quote per client_request (supplier must be different)
-        assert best_quotes['client_request_id'].nunique() == len(best_quotes), "More than one quote per client_request found!"
-        assert best_quotes.groupby('client_request_id')['supplier_id'].nunique().eq(1).all(), "Multiple suppliers selected for the same client_request!"
-
-        # Clear previous selections and save new best quotes (excluding ml_score)
-        db.query(SelectedQuote).delete()
-        db.commit()
-
-        selected = [
-            SelectedQuote(
-                client_request_id=row.client_request_id,
-                customer_id=row.customer_id,
-                supplier_id=row.supplier_id,
-                supplier_name=row.supplier_name,
-                supplier_performance_score=row.supplier_performance_score,
-                quotation_response_id=row.quotation_response_id,
-                unit_price=row.unit_price,
-                profit_margin=row.profit_margin,
-                rfq_sent_at=row.rfq_sent_at,
-                heuristic_score=row.heuristic_score,
-                delivery_days=row.delivery_days
-            )
-            for _, row in best_quotes.iterrows()
-        ]
-
-        db.bulk_save_objects(selected)
-        db.commit()
-
-        print(f"Optimization complete. {len(selected)} quotes selected and saved.")
+        assert best_quotes['client_request_id'].is_unique, "More than one quote per client_request found!"
+
+        # Publish the new best quotes (excluding ml_score) with an atomic table swap,
+        # so readers keep the previous selection until the new one is complete
+        best_quotes['rfq_sent_at'] = pd.to_datetime(best_quotes['rfq_sent_at'], format='ISO8601')
+        selected = best_quotes.drop(columns='id').to_dict('records')
+        version = publish_rows(SelectedQuote, selected)
+
+        print(f"Optimization complete. {len(selected)} quotes selected and saved (publication {version}).")
+        if without_features:
+            print(f"{without_features} quotes had no real_quotation_data row and kept the linear markup.")
+        if n_quotes and at_grid_end > BOUNDARY_WARNING_SHARE * n_quotes:
+            print(f"⚠️ {at_grid_end / n_quotes:.0%} of the quotes are priced at a markup bound "
+                  f"({MIN_MARKUP} or {MAX_MARKUP}): the expected-profit optimum likely lies outside the grid.")
+        if len(selected) < n_requests:
+            print(f"{n_requests - len(selected)} client requests left without a quote "
+                  f"(no on-time quote or all their suppliers at their limit).")
 
     except Exception as e:
-        db.rollback()
         print(f"Error during optimization: {e}")
-
-    finally:
-        db.close()
+        raise
 
 if __name__ == "__main__":
-    optimize_quotes_simple()
-
+    parser = argparse.ArgumentParser(description="Select one quote per client request and publish selected_quotes")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY,
+                        help="max client requests per supplier without its own suppliers.capacity")
+    parser.add_argument("--max-share", type=float, default=MAX_SHARE,
+                        help="max share of the client requests per supplier, e.g. 0.05")
+    parser.add_argument("--deadlines", action="store_true", default=ENFORCE_DEADLINES,
+                        help="only select quotes delivered by the client request's deadline")
+    parser.add_argument("--pricing", choices=PRICING_MODES, default=PRICING_MODE,
+                        help="markup linear in ml_score, or from an expected-profit grid search")
+    args = parser.parse_args()
+    optimize_quotes_simple(capacity=args.capacity, max_share=args.max_share, deadlines=args.deadlines,
+                           pricing=args.pricing)
@@ -3,5 +3,17 @@ import os
 # Get the root directory of the repository
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Directory holding the database and pipeline state files
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
 # Absolute path to the SQLite database
-DB_PATH = os.path.join(BASE_DIR, "data", "quotations.db")
+DB_PATH = os.path.join(DATA_DIR, "quotations.db")
+
+# Last CRM feed position fully saved by the async consumer
+CONSUMER_CHECKPOINT_PATH = os.path.join(DATA_DIR, "consumer_checkpoint.json")
+
+# Input/output fingerprints of the last successful run of each pipeline stage
+PIPELINE_MANIFEST_PATH = os.path.join(DATA_DIR, "pipeline_manifest.json")
+
+# Precomputed model dashboard plots and metrics, keyed by model and data version
+DASHBOARD_DIR = os.path.join(DATA_DIR, "dashboard")
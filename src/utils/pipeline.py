@@ -0,0 +1,189 @@
+"""
+In-process pipeline runner.
+
+Stages are declared as a dependency DAG and run as plain function calls in
+one interpreter, so pandas/sklearn/SQLAlchemy are imported once and every
+stage shares the engine from utils.db. Stages whose dependencies are done
+run concurrently on a thread pool (e.g. the training dataset is generated
+while RFQs are sent and quoted).
+
+Each stage declares the tables (str) and files (Path) it reads and writes.
+A stage whose code, inputs and outputs match the fingerprints recorded in
+the stage manifest after its last run is skipped; force=[names] (or "all")
+reruns it regardless. Stages without inputs always run.
+"""
+import argparse
+import functools
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Union
+
+from utils.async_consumer import consume_crm_feed
+from utils.compile_suppliers_quotations import compile_real_quotation_data
+from utils.dashboard_artifacts import LATEST_POINTER, build_dashboard_artifacts
+from utils.final_quote_optimizer import build_merged_quotes_table
+from utils.generate_suppliers import generate_suppliers
+from utils.generate_training_dataset import generate_synthetic_training_data
+from utils.init_db import init_db
+from utils.optimize_quotes_profit import optimize_quotes_simple
+from utils.run_won_scoring import score_new_quotes
+from utils.send_rfqs import send_rfqs
+from utils.simulate_quotations import generate_quotations
+from utils.stage_manifest import StageManifest
+from utils.model_registry import CURRENT_POINTER
+from utils.scoring_kernel import KERNEL_PATH
+from utils.training_lr_model import MODEL_PATH, SCALER_PATH, train_model
+
+MAX_WORKERS = 4
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[], object]
+    deps: List[str] = field(default_factory=list)
+    inputs: List[Union[str, Path]] = field(default_factory=list)
+    outputs: List[Union[str, Path]] = field(default_factory=list)
+    always_run: bool = False  # for stages reading external sources or without outputs
+
+# Five pages of ten CRM entries, resuming from the consumer checkpoint
+consume_stage = functools.partial(consume_crm_feed, max_pages=5, page_size=10)
+
+# Retrained models become CANDIDATE: CURRENT is left to promote and the
+# bake-off (only a fresh tree without a CURRENT model gets it promoted)
+train_stage = functools.partial(train_model, as_candidate=True)
+
+MODEL_FILES = [MODEL_PATH, SCALER_PATH, KERNEL_PATH]
+RFQ_TABLES = ["client_requests", "suppliers", "rfqs_sent", "rfq_details", "quotation_responses"]
+
+STAGES = [
+    Stage("init_db", init_db, always_run=True),
+    Stage("suppliers", generate_suppliers, ["init_db"], outputs=["suppliers"]),
+    Stage("consume", consume_stage, ["init_db"], outputs=["client_requests"], always_run=True),
+    Stage("send_rfqs", send_rfqs, ["suppliers", "consume"],
+          inputs=["client_requests", "suppliers"], outputs=["rfqs_sent", "rfq_details"]),
+    Stage("simulate", generate_quotations, ["send_rfqs"],
+          inputs=["client_requests", "rfqs_sent"], outputs=["quotation_responses"]),
+    Stage("compile", compile_real_quotation_data, ["simulate"],
+          inputs=RFQ_TABLES, outputs=["real_quotation_data"]),
+    Stage("training_data", generate_synthetic_training_data, ["init_db"], outputs=["training_quotations"]),
+    Stage("train", train_stage, ["training_data"], inputs=["training_quotations"], outputs=MODEL_FILES),
+    Stage("dashboard", build_dashboard_artifacts, ["train"],
+          inputs=["training_quotations", CURRENT_POINTER], outputs=[LATEST_POINTER]),
+    Stage("score", score_new_quotes, ["train", "compile"],
+          inputs=["real_quotation_data", CURRENT_POINTER], outputs=["quote_scores"]),
+    Stage("merge", build_merged_quotes_table, ["score"],
+          inputs=[*RFQ_TABLES, "quote_scores"], outputs=["merged_quotes"]),
+    Stage("optimize", optimize_quotes_simple, ["merge"],
+          inputs=["merged_quotes", "suppliers", "client_requests", "real_quotation_data", CURRENT_POINTER],
+          outputs=["selected_quotes"]),
+]
+
+def validate_dag(stages):
+    """Raise ValueError on unknown dependencies or cycles."""
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        unknown = set(stage.deps) - names
+        if unknown:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {sorted(unknown)}")
+
+    deps = {stage.name: set(stage.deps) for stage in stages}
+    done = set()
+    while len(done) < len(deps):
+        ready = {name for name, d in deps.items() if name not in done and d <= done}
+        if not ready:
+            raise ValueError(f"Dependency cycle among stages: {sorted(set(deps) - done)}")
+        done |= ready
+
+def run_pipeline(stages=STAGES, max_workers=MAX_WORKERS, force=(), manifest=None):
+    """
+    Run stages in dependency order, independent ones concurrently.
+
+    Up-to-date stages are skipped unless named in force ("all" forces every
+    stage). A failing stage stops further scheduling; stages already running
+    finish. Returns the per-stage timing rows and raises the first failure, if any.
+    """
+    validate_dag(stages)
+    by_name = {stage.name: stage for stage in stages}
+    unknown = set(force) - set(by_name) - {"all"}
+    if unknown:
+        raise ValueError(f"Cannot force unknown stages: {sorted(unknown)}")
+    manifest = manifest or StageManifest()
+    pending = dict(by_name)
+    done = set()
+    up_to_date = set()
+    timings = {}
+    failure = None
+    started = time.perf_counter()
+
+    def timed(stage):
+        stage_start = time.perf_counter()
+        try:
+            forced = "all" in force or stage.name in force
+            # Fingerprint the inputs before running: what changes meanwhile is left for the next run
+            state = manifest.current_state(stage)
+            if not forced and manifest.is_up_to_date(stage, state):
+                up_to_date.add(stage.name)
+                return
+            stage.run()
+            manifest.record(stage, state)
+        finally:
+            timings[stage.name] = (stage_start - started, time.perf_counter() - stage_start)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+        while pending or running:
+            if failure is None:
+                for name in [n for n, s in pending.items() if set(s.deps) <= done]:
+                    print(f"▶ {name}")
+                    running[pool.submit(timed, pending.pop(name))] = name
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                if future.exception() is not None:
+                    print(f"❌ {name} failed: {future.exception()}")
+                    failure = failure or future.exception()
+                elif name in up_to_date:
+                    print(f"⏭ {name} is up to date")
+                    done.add(name)
+                else:
+                    print(f"✅ {name} finished in {timings[name][1]:.2f}s")
+                    done.add(name)
+
+    def status(name):
+        if name in up_to_date:
+            return "cached"
+        if name in done:
+            return "ok"
+        return "failed" if name in timings else "not run"
+
+    rows = [(name, status(name), *timings.get(name, (None, None))) for name in by_name]
+    print_timing_table(rows, time.perf_counter() - started)
+    if failure is not None:
+        raise failure
+    return rows
+
+def print_timing_table(rows, total):
+    print(f"\n{'stage':<15} {'status':<8} {'start (s)':>10} {'wall (s)':>10}")
+    print("-" * 46)
+    for name, status, start, wall in rows:
+        start_str = f"{start:10.2f}" if start is not None else f"{'-':>10}"
+        wall_str = f"{wall:10.2f}" if wall is not None else f"{'-':>10}"
+        print(f"{name:<15} {status:<8} {start_str} {wall_str}")
+    print("-" * 46)
+    print(f"{'total':<15} {'':<8} {'':>10} {total:10.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the quotation pipeline")
+    parser.add_argument("--force", action="append", default=[], metavar="STAGE",
+                        help="rerun STAGE even if it is up to date (repeatable, or 'all')")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args(argv)
+    run_pipeline(max_workers=args.workers, force=args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Common predictor interface for the win-probability models.
+
+Every servable model family implements the same small interface, so the
+scoring code (run_won_scoring, the scoring service, the streaming
+evaluator, the dashboard) works with whichever model the registry serves:
+
+- kind: model family, the key in PREDICTOR_TYPES
+- feature_names: raw feature columns, in the order predict_proba expects
+- predict_proba(X): P(won) for each row of a float64 matrix of raw features
+- score_frame(df): the same for a DataFrame; missing values count as 0
+- feature_importance: one value per feature (signed coefficients for the
+  linear model, total split gain for trees)
+- save(path) / load(path): the single artifact file
+- fingerprint(): canonical artifact bytes, hashed into the registry version
+
+The linear model is the NumPy ScoringKernel. The LightGBM and XGBoost
+predictors wrap the native boosters; those libraries are imported only
+when such a model is loaded or trained.
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+
+from utils.scoring_kernel import ScoringKernel
+
+
+class BoosterPredictor:
+    """Shared plumbing of the gradient-boosted tree predictors."""
+
+    kind = None
+
+    def __init__(self, booster, feature_names):
+        self.booster = booster
+        self.feature_names = list(feature_names)
+
+    def score_frame(self, df):
+        X = np.nan_to_num(df[self.feature_names].to_numpy(dtype=np.float64), nan=0.0)
+        return self.predict_proba(X)
+
+    def fingerprint(self):
+        return self.to_bytes()
+
+    def save(self, path):
+        """Write the artifact atomically (temp file + rename)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_bytes(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_bytes(Path(path).read_bytes())
+
+
+class LightGBMPredictor(BoosterPredictor):
+    """LightGBM binary booster, stored in LightGBM's text model format."""
+
+    kind = "lightgbm"
+
+    def predict_proba(self, X):
+        return self.booster.predict(np.asarray(X, dtype=np.float64))
+
+    @property
+    def feature_importance(self):
+        return self.booster.feature_importance(importance_type="gain")
+
+    def to_bytes(self):
+        return self.booster.model_to_string().encode()
+
+    @classmethod
+    def from_bytes(cls, data):
+        import lightgbm as lgb
+
+        booster = lgb.Booster(model_str=data.decode())
+        return cls(booster, booster.feature_name())
+
+
+class XGBoostPredictor(BoosterPredictor):
+    """XGBoost binary:logistic booster, stored in XGBoost's JSON model format."""
+
+    kind = "xgboost"
+
+    def predict_proba(self, X):
+        # inplace_predict skips the DMatrix construction, which dominates small batches
+        return self.booster.inplace_predict(np.asarray(X, dtype=np.float64))
+
+    @property
+    def feature_importance(self):
+        gain = self.booster.get_score(importance_type="total_gain")
+        return np.array([gain.get(name, 0.0) for name in self.feature_names])
+
+    def to_bytes(self):
+        return bytes(self.booster.save_raw("json"))
+
+    @classmethod
+    def from_bytes(cls, data):
+        import xgboost as xgb
+
+        booster = xgb.Booster()
+        booster.load_model(bytearray(data))
+        return cls(booster, booster.feature_names)
+
+
+# kind -> (predictor class, artifact file name in a registry version directory)
+PREDICTOR_TYPES = {
+    ScoringKernel.kind: (ScoringKernel, "win_kernel.json"),
+    LightGBMPredictor.kind: (LightGBMPredictor, "lightgbm_model.txt"),
+    XGBoostPredictor.kind: (XGBoostPredictor, "xgboost_model.json"),
+}
+
+
+def artifact_file(predictor):
+    return PREDICTOR_TYPES[predictor.kind][1]
+
+
+def load_predictor(directory):
+    """Load the predictor stored in a directory, whichever family its artifact belongs to."""
+    directory = Path(directory)
+    for predictor_class, file_name in PREDICTOR_TYPES.values():
+        if (directory / file_name).exists():
+            return predictor_class.load(directory / file_name)
+    raise FileNotFoundError(f"No model artifact in {directory}")
@@ -0,0 +1,107 @@
+"""
+Atomic publication of pipeline output tables.
+
+An output table is never emptied and refilled in place. The new rows are
+written to a fresh staging copy named for this run
+(<table>_staging_<pid>_<random>, so concurrent publishers never touch each
+other's rows; the last swap wins), and the staging table is swapped in with a single short transaction: drop the live table, rename
+the staging table, recreate its indexes and record a new publication
+version in the publications table. In WAL mode readers never wait on the
+writer and see either the previous complete table or the new one.
+
+Readers that need the version and the rows to agree open a snapshot
+(snapshot_session), so both are read from the same database state.
+"""
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import MetaData, func, select
+
+from utils.db import SessionLocal, engine
+from utils.models import Publication
+
+STAGING_SUFFIX = "_staging"
+
+# Rows per executemany into the staging table
+INSERT_CHUNK_SIZE = 50_000
+
+
+def staging_table(model):
+    """
+    Copy of a model's table under a name unique to this run,
+    <table>_staging_<pid>_<random>, without indexes (they are rebuilt on swap).
+    """
+    name = f"{model.__tablename__}{STAGING_SUFFIX}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+    table = model.__table__.to_metadata(MetaData(), name=name)
+    table.indexes.clear()
+    return table
+
+
+def record_publication(conn, table_name, rows):
+    """Append the next version of table_name to publications (in the caller's transaction)."""
+    version = conn.execute(
+        select(func.coalesce(func.max(Publication.version), 0) + 1)
+        .where(Publication.table_name == table_name)
+    ).scalar()
+    conn.execute(Publication.__table__.insert().values(
+        table_name=table_name, version=version, rows=rows, published_at=datetime.now()))
+    return version
+
+
+def publish_rows(model, rows, chunk_size=INSERT_CHUNK_SIZE):
+    """
+    Replace the content of model's table with rows (a list of column dicts)
+    via a staging table and an atomic swap. Returns the publication version.
+    """
+    live_name = model.__tablename__
+    staging = staging_table(model)
+
+    # Build the staging copy; its name is this run's own, so no other writer touches it
+    with engine.begin() as conn:
+        staging.create(conn)
+    try:
+        for start in range(0, len(rows), chunk_size):
+            with engine.begin() as conn:
+                conn.execute(staging.insert(), rows[start:start + chunk_size])
+
+        # Swap: DDL is not transactional under pysqlite's implicit BEGIN, so begin explicitly
+        with engine.connect() as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                conn.exec_driver_sql(f"DROP TABLE IF EXISTS {live_name}")
+                conn.exec_driver_sql(f"ALTER TABLE {staging.name} RENAME TO {live_name}")
+                for index in model.__table__.indexes:
+                    index.create(conn)
+                version = record_publication(conn, live_name, len(rows))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    except Exception:
+        # Renamed only on a committed swap; otherwise the staging copy is ours to drop
+        with engine.begin() as conn:
+            staging.drop(conn, checkfirst=True)
+        raise
+    return version
+
+
+def publication_version(db, table_name):
+    """Latest published version of a table, or None if it was never published."""
+    return db.execute(
+        select(func.max(Publication.version)).where(Publication.table_name == table_name)
+    ).scalar()
+
+
+@contextmanager
+def snapshot_session():
+    """Session whose queries all read one consistent database snapshot."""
+    db = SessionLocal()
+    try:
+        # pysqlite does not begin transactions for SELECTs; an explicit read
+        # transaction pins the snapshot until the session is closed
+        db.connection().exec_driver_sql("BEGIN")
+        yield db
+    finally:
+        db.close()
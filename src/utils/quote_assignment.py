@@ -0,0 +1,434 @@
+"""
+Constrained assignment of quotes to client requests.
+
+The greedy rule gives every client request its highest-scoring quote,
+which can pile any number of orders onto one supplier. With supplier
+limits the selection is solved as an assignment problem instead:
+
+    maximize    total final_score of the chosen quotes
+    subject to  at most one quote per client request
+                at most limit[s] chosen quotes per supplier s
+
+where limit[s] is the smaller of the supplier's capacity and
+max_share * (number of client requests). Requests are served first:
+leaving one without a quote costs more than any gain in score elsewhere,
+so a request only stays unassigned when all its suppliers are full.
+Deadline feasibility is a filter on the candidates (see
+optimize_quotes_profit), applied before this solver runs.
+
+This is a transportation problem (a min-cost flow from requests to
+suppliers). It is solved in two steps:
+
+1. An auction (Bertsekas) prices the limited suppliers. Requests bid for
+   their best supplier at the current prices, in vectorized rounds, until
+   every request holds a slot or is worth nothing anywhere; suppliers left
+   with vacant slots then lower their prices to draw requests back
+   (reverse auction). The prices end up within epsilon of the optimal dual
+   prices (epsilon-complementary slackness). When some requests must stay
+   unserved (a maximum flow tells), the step starts at the score range and
+   shrinks phase by phase (epsilon scaling).
+2. Arc fixing (Goldberg and Tarjan): a quote whose value at these prices
+   falls short of its request's best option by more than the longest
+   cycle of the request-supplier graph times epsilon is not chosen by any
+   optimal assignment. Requests left with a single option get it; the few
+   with a choice between near-equivalent options are solved exactly as a
+   sparse LP per connected component (scipy linprog, HiGHS).
+
+The constraint matrix is the incidence matrix of a bipartite graph, so
+the LP already has an integral optimum. When the greedy pick respects
+every limit it is optimal and is used as is.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+from scipy.sparse.csgraph import connected_components, maximum_flow
+
+# Integrality tolerance on the LP solution (a vertex of the relaxation is 0/1)
+INTEGRALITY_TOL = 1e-6
+
+# Width of the near-tie band solved exactly by LP after the auction, as a
+# share of the score range; the auction step epsilon is derived from it
+ARC_FIXING_WIDTH = 1e-3
+
+# Step reduction between auction phases (epsilon scaling)
+EPSILON_SCALING = 8.0
+
+
+def supplier_limits(supplier_ids, capacity=None, max_share=None, n_requests=0):
+    """
+    Maximum number of requests per supplier, aligned with supplier_ids
+    (inf: unlimited). capacity maps supplier_id -> max requests; suppliers
+    missing from it are unlimited. max_share caps every supplier at that
+    share of n_requests (at least one request).
+    """
+    limit = np.full(len(supplier_ids), np.inf)
+    if capacity:
+        limit = pd.Series(capacity, dtype="float64").reindex(supplier_ids).fillna(np.inf).to_numpy()
+    if max_share is not None:
+        limit = np.minimum(limit, max(1, math.floor(max_share * n_requests)))
+    return limit
+
+
+def best_per_request(request_codes, scores, n_requests, allowed=None):
+    """
+    Position of the highest-scoring allowed candidate of every request
+    (codes 0..n_requests-1), or -1 if it has none. Ties go to the first
+    position, as with groupby().idxmax().
+    """
+    masked = scores if allowed is None else np.where(allowed, scores, -np.inf)
+    order = np.lexsort((-masked, request_codes))
+    firsts = order[np.flatnonzero(np.r_[True, np.diff(request_codes[order]) != 0])]
+    best = np.full(n_requests, -1)
+    found = np.isfinite(masked[firsts])
+    best[request_codes[firsts[found]]] = firsts[found]
+    return best
+
+
+def servable_requests(request_codes, supplier_codes, limit):
+    """
+    Most requests that can be served at once under the supplier limits (a
+    maximum flow from the requests through their suppliers).
+    """
+    n_requests, n_suppliers = request_codes.max() + 1, len(limit)
+    source, sink = 0, n_requests + n_suppliers + 1
+    tails = np.r_[np.zeros(n_requests, dtype=int), 1 + request_codes, 1 + n_requests + np.arange(n_suppliers)]
+    heads = np.r_[1 + np.arange(n_requests), 1 + n_requests + supplier_codes, np.full(n_suppliers, sink)]
+    capacities = np.r_[np.ones(n_requests + len(request_codes)), np.minimum(limit, n_requests)]
+    graph = sp.csr_matrix((capacities.astype(np.int32), (tails, heads)), shape=(sink + 1,) * 2)
+    graph.sum_duplicates()
+    return maximum_flow(graph, source, sink).flow_value
+
+
+def solve_component(scores, rows, suppliers, fallback_scores, limits):
+    """
+    Solve one component: candidate i belongs to request rows[i] and
+    supplier suppliers[i] (both 0-based within the component) and scores
+    above its request's fallback (fallback_scores[r], -inf for none).
+    Returns a boolean mask of the chosen candidates.
+    """
+    n_candidates, n_rows = len(scores), len(fallback_scores)
+    # Unserved requests score so low that serving one more always pays off
+    span = np.ptp(np.r_[scores, fallback_scores[np.isfinite(fallback_scores)]]) + 1.0
+    unserved = scores.min() - span * (n_rows + 1)
+    fallback_scores = np.where(np.isfinite(fallback_scores), fallback_scores, unserved)
+
+    # Maximize the gain over the fallbacks: at most one candidate per request,
+    # at most limits[s] per supplier
+    gain = scores - fallback_scores[rows]
+    columns = np.arange(n_candidates)
+    constraints = sp.vstack([
+        sp.csr_matrix((np.ones(n_candidates), (rows, columns)), shape=(n_rows, n_candidates)),
+        sp.csr_matrix((np.ones(n_candidates), (suppliers, columns)), shape=(len(limits), n_candidates)),
+    ]).tocsr()
+    upper = np.r_[np.ones(n_rows), limits]
+
+    result = linprog(-gain, A_ub=constraints, b_ub=upper, bounds=(0, None), method="highs-ipm")
+    if result.status != 0:
+        raise RuntimeError(f"Assignment LP failed: {result.message}")
+    x = result.x
+    if np.abs(x - np.round(x)).max() > INTEGRALITY_TOL:
+        # Not a vertex (numerical trouble): solve the same problem as a MILP
+        result = milp(-gain, constraints=LinearConstraint(constraints, -np.inf, upper),
+                      integrality=np.ones(n_candidates), bounds=Bounds(0, 1))
+        if result.x is None:
+            raise RuntimeError(f"Assignment MILP failed: {result.message}")
+        x = result.x
+    return x > 0.5
+
+
+def solve_contested(scores, request_codes, supplier_codes, contested, fallback, limit):
+    """
+    Best choice of the requests with contested candidates (candidates at a
+    limited supplier scoring above the request's fallback). Returns
+    (request codes, chosen positions), -1 where the request keeps its fallback.
+    """
+    positions = np.flatnonzero(contested)
+    requests, rows = np.unique(request_codes[positions], return_inverse=True)
+    suppliers, columns = np.unique(supplier_codes[positions], return_inverse=True)
+    fallback_scores = np.where(fallback[requests] >= 0, scores[fallback[requests]], -np.inf)
+
+    # Independent components of the request-supplier graph are solved separately
+    n_rows = len(requests)
+    graph = sp.csr_matrix((np.ones(len(positions)), (rows, n_rows + columns)),
+                          shape=(n_rows + len(suppliers),) * 2)
+    _, labels = connected_components(graph, directed=False)
+
+    choice = np.full(n_rows, -1)
+    by_component = np.argsort(labels[rows], kind="stable")
+    bounds = np.flatnonzero(np.r_[True, np.diff(labels[rows][by_component]) != 0, True])
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        members = by_component[start:end]
+        component_rows, local_rows = np.unique(rows[members], return_inverse=True)
+        component_suppliers, local_suppliers = np.unique(columns[members], return_inverse=True)
+        picked = solve_component(scores[positions[members]], local_rows, local_suppliers,
+                                 fallback_scores[component_rows], limit[suppliers[component_suppliers]])
+        choice[rows[members[picked]]] = positions[members[picked]]
+    return requests, choice
+
+
+class Auction:
+    """
+    Forward and reverse auction (Bertsekas) of supplier slots to requests,
+    over request-sorted candidates: request i owns positions
+    starts[i]:starts[i + 1], each at supplier suppliers[p] and worth
+    weights[p]. A supplier has limit[s] identical slots (inf: unlimited,
+    always free). A full supplier is priced at its lowest held bid; one
+    with a vacant slot keeps its price until the reverse auction lowers it.
+    """
+
+    def __init__(self, starts, suppliers, weights, limit):
+        self.starts, self.suppliers, self.weights, self.limit = starts, suppliers, weights, limit
+        n_requests, n_suppliers = len(starts) - 1, len(limit)
+        self.limited = np.isfinite(limit)
+        # Request of each position, and the positions grouped by supplier
+        self.owner = np.repeat(np.arange(n_requests), np.diff(starts))
+        self.by_supplier = np.argsort(suppliers, kind="stable")
+        self.supplier_starts = np.r_[0, np.cumsum(np.bincount(suppliers, minlength=n_suppliers))]
+        # Position of the quote each request holds (-1: none) and the bid it holds it with
+        self.held = np.full(n_requests, -1)
+        self.held_bid = np.zeros(n_requests)
+        self.load = np.zeros(n_suppliers)
+        # Suppliers without capacity are out of reach
+        self.prices = np.where(limit > 0, 0.0, np.inf)
+
+    def solve(self, epsilon, start_epsilon):
+        """
+        Prices in epsilon-complementary slackness with the assignment: every
+        request holds an option within epsilon of its best one at these
+        prices, and a supplier with a vacant slot is priced at 0. The step
+        starts at start_epsilon and is divided by EPSILON_SCALING each time
+        no request is further than the step from its best; the requests that
+        are then move on, the others keep their slots.
+        """
+        step = max(start_epsilon, epsilon)
+        bidders = np.arange(len(self.held))
+        while True:
+            self.bid(bidders, step)
+            self.reverse_bid(step)
+            if step <= epsilon:
+                return self.prices
+            step = max(step / EPSILON_SCALING, epsilon)
+            bidders = self.violations(step)
+            self.release(bidders)
+
+    def reverse_bid(self, epsilon):
+        """
+        Reverse auction of the vacant slots left by the requests that moved
+        on: a supplier with v vacant slots and a positive price drops it to
+        epsilon below the gain of the (v + 1)-th request it draws most (weight
+        minus what the request holds now), or to 0, and takes the requests
+        ranked above (a request drawn to several goes where it gains most).
+        """
+        while True:
+            vacant = (self.load < self.limit) & (self.prices > 0)
+            if not vacant.any():
+                return
+            # Candidates of the vacant suppliers, but the slots they hold there
+            vacant_suppliers = np.flatnonzero(vacant)
+            counts = self.supplier_starts[vacant_suppliers + 1] - self.supplier_starts[vacant_suppliers]
+            first = np.r_[0, np.cumsum(counts)[:-1]]
+            positions = self.by_supplier[np.repeat(self.supplier_starts[vacant_suppliers] - first, counts)
+                                         + np.arange(counts.sum())]
+            positions = positions[self.held[self.owner[positions]] != positions]
+            requests, supplier = self.owner[positions], self.suppliers[positions]
+            self.settle_bids(requests)
+            gain = self.weights[positions] - self.held_value()[requests]
+            # Only a request that gains from a slot can set its price or take it
+            drawn = gain > 0
+            positions, requests, supplier, gain = positions[drawn], requests[drawn], supplier[drawn], gain[drawn]
+            order = np.lexsort((-gain, supplier))
+            positions, requests, supplier, gain = positions[order], requests[order], supplier[order], gain[order]
+            group_start = np.flatnonzero(np.diff(supplier, prepend=-1) != 0)
+            sizes = np.diff(np.r_[group_start, len(supplier)])
+            rank = np.arange(len(supplier)) - np.repeat(group_start, sizes)
+
+            slots = self.limit - self.load
+            touched = supplier[group_start]
+            price = np.zeros(len(self.limit))
+            beyond = slots[touched] < sizes
+            price[touched[beyond]] = gain[group_start[beyond] + slots[touched[beyond]].astype(int)] - epsilon
+            self.prices[vacant] = np.maximum(price[vacant], 0.0)
+
+            # Gains against the new prices of the slots the requests hold
+            self.settle_bids(requests)
+            gain = self.weights[positions] - self.held_value()[requests]
+            surplus = gain - self.prices[supplier]
+            taken = np.flatnonzero((rank < slots[supplier]) & (surplus > 0))
+            taken = taken[np.lexsort((-surplus[taken], requests[taken]))]
+            taken = taken[np.diff(requests[taken], prepend=-1) != 0]
+
+            self.release(requests[taken])
+            self.held[requests[taken]] = positions[taken]
+            self.held_bid[requests[taken]] = self.prices[supplier[taken]]
+            np.add.at(self.load, supplier[taken], 1)
+
+    def settle_bids(self, requests):
+        """The bids of requests come down to the price of the supplier they hold."""
+        requests = requests[self.held[requests] >= 0]
+        held_price = self.prices[self.suppliers[self.held[requests]]]
+        self.held_bid[requests] = np.minimum(self.held_bid[requests], held_price)
+
+    def held_value(self):
+        """
+        Value of what every request holds (0: nothing) at the price it bid,
+        the most its supplier's price can rise to while it holds the slot.
+        """
+        return np.where(self.held >= 0, self.weights[self.held] - self.held_bid, 0.0)
+
+    def violations(self, epsilon):
+        """Requests whose held option (or staying unserved) is more than epsilon below their best."""
+        held_value = self.held_value()
+        value = self.weights - self.prices[self.suppliers]
+        holding = np.flatnonzero(self.held >= 0)
+        value[self.held[holding]] = held_value[holding]
+        best = np.maximum(np.maximum.reduceat(value, self.starts[:-1]), 0.0)
+        return np.flatnonzero(best - held_value > epsilon)
+
+    def release(self, requests):
+        """Free the slots of requests (a freed slot keeps its supplier's price)."""
+        positions = self.held[requests]
+        freed = self.suppliers[positions[positions >= 0]]
+        np.subtract.at(self.load, freed[self.limited[freed]], 1)
+        self.held[requests] = -1
+
+    def bid(self, bidders, epsilon):
+        """
+        Bidding rounds until every bidder holds a slot or is worth nothing
+        anywhere. A bidder offers its best supplier's price plus its margin
+        over its second best option (or over staying unserved) plus epsilon;
+        a full supplier keeps its highest bids (new bids lose ties).
+        """
+        suppliers, limit = self.suppliers, self.limit
+        n_suppliers = len(limit)
+        while len(bidders):
+            # Every bidder's candidates, one segment per bidder
+            counts = self.starts[bidders + 1] - self.starts[bidders]
+            first = np.r_[0, np.cumsum(counts)[:-1]]
+            positions = np.repeat(self.starts[bidders] - first, counts) + np.arange(counts.sum())
+            value = self.weights[positions] - self.prices[suppliers[positions]]
+            best = np.maximum.reduceat(value, first)
+            owner = np.repeat(np.arange(len(bidders)), counts)
+            ties = np.flatnonzero(value == best[owner])
+            best_at = ties[np.r_[True, np.diff(owner[ties]) != 0]]
+            value[best_at] = -np.inf
+            second = np.maximum(np.maximum.reduceat(value, first), 0.0)  # 0: stay unserved
+
+            # Requests worth nothing anywhere stay unserved; unlimited suppliers take everyone
+            choice = positions[best_at]
+            target = suppliers[choice]
+            unlimited = (best >= 0) & ~self.limited[target]
+            self.held[bidders[unlimited]] = choice[unlimited]
+            self.held_bid[bidders[unlimited]] = 0.0
+            bidding = (best >= 0) & self.limited[target]
+            bidders, choice, target = bidders[bidding], choice[bidding], target[bidding]
+            if not len(bidders):
+                break
+            offers = self.prices[target] + best[bidding] - second[bidding] + epsilon
+
+            # Only holders bidding no more than the best new offer can lose their slot
+            top_offer = np.full(n_suppliers, -np.inf)
+            np.maximum.at(top_offer, target, offers)
+            holding = self.held >= 0
+            contenders = np.flatnonzero(holding)
+            contenders = contenders[self.held_bid[contenders] <= top_offer[suppliers[self.held[contenders]]]]
+            entrants = np.r_[contenders, bidders]
+            entrant_position = np.r_[self.held[contenders], choice]
+            entrant_bid = np.r_[self.held_bid[contenders], offers]
+            is_holder = np.r_[np.ones(len(contenders), dtype=bool), np.zeros(len(bidders), dtype=bool)]
+            entrant_supplier = suppliers[entrant_position]
+            order = np.lexsort((is_holder, entrant_bid, entrant_supplier))
+            entrants, entrant_position = entrants[order], entrant_position[order]
+            entrant_bid, entrant_supplier = entrant_bid[order], entrant_supplier[order]
+
+            # Each supplier drops its lowest bids beyond its limit
+            arriving = np.bincount(target, minlength=n_suppliers)
+            excess = np.maximum(self.load + arriving - limit, 0)
+            group_start = np.flatnonzero(np.r_[True, np.diff(entrant_supplier) != 0])
+            sizes = np.diff(np.r_[group_start, len(entrants)])
+            rank = np.arange(len(entrants)) - np.repeat(group_start, sizes)
+            outbid = rank < excess[entrant_supplier]
+
+            winners = entrants[~outbid]
+            self.held[winners] = entrant_position[~outbid]
+            self.held_bid[winners] = entrant_bid[~outbid]
+            bidders = entrants[outbid]
+            self.held[bidders] = -1
+
+            # A full supplier is priced at its lowest remaining bid, the first one
+            # not outbid; a vacant slot goes for the supplier's price
+            touched = entrant_supplier[group_start]
+            self.load[touched] += arriving[touched] - excess[touched]
+            full = self.load[touched] >= limit[touched]
+            self.prices[touched[full]] = entrant_bid[group_start[full] + excess[touched[full]].astype(int)]
+            vacant = ~full[np.repeat(np.arange(len(touched)), sizes)] & ~outbid
+            self.held_bid[entrants[vacant]] = self.prices[entrant_supplier[vacant]]
+
+
+def assign_quotes(candidates, capacity=None, max_share=None, total_requests=None):
+    """
+    Choose at most one quote per client request under supplier limits.
+
+    candidates needs client_request_id, supplier_id and final_score
+    columns. capacity maps supplier_id -> max requests (missing: unlimited);
+    max_share caps each supplier at that share of total_requests, all the
+    client requests (default: those with a candidate; pass the total when
+    some were filtered out, e.g. with no on-time quote). Returns the chosen
+    rows of candidates; requests whose suppliers are all full are left out.
+    """
+    request_codes, request_ids = pd.factorize(candidates["client_request_id"])
+    supplier_codes, supplier_ids = pd.factorize(candidates["supplier_id"])
+    scores = candidates["final_score"].to_numpy(dtype=np.float64)
+    n_requests, n_suppliers = len(request_ids), len(supplier_ids)
+
+    limit = supplier_limits(supplier_ids, capacity, max_share,
+                            n_requests if total_requests is None else total_requests)
+    best = best_per_request(request_codes, scores, n_requests)
+    load = np.bincount(supplier_codes[best[best >= 0]], minlength=n_suppliers)
+    if (load <= limit).all():
+        return candidates.iloc[best[best >= 0]]
+
+    # Auction on the request-sorted candidates. Serving one more request is
+    # worth more than any score difference
+    order = np.argsort(request_codes, kind="stable")
+    starts = np.r_[0, np.cumsum(np.bincount(request_codes, minlength=n_requests))]
+    scale = np.ptp(scores) or 1.0
+    # An augmenting path reassigns at most one request per supplier
+    served_bonus = scale * (n_suppliers + 1)
+    weights = scores[order] - scores.min() + served_bonus
+    # A simple cycle alternates requests with suppliers (or "unserved")
+    cycle = 2 * (n_suppliers + 2)
+    epsilon = ARC_FIXING_WIDTH * scale / cycle
+    # Requests that must stay unserved drive prices up to the bonus, one step
+    # at a time: that takes epsilon scaling from a step of the score range
+    start = scale if servable_requests(request_codes, supplier_codes, limit) < n_requests else epsilon
+    prices = Auction(starts, supplier_codes[order], weights, limit).solve(epsilon, start)
+
+    # Arc fixing: options further than the band below their request's best
+    # option (at the auction prices) are unused by every optimal assignment
+    value = weights - prices[supplier_codes[order]]
+    best_value = np.maximum(np.maximum.reduceat(value, starts[:-1]), 0.0)
+    band = (cycle + 1) * epsilon
+    kept = np.empty(len(scores), dtype=bool)
+    kept[order] = value >= np.repeat(best_value, np.diff(starts)) - band
+    options = np.bincount(request_codes[kept], minlength=n_requests) + (best_value <= band)
+
+    # Requests with a single option take it; the others are solved exactly
+    settled = options[request_codes] == 1
+    chosen = best_per_request(request_codes, scores, n_requests, kept & settled)
+    fixed_load = np.bincount(supplier_codes[chosen[chosen >= 0]], minlength=n_suppliers)
+    open_ = kept & ~settled
+    at_limited = np.isfinite(limit)[supplier_codes]
+    fallback = best_per_request(request_codes, scores, n_requests, open_ & ~at_limited)
+    fallback_scores = np.where(fallback >= 0, scores[fallback], -np.inf)
+    contested = open_ & at_limited & (scores > fallback_scores[request_codes])
+    open_requests = np.unique(request_codes[open_])
+    chosen[open_requests] = fallback[open_requests]
+    if contested.any():
+        requests, choice = solve_contested(scores, request_codes, supplier_codes, contested, fallback,
+                                           limit - fixed_load)
+        # A request the LP left on its fallback keeps it (or stays unassigned)
+        chosen[requests] = np.where(choice >= 0, choice, fallback[requests])
+    return candidates.iloc[np.sort(chosen[chosen >= 0])]
@@ -1,68 +1,94 @@
-from pathlib import Path
 import pandas as pd
-import numpy as np
-import sqlite3
-import joblib
-import os
+from sqlalchemy import text
 
-from utils.paths import DB_PATH 
-
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-MODEL_PATH = BASE_DIR / "models" / "best_logistic_model.pkl"
-SCALER_PATH = BASE_DIR / "models" / "minmax_scaler.pkl"
-
-# === Load model and scaler ===
-model = joblib.load(MODEL_PATH)
-scaler = joblib.load(SCALER_PATH)
+from utils.db import engine
+from utils.model_registry import HotModel, ShadowScorer
 
 # === Define expected columns ===
 binary_columns = ['is_urgent', 'is_custom']
 non_binary_columns = ['unit_price', 'delivery_days', 'performance_score', 'response_time', 'rfq_complexity_score']
 feature_columns =  non_binary_columns + binary_columns
 
-# === Connect to database ===
-conn = sqlite3.connect(DB_PATH) 
-
-# === Load table ===
-df_all = pd.read_sql_query("SELECT * FROM real_quotation_data", conn)
-#df_all.drop(columns=['id'], inplace=True)
-
-# === Filter only new rows (not yet scored) ===
-df_new = df_all[df_all['won'].isnull()].copy()
-
-# If no new data, stop early
-if df_new.empty:
-    print("✅ No new data to process.")
-    conn.close()
-    exit()
-
-# === Basic validation ===
-for col in feature_columns:
-    if col not in df_new.columns:
-        raise ValueError(f"Missing expected column: {col}")
-
-# Handle unexpected data types or missing values
-df_new = df_new[feature_columns].copy()
-
-# Fill any missing values with safe defaults (optional tuning)
-df_new[non_binary_columns] = df_new[non_binary_columns].fillna(0)
-df_new[binary_columns] = df_new[binary_columns].fillna(0).astype(int)
-
-# === Scale non-binary columns ===
-X_new_scaled = df_new.copy()
-X_new_scaled[non_binary_columns] = scaler.transform(df_new[non_binary_columns])
-
-# === Predict probabilities ===
-X_input = X_new_scaled[feature_columns]
-acceptance_probs = model.predict_proba(X_input)[:, 1]
-
-# === Insert predictions back into df_all ===
-df_all.loc[df_all['won'].isnull(), 'won'] = acceptance_probs
-
-# === Save updated table ===
-df_all[["id", "won", "performance_score"]].to_sql("quote_scores", conn, if_exists="append", index=False)
-conn.close()
-
-print("✅ Scoring pipeline completed and database updated.")
-
+# Rows scored per read/predict/write round; memory stays constant in the table size
+CHUNK_SIZE = 50_000
+
+# Compiled quotes without a score, in quotation id order after the given id.
+# quote_scores is keyed by the quotation response id, so the anti-join is an
+# index probe per row; after_id only pages through one run, it is not a
+# watermark, so quotes compiled late (below scored ids) are still scored.
+UNSCORED_SQL = text(f"""
+SELECT rq.quotation_response_id, {', '.join(f'rq.{col}' for col in feature_columns)}
+FROM real_quotation_data rq
+WHERE rq.quotation_response_id > :after_id
+  AND NOT EXISTS (SELECT 1 FROM quote_scores qs WHERE qs.id = rq.quotation_response_id)
+ORDER BY rq.quotation_response_id
+LIMIT :limit
+""")
+
+UPSERT_SQL = """
+INSERT INTO quote_scores (id, won, performance_score) VALUES (?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET won = excluded.won, performance_score = excluded.performance_score
+"""
+
+def prepare_features(df):
+    """Validate and clean a chunk of compiled quotes into the model's feature frame."""
+    for col in feature_columns:
+        if col not in df.columns:
+            raise ValueError(f"Missing expected column: {col}")
+
+    X = df[feature_columns].copy()
+    # Fill any missing values with safe defaults (optional tuning)
+    X[non_binary_columns] = X[non_binary_columns].fillna(0)
+    X[binary_columns] = X[binary_columns].fillna(0).astype(int)
+    return X
+
+def score_new_quotes(chunk_size=CHUNK_SIZE):
+    """
+    Score every compiled quote that has no entry in quote_scores yet.
+
+    Unscored rows are selected in SQL and streamed in fixed-size chunks
+    through the CURRENT registry model (any utils.predictors family); each chunk is upserted into quote_scores
+    keyed by quotation response id, so reruns never duplicate rows.
+    If a CANDIDATE model is set, every chunk is also shadow-scored in the
+    background and the disagreement logged to shadow_score_log.
+    Returns the number of quotes scored.
+    """
+    # === Load the current model; one run scores with one version ===
+    version, predictor = HotModel().get()
+    if predictor is None:
+        raise FileNotFoundError("No trained model: run training_lr_model.py first")
+    shadow = ShadowScorer("batch_scoring")
+
+    scored = 0
+    try:
+        with engine.connect() as conn:
+            after_id = 0
+            while True:
+                chunk = pd.read_sql(UNSCORED_SQL, conn, params={"after_id": after_id, "limit": chunk_size})
+                if chunk.empty:
+                    break
+
+                X = prepare_features(chunk)[predictor.feature_names].to_numpy(dtype=float)
+                acceptance_probs = predictor.predict_proba(X)
+                shadow.submit(X, version, acceptance_probs)
+
+                conn.exec_driver_sql(UPSERT_SQL, list(zip(
+                    chunk["quotation_response_id"].tolist(),
+                    acceptance_probs.tolist(),
+                    chunk["performance_score"].tolist(),
+                )))
+                conn.commit()
+
+                scored += len(chunk)
+                after_id = int(chunk["quotation_response_id"].iloc[-1])
+    finally:
+        shadow.close()
+
+    if scored == 0:
+        print("✅ No new data to process.")
+    else:
+        print(f"✅ Scoring pipeline completed: {scored} quotes scored with model {version}.")
+    return scored
+
+if __name__ == "__main__":
+    score_new_quotes()
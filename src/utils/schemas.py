@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
-from datetime import date
+from typing import List, Optional
+from datetime import date, datetime
 
 class ClientRequestSchema(BaseModel):
     customer_id: str
@@ -16,4 +16,29 @@ class ClientRequestSchema(BaseModel):
 
     # orm_mode = True allows FastAPI to automatically convert SQLAlchemy objects into Pydantic responses.
     class Config:
-        from_attributes = True # orm_mode has been renamed to from_attributes
\ No newline at end of file
+        from_attributes = True # orm_mode has been renamed to from_attributes
+
+
+class ClientRequestPage(BaseModel):
+    items: List[ClientRequestSchema]
+    next_cursor: Optional[int] = None  # None once the end of the feed is reached
+
+
+# Client requests as stored in the client_requests table
+class StoredClientRequestSchema(BaseModel):
+    id: int
+    customer_id: Optional[str] = None
+    product_type: Optional[str] = None
+    specifications: Optional[str] = None
+    color_spec: Optional[str] = None
+    quantity: Optional[int] = None
+    deadline: Optional[datetime] = None
+    is_custom: Optional[bool] = None
+
+    class Config:
+        from_attributes = True
+
+
+class StoredClientRequestPage(BaseModel):
+    items: List[StoredClientRequestSchema]
+    next_cursor: Optional[int] = None  # pass as after_id to get the next page
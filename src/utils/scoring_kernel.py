@@ -0,0 +1,133 @@
+"""
+Dependency-free win-probability scoring kernel.
+
+The trained model is a MinMaxScaler on the non-binary features followed by
+a LogisticRegression, i.e. an affine transform and a sigmoid. Fusing the
+scaler into the coefficients gives a single weight vector over the raw
+features:
+
+    z = sum_i coef_i * (x_i * scale_i + min_i) + b
+      = sum_i (coef_i * scale_i) * x_i + (b + sum_i coef_i * min_i)
+
+The fused weights are written by training_lr_model.export_kernel to a small
+JSON artifact, and ScoringKernel scores with NumPy only, so scoring
+processes never import scikit-learn or unpickle joblib files.
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+KERNEL_PATH = BASE_DIR / "models" / "win_kernel.json"
+
+# Bump when the artifact layout changes; load() refuses other versions
+KERNEL_FORMAT_VERSION = 1
+
+
+def stable_sigmoid(z):
+    """Logistic function without overflow warnings for large |z|."""
+    z = np.asarray(z, dtype=np.float64)
+    out = np.empty_like(z)
+    positive = z >= 0
+    out[positive] = 1.0 / (1.0 + np.exp(-z[positive]))
+    exp_z = np.exp(z[~positive])
+    out[~positive] = exp_z / (1.0 + exp_z)
+    return out
+
+
+class ScoringKernel:
+    """Fused linear scorer: P(won) = sigmoid(X @ coef + intercept) on raw features."""
+
+    # Model family, as in utils.predictors.PREDICTOR_TYPES
+    kind = "linear"
+
+    def __init__(self, feature_names, coef, intercept, input_scale=None, input_offset=None):
+        self.feature_names = list(feature_names)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        # The fused scaler, kept for interpretation (see scaled_coef)
+        n = len(self.feature_names)
+        self.input_scale = np.ones(n) if input_scale is None else np.asarray(input_scale, dtype=np.float64)
+        self.input_offset = np.zeros(n) if input_offset is None else np.asarray(input_offset, dtype=np.float64)
+        if self.coef.shape != (n,):
+            raise ValueError(f"Expected {n} coefficients, got shape {self.coef.shape}")
+
+    @classmethod
+    def from_sklearn(cls, model, scaler, feature_columns, scaled_columns):
+        """
+        Fuse a fitted scaler (applied to scaled_columns) into a fitted binary
+        linear model over feature_columns. Only fitted attributes are read, so
+        this module does not import scikit-learn itself.
+        """
+        scale = np.ones(len(feature_columns))
+        offset = np.zeros(len(feature_columns))
+        for j, col in enumerate(scaled_columns):
+            i = feature_columns.index(col)
+            scale[i] = scaler.scale_[j]
+            offset[i] = scaler.min_[j]
+
+        model_coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+        return cls(
+            feature_columns,
+            coef=model_coef * scale,
+            intercept=float(model.intercept_[0]) + float(model_coef @ offset),
+            input_scale=scale,
+            input_offset=offset,
+        )
+
+    @property
+    def scaled_coef(self):
+        """Coefficients on the scaled features, i.e. the original model's coef_."""
+        return self.coef / self.input_scale
+
+    @property
+    def feature_importance(self):
+        return self.scaled_coef
+
+    def decision_function(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+
+    def predict_proba(self, X):
+        """P(won) for each row of X (raw features in feature_names order)."""
+        return stable_sigmoid(self.decision_function(X))
+
+    def score_frame(self, df):
+        """P(won) for a DataFrame holding the feature columns; missing values count as 0."""
+        X = np.nan_to_num(df[self.feature_names].to_numpy(dtype=np.float64), nan=0.0)
+        return self.predict_proba(X)
+
+    def to_dict(self):
+        return {
+            "format_version": KERNEL_FORMAT_VERSION,
+            "feature_names": self.feature_names,
+            "coef": self.coef.tolist(),
+            "intercept": self.intercept,
+            "input_scale": self.input_scale.tolist(),
+            "input_offset": self.input_offset.tolist(),
+        }
+
+    def fingerprint(self):
+        """Canonical bytes of the artifact (key order fixed), hashed into the registry version."""
+        return json.dumps(self.to_dict(), sort_keys=True).encode()
+
+    def save(self, path=KERNEL_PATH):
+        """Write the artifact atomically (temp file + rename)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=KERNEL_PATH):
+        with open(path) as f:
+            data = json.load(f)
+        version = data.get("format_version")
+        if version != KERNEL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported kernel format version {version} in {path}")
+        return cls(data["feature_names"], data["coef"], data["intercept"],
+                   data.get("input_scale"), data.get("input_offset"))
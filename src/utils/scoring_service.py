@@ -0,0 +1,176 @@
+"""
+Online win-probability scoring service.
+
+Keeps the CURRENT registry model in memory (hot-reloaded when it is
+promoted) and scores quotes as they arrive. Concurrent requests are
+coalesced into micro-batches (up to MAX_BATCH_SIZE rows, waiting at most
+MAX_WAIT_MS for more), so each predictor call is vectorized over many
+requests. When a CANDIDATE model is set, batches are shadow-scored off
+the request path. The service never
+imports scikit-learn (LightGBM/XGBoost only when such a model is served).
+
+Run it next to the CRM API:
+    uvicorn utils.scoring_service:app --port 8001
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List
+
+import numpy as np
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from utils.run_won_scoring import feature_columns
+from utils.model_registry import HotModel, ShadowScorer
+
+MAX_BATCH_SIZE = 256
+# Longest a batch waits for more requests after its first one
+MAX_WAIT_MS = 1.0
+
+
+class QuoteFeatures(BaseModel):
+    unit_price: float
+    delivery_days: float
+    performance_score: float
+    response_time: float
+    rfq_complexity_score: float
+    is_urgent: bool = False
+    is_custom: bool = False
+
+
+class ScoreResponse(BaseModel):
+    won_probability: float
+
+
+class BatchScoreResponse(BaseModel):
+    won_probabilities: List[float]
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent scoring requests into vectorized model calls.
+
+    Each request adds a (rows x features) matrix to the pending batch and
+    awaits its slice of the result. The batch is scored as soon as it holds
+    max_batch_size rows, and at the latest max_wait_ms after its first
+    request. One timer is set per batch, no task or timer per request, and
+    under load the requests that arrive while a batch is being scored form
+    the next one.
+    """
+
+    def __init__(self, predict, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.pending = []
+        self.pending_rows = 0
+        self.flush_handle = None
+        self.stats = {"batches": 0, "rows": 0}
+
+    async def stop(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        for _, future in self.pending:
+            future.cancel()
+        self.pending, self.pending_rows = [], 0
+
+    async def submit(self, rows: np.ndarray) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((rows, future))
+        self.pending_rows += len(rows)
+        if self.pending_rows >= self.max_batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.max_wait, self.flush)
+        return await future
+
+    def flush(self):
+        """Score the pending batch and resolve its requests' futures."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        items, n_rows = self.pending, self.pending_rows
+        self.pending, self.pending_rows = [], 0
+        if not items:
+            return
+
+        try:
+            probs = self.predict(items[0][0] if len(items) == 1 else np.vstack([rows for rows, _ in items]))
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.stats["batches"] += 1
+        self.stats["rows"] += n_rows
+        start = 0
+        for rows, future in items:
+            if not future.done():
+                future.set_result(probs[start:start + len(rows)])
+            start += len(rows)
+
+
+def load_predictor(model: HotModel, shadow: ShadowScorer = None):
+    """Return a function scoring a feature matrix with the model's current version."""
+    def predict(X: np.ndarray) -> np.ndarray:
+        version, predictor = model.get()
+        if predictor is None:
+            raise RuntimeError("No trained model available")
+        if predictor.feature_names != feature_columns:
+            raise ValueError(f"Model features {predictor.feature_names} do not match {feature_columns}")
+        probs = predictor.predict_proba(X)
+        if shadow is not None:
+            shadow.submit(X, version, probs)
+        return probs
+
+    return predict
+
+
+def to_matrix(quotes: List[QuoteFeatures]) -> np.ndarray:
+    return np.array([[getattr(q, col) for col in feature_columns] for q in quotes], dtype=np.float64)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.model = HotModel()
+    app.state.shadow = ShadowScorer("scoring_service")
+    app.state.batcher = MicroBatcher(load_predictor(app.state.model, app.state.shadow))
+    yield
+    await app.state.batcher.stop()
+    app.state.shadow.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.post("/score", response_model=ScoreResponse)
+async def score_quote(quote: QuoteFeatures):
+    """Win probability of a single quote."""
+    probs = await app.state.batcher.submit(to_matrix([quote]))
+    return {"won_probability": float(probs[0])}
+
+
+@app.post("/score/batch", response_model=BatchScoreResponse)
+async def score_quotes(quotes: List[QuoteFeatures]):
+    """Win probabilities of a list of quotes, in request order."""
+    if not quotes:
+        return {"won_probabilities": []}
+    probs = await app.state.batcher.submit(to_matrix(quotes))
+    return {"won_probabilities": probs.tolist()}
+
+
+@app.get("/score/stats")
+async def batching_stats():
+    """Micro-batching counters, loaded model versions and shadow scoring counters."""
+    stats = app.state.batcher.stats
+    mean = stats["rows"] / stats["batches"] if stats["batches"] else 0.0
+    return {
+        **stats,
+        "mean_batch_size": round(mean, 2),
+        "model_version": app.state.model.loaded[0],
+        "candidate_version": app.state.shadow.candidate.loaded[0],
+        "shadow": app.state.shadow.stats,
+    }
@@ -1,7 +1,9 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
-import random
+import numpy as np
+from sqlalchemy import exists, insert, select
 from sqlalchemy.orm import Session
-from utils.models import RFQSent, RFQDetails, ClientRequest, Supplier
+from utils.models import RFQSent, RFQDetails, ClientRequest, Supplier, SupplierProduct
 from utils.db import SessionLocal
 
 # Possible standard RFQ values
@@ -15,49 +17,139 @@ NOTES_OPTIONS = [
     "Let us know about any additional service fees or charges."
 ]
 
-def send_rfqs():
-    db: Session = SessionLocal()
-    client_requests = db.query(ClientRequest).all()
-    suppliers = db.query(Supplier).all()
-
-    rfq_count = 0
-
-    for request in client_requests:
-        for supplier in suppliers:
-            supported = [p.strip() for p in supplier.supported_products.split(",")]
-            if request.product_type not in supported:
-                continue
-
-            rfq = RFQSent(
-                client_request_id=request.id,
-                supplier_id=supplier.id,
-                status="sent",
-                sent_at=datetime.utcnow()
-            )
-            db.add(rfq)
-            db.commit()
-            db.refresh(rfq)
-
-            # Randomize standardized RFQ details
-            rfq_details = RFQDetails(
-                rfq_id=rfq.id,
-                expected_format=random.choice(EXPECTED_FORMAT_OPTIONS),
-                payment_terms=random.choice(PAYMENT_TERMS_OPTIONS),
-                response_deadline=datetime.utcnow() + timedelta(days=random.randint(1, 7)),
-                notes=random.choice(NOTES_OPTIONS),
-                product_type=request.product_type,
-                specifications=request.specifications,
-                color_spec=request.color_spec
-            )
-            db.add(rfq_details)
+# Client requests fanned out per transaction
+REQUEST_CHUNK_SIZE = 1000
+
+def backfill_supplier_products(db: Session):
+    """Populate supplier_products for suppliers that only have the legacy supported_products string."""
+    missing = db.execute(
+        select(Supplier.id, Supplier.supported_products)
+        .where(~exists().where(SupplierProduct.supplier_id == Supplier.id))
+    ).all()
+    rows = [
+        {"supplier_id": supplier_id, "product_type": product}
+        for supplier_id, supported in missing
+        for product in {p.strip() for p in (supported or "").split(",") if p.strip()}
+    ]
+    if rows:
+        db.execute(insert(SupplierProduct), rows)
+        db.commit()
+
+def build_capability_index(db: Session):
+    """Map product_type -> array of supplier ids that support it, built once per run."""
+    backfill_supplier_products(db)
+    index = defaultdict(list)
+    for supplier_id, product_type in db.execute(
+        select(SupplierProduct.supplier_id, SupplierProduct.product_type).order_by(SupplierProduct.supplier_id)
+    ):
+        index[product_type].append(supplier_id)
+    return {product: np.array(ids, dtype=np.int64) for product, ids in index.items()}
+
+def fan_out(requests, capability_index):
+    """Return (request positions, supplier ids) for every request x supporting supplier pair."""
+    positions, supplier_ids = [], []
+    by_product = defaultdict(list)
+    for pos, request in enumerate(requests):
+        by_product[request.product_type].append(pos)
+    for product, request_positions in by_product.items():
+        suppliers = capability_index.get(product)
+        if suppliers is None or len(suppliers) == 0:
+            continue
+        request_positions = np.array(request_positions, dtype=np.int64)
+        positions.append(np.repeat(request_positions, len(suppliers)))
+        supplier_ids.append(np.tile(suppliers, len(request_positions)))
+    if not positions:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(positions), np.concatenate(supplier_ids)
+
+def format_datetime(value: datetime) -> str:
+    """Format a datetime the way SQLAlchemy's SQLite DateTime type stores it."""
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+def send_rfq_chunk(db: Session, requests, capability_index, rng):
+    """Create the RFQs and RFQ details for one chunk of client requests in a single transaction."""
+    positions, supplier_ids = fan_out(requests, capability_index)
+    if len(positions) == 0:
+        return 0
 
-            rfq_count += 1
+    now = datetime.utcnow()
+    conn = db.connection()
+    request_ids = [requests[pos].id for pos in positions.tolist()]
 
+    # RETURNING row order is not guaranteed on SQLite; (client_request_id, supplier_id)
+    # is unique within a chunk, so ids are matched back through it instead
+    returned = conn.execute(
+        insert(RFQSent.__table__).returning(RFQSent.id, RFQSent.client_request_id, RFQSent.supplier_id),
+        [
+            {"client_request_id": request_id, "supplier_id": supplier_id, "status": "sent", "sent_at": now}
+            for request_id, supplier_id in zip(request_ids, supplier_ids.tolist())
+        ],
+    ).all()
+    rfq_id_by_pair = {(request_id, supplier_id): rfq_id for rfq_id, request_id, supplier_id in returned}
+    rfq_ids = [rfq_id_by_pair[pair] for pair in zip(request_ids, supplier_ids.tolist())]
+
+    # Randomize standardized RFQ details for the whole chunk at once
+    n = len(rfq_ids)
+    formats = rng.integers(0, len(EXPECTED_FORMAT_OPTIONS), n).tolist()
+    terms = rng.integers(0, len(PAYMENT_TERMS_OPTIONS), n).tolist()
+    notes = rng.integers(0, len(NOTES_OPTIONS), n).tolist()
+    deadline_days = rng.integers(1, 7, n, endpoint=True).tolist()
+    deadlines = {days: format_datetime(now + timedelta(days=days)) for days in set(deadline_days)}
+
+    columns = ["rfq_id", "expected_format", "payment_terms", "response_deadline", "notes",
+               "product_type", "specifications", "color_spec"]
+    conn.exec_driver_sql(
+        f"INSERT INTO {RFQDetails.__tablename__} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})",
+        [
+            (
+                rfq_id,
+                EXPECTED_FORMAT_OPTIONS[formats[i]],
+                PAYMENT_TERMS_OPTIONS[terms[i]],
+                deadlines[deadline_days[i]],
+                NOTES_OPTIONS[notes[i]],
+                requests[pos].product_type,
+                requests[pos].specifications,
+                requests[pos].color_spec,
+            )
+            for i, (rfq_id, pos) in enumerate(zip(rfq_ids, positions.tolist()))
+        ],
+    )
     db.commit()
-    db.close()
+    return n
+
+def send_rfqs(chunk_size=REQUEST_CHUNK_SIZE):
+    """
+    Send an RFQ to every supplier supporting the product type of each client
+    request that has no RFQs yet. Requests are processed in id-ordered chunks,
+    each chunk written with one bulk RFQ insert (RETURNING ids) and one bulk
+    details insert.
+    """
+    db: Session = SessionLocal()
+    rng = np.random.default_rng()
+    try:
+        capability_index = build_capability_index(db)
+        n_suppliers = db.query(Supplier).count()
+
+        pending = (
+            select(ClientRequest.id, ClientRequest.product_type, ClientRequest.specifications, ClientRequest.color_spec)
+            .where(~exists().where(RFQSent.client_request_id == ClientRequest.id))
+            .order_by(ClientRequest.id)
+            .limit(chunk_size)
+        )
 
-    print(f"{len(client_requests)} RFQs sent to {len(suppliers)} suppliers ({rfq_count} total)")
+        request_count, rfq_count, last_id = 0, 0, 0
+        while True:
+            requests = db.execute(pending.where(ClientRequest.id > last_id)).all()
+            if not requests:
+                break
+            rfq_count += send_rfq_chunk(db, requests, capability_index, rng)
+            request_count += len(requests)
+            last_id = requests[-1].id
+    finally:
+        db.close()
+
+    print(f"{request_count} RFQs sent to {n_suppliers} suppliers ({rfq_count} total)")
 
 if __name__ == "__main__":
     send_rfqs()
-
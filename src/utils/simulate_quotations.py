@@ -1,4 +1,7 @@
 import random
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
 from utils.db import SessionLocal
 from utils.models import ClientRequest, RFQSent, QuotationResponse
 from datetime import datetime
@@ -12,57 +15,95 @@ BASE_PRICE_MATRIX = {
     "Brochure": {"4x4": 11.5, "4x0": 10.5, "Full color": 12.0, "B&W": 10.0},
     "Banner": {"4x4": 13.0, "4x0": 12.0, "Full color": 13.5, "B&W": 11.5},
 }
+DEFAULT_BASE_PRICE = 10.0  # fallback if combination not found
+
+# (product_type, color_spec) -> base price, for vectorized lookups
+BASE_PRICES = pd.Series({
+    (product, color): price
+    for product, colors in BASE_PRICE_MATRIX.items()
+    for color, price in colors.items()
+})
+
+# RFQs quoted per read/insert round (bounds memory for millions of RFQs)
+CHUNK_SIZE = 50_000
 
 def simulate_quotation(product_type, color_spec, quantity, is_custom=False):
     base_price = BASE_PRICE_MATRIX.get(product_type, {}).get(color_spec)
 
     if base_price is None:
-        # fallback if combination not found
-        base_price = 10.0
+        base_price = DEFAULT_BASE_PRICE
 
     multiplier = 1.2 if is_custom else 1.0
     unit_price = round(base_price * random.uniform(0.9, 1.2) * multiplier, 2)
-    
+
     return {
         "unit_price": unit_price,
         "total_price": round(unit_price * quantity, 2),
         "estimated_delivery_days": int(random.randint(3, 10) * multiplier),
     }
 
-def generate_quotations():
-    db = SessionLocal()
-    rfqs = db.query(RFQSent).filter_by(status="sent").all()
+def simulate_quotation_batch(product_type, color_spec, is_custom, rng):
+    """Vectorized simulate_quotation: returns (unit_price, delivery_days) arrays."""
+    keys = pd.MultiIndex.from_arrays([np.asarray(product_type), np.asarray(color_spec)])
+    base_price = BASE_PRICES.reindex(keys).fillna(DEFAULT_BASE_PRICE).to_numpy()
+
+    multiplier = np.where(np.asarray(is_custom, dtype=bool), 1.2, 1.0)
+    unit_price = np.round(base_price * rng.uniform(0.9, 1.2, len(base_price)) * multiplier, 2)
+    delivery_days = (rng.integers(3, 10, len(base_price), endpoint=True) * multiplier).astype(np.int64)
+    return unit_price, delivery_days
 
-    for rfq in rfqs:
-        if db.query(QuotationResponse).filter_by(rfq_id=rfq.id).first():
-            continue
+def unquoted_rfqs_query(after_id, limit):
+    """Sent RFQs without a quotation response (anti-join), with their request attributes."""
+    return (
+        select(
+            RFQSent.id.label("rfq_id"),
+            ClientRequest.product_type,
+            ClientRequest.color_spec,
+            ClientRequest.quantity,
+            ClientRequest.is_custom,
+        )
+        .join(ClientRequest, ClientRequest.id == RFQSent.client_request_id)
+        .outerjoin(QuotationResponse, QuotationResponse.rfq_id == RFQSent.id)
+        .where(RFQSent.status == "sent", QuotationResponse.id.is_(None), RFQSent.id > after_id)
+        .order_by(RFQSent.id)
+        .limit(limit)
+    )
 
-        request = db.query(ClientRequest).filter_by(id=rfq.client_request_id).first()
-        if not request:
-            continue
+def generate_quotations(chunk_size=CHUNK_SIZE):
+    """
+    Simulate a supplier response for every sent RFQ that has none yet.
+    RFQs are read in id-ordered chunks, priced in one vectorized draw per
+    chunk and written with one executemany per chunk.
+    """
+    db = SessionLocal()
+    rng = np.random.default_rng()
+    insert_sql = (f"INSERT INTO {QuotationResponse.__tablename__} "
+                  f"(rfq_id, unit_price, delivery_days, received_at) VALUES (?, ?, ?, ?)")
+    count, last_id = 0, 0
 
-        is_custom = request.is_custom
+    try:
+        while True:
+            conn = db.connection()
+            chunk = pd.read_sql(unquoted_rfqs_query(last_id, chunk_size), conn)
+            if chunk.empty:
+                break
 
-        quote = simulate_quotation(
-            product_type=request.product_type,
-            color_spec=request.color_spec,
-            quantity=request.quantity,
-            is_custom=is_custom
-        )
+            unit_price, delivery_days = simulate_quotation_batch(
+                chunk["product_type"], chunk["color_spec"], chunk["is_custom"].fillna(0), rng
+            )
+            received_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+            conn.exec_driver_sql(insert_sql, list(zip(
+                chunk["rfq_id"].tolist(), unit_price.tolist(), delivery_days.tolist(),
+                [received_at] * len(chunk),
+            )))
+            db.commit()
 
-        quotation = QuotationResponse(
-            rfq_id=rfq.id,
-            unit_price=quote["unit_price"],
-            delivery_days=quote["estimated_delivery_days"],
-            received_at=datetime.now()
-        )
-        
-        db.add(quotation)
+            count += len(chunk)
+            last_id = int(chunk["rfq_id"].iloc[-1])
+    finally:
+        db.close()
 
-    db.commit()
-    db.close()
-    print("Quotations simulated and saved.")
+    print(f"{count} quotations simulated and saved.")
 
 if __name__ == "__main__":
     generate_quotations()
-
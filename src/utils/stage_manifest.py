@@ -0,0 +1,170 @@
+"""
+Fingerprints of pipeline stage inputs and outputs, persisted between runs.
+
+A stage is up to date (and skipped, make-style) when its code, its inputs
+and its outputs all still match what was recorded after its last
+successful run. Fingerprints are cheap: tables use row count, max rowid
+and, for tables whose rows are rewritten in place, a column checksum;
+files use a SHA-256 of their content. The code fingerprint covers the
+module defining the stage function and every utils.* module it imports,
+directly or not. Inputs are fingerprinted before the stage runs, so a
+change made to them while it runs still triggers the next run.
+
+Stages without inputs (data generators) have nothing that could tell
+them apart from a stale run, so they are never skipped.
+"""
+import ast
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import inspect as sa_inspect
+from utils.db import engine
+from utils.paths import PIPELINE_MANIFEST_PATH
+
+# Extra aggregate for tables whose values can change without changing count/max rowid
+TABLE_CHECKSUMS = {
+    "quote_scores": "total(won)",
+    "merged_quotes": "total(ml_score) + total(quotation_response_id)",
+    "selected_quotes": "total(profit_margin) + total(quotation_response_id)",
+    "training_quotations": "total(unit_price) + total(won)",
+}
+
+def table_fingerprint(conn, table):
+    """Row count, max rowid and optional checksum of a table (None if it doesn't exist)."""
+    inspector = sa_inspect(conn)
+    if not inspector.has_table(table):
+        return None
+    checksum = TABLE_CHECKSUMS.get(table, "0")
+    # Views have no rowid; the views this project defines expose an id column instead
+    rowid = "id" if table in inspector.get_view_names() else "rowid"
+    count, max_rowid, total = conn.exec_driver_sql(
+        f"SELECT count(*), max({rowid}), {checksum} FROM {table}"
+    ).one()
+    return [count, max_rowid, total]
+
+def file_fingerprint(path):
+    """SHA-256 of a file's content (None if it doesn't exist)."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Only modules of this package are followed when hashing stage code
+PACKAGE = "utils"
+
+def imported_modules(source):
+    """Names of the PACKAGE modules a source file imports (at any level of nesting)."""
+    names = []
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # "from utils.x import y": y may itself be a module
+            names += [node.module, *(f"{node.module}.{alias.name}" for alias in node.names)]
+    return [name for name in names if name.split(".")[0] == PACKAGE]
+
+def module_sources(module_names):
+    """Source files of the given modules and of all PACKAGE modules they import, transitively."""
+    sources = {}
+    pending = list(module_names)
+    while pending:
+        name = pending.pop()
+        if name in sources:
+            continue
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            spec = None  # an attribute, not a module
+        if spec is None or not (spec.origin or "").endswith(".py"):
+            sources[name] = None
+            continue
+        sources[name] = spec.origin
+        with open(spec.origin, "rb") as f:
+            pending += imported_modules(f.read())
+    return sorted(path for path in set(sources.values()) if path)
+
+def code_fingerprint(funcs):
+    """
+    SHA-256 over the source files of the modules defining the given
+    functions and of the PACKAGE modules they import. functools.partial
+    stages also hash their bound arguments.
+    """
+    digest = hashlib.sha256()
+    modules = []
+    for func in funcs:
+        if isinstance(func, functools.partial):
+            digest.update(repr((func.args, sorted(func.keywords.items()))).encode())
+            func = func.func
+        modules.append(func.__module__)
+    for path in module_sources(modules):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def fingerprint(refs):
+    """Fingerprint a list of table names (str) and file paths (Path)."""
+    result = {}
+    with engine.connect() as conn:
+        for ref in refs:
+            if isinstance(ref, Path):
+                result[f"file:{ref.name}"] = file_fingerprint(ref)
+            else:
+                result[f"table:{ref}"] = table_fingerprint(conn, ref)
+    return result
+
+class StageManifest:
+    """JSON manifest of the fingerprints recorded after each successful stage run."""
+
+    def __init__(self, path=PIPELINE_MANIFEST_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def current_state(self, stage):
+        return {
+            "code": code_fingerprint([stage.run]),
+            "inputs": fingerprint(stage.inputs),
+            "outputs": fingerprint(stage.outputs),
+        }
+
+    def is_up_to_date(self, stage, state=None):
+        """
+        True when code, inputs and outputs all match the last recorded run.
+        state is a current_state() snapshot, taken here when not given.
+        """
+        if stage.always_run or not stage.inputs or not stage.outputs:
+            return False
+        recorded = self.entries.get(stage.name)
+        if recorded is None:
+            return False
+        current = state or self.current_state(stage)
+        return all(recorded.get(key) == current[key] for key in ("code", "inputs", "outputs"))
+
+    def record(self, stage, state):
+        """
+        Store the stage's fingerprints after a successful run and persist the
+        manifest. state is the current_state() snapshot taken before the run:
+        its code and inputs are what the run consumed; outputs are re-read.
+        """
+        entry = dict(code=state["code"], inputs=state["inputs"], outputs=fingerprint(stage.outputs),
+                     finished_at=datetime.utcnow().isoformat())
+        with self.lock:
+            self.entries[stage.name] = entry
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,257 @@
+"""
+Streaming model evaluation.
+
+Metrics are accumulated chunk by chunk into fixed-size state, so memory
+does not grow with the number of rows evaluated:
+
+- per-class score histograms on NUM_BINS equal-width bins over [0, 1],
+  from which the ROC curve, AUC, calibration curve and probability
+  histograms are derived (exact up to the bin width);
+- exact confusion counts at a set of decision thresholds, from which the
+  classification report is derived.
+
+Accumulators merge by addition, so id ranges of a table are evaluated by
+parallel worker processes and combined. Rows whose label is NULL (e.g.
+compiled real quotes, which have no outcome) only feed the unlabeled
+histogram.
+
+Train/validation membership is decided in SQL by hashing the row id (the
+same split training uses, see utils.training_data), so it is stable
+across runs and needs no materialized split.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.training_data import hash_split_condition
+
+# Fine score bins; coarser plots re-bin these (must divide evenly)
+NUM_BINS = 10_000
+DEFAULT_THRESHOLDS = (0.5,)
+
+# Rows per read/score round in each worker
+CHUNK_SIZE = 200_000
+
+# Workers are started from a clean server process, never forked: callers
+# (the pipeline, the dashboard's background build) run other threads, and a
+# fork would copy their held locks and open SQLite handles
+START_METHOD = "forkserver"
+
+class EvalAccumulator:
+    """Fixed-size evaluation state for binary win-probability scores."""
+
+    def __init__(self, thresholds=DEFAULT_THRESHOLDS, n_bins=NUM_BINS):
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        self.n_bins = n_bins
+        # hist[label] counts scores per bin; prob_sum[label] sums them (for calibration)
+        self.hist = np.zeros((2, n_bins), dtype=np.int64)
+        self.prob_sum = np.zeros((2, n_bins), dtype=np.float64)
+        self.unlabeled = np.zeros(n_bins, dtype=np.int64)
+        # Per threshold: [tn, fp, fn, tp]
+        self.confusion = np.zeros((len(self.thresholds), 4), dtype=np.int64)
+
+    def bin_index(self, probs):
+        return np.minimum((probs * self.n_bins).astype(np.int64), self.n_bins - 1)
+
+    def update(self, probs, labels):
+        """Add a chunk of scores; labels are 0/1, or NaN when unknown."""
+        probs = np.asarray(probs, dtype=np.float64)
+        labels = np.asarray(labels, dtype=np.float64)
+        bins = self.bin_index(probs)
+
+        known = ~np.isnan(labels)
+        self.unlabeled += np.bincount(bins[~known], minlength=self.n_bins)
+        for label in (0, 1):
+            mask = known & (labels == label)
+            self.hist[label] += np.bincount(bins[mask], minlength=self.n_bins)
+            self.prob_sum[label] += np.bincount(bins[mask], weights=probs[mask], minlength=self.n_bins)
+
+        positive = labels[known] == 1
+        predicted = probs[known][None, :] > self.thresholds[:, None]
+        tp = (predicted & positive).sum(axis=1)
+        fp = (predicted & ~positive).sum(axis=1)
+        fn = positive.sum() - tp
+        tn = (~positive).sum() - fp
+        self.confusion += np.stack([tn, fp, fn, tp], axis=1)
+        return self
+
+    def merge(self, other):
+        if self.n_bins != other.n_bins or not np.array_equal(self.thresholds, other.thresholds):
+            raise ValueError("Cannot merge accumulators with different bins or thresholds")
+        self.hist += other.hist
+        self.prob_sum += other.prob_sum
+        self.unlabeled += other.unlabeled
+        self.confusion += other.confusion
+        return self
+
+    @property
+    def n_labeled(self):
+        return int(self.hist.sum())
+
+    def threshold_index(self, threshold):
+        matches = np.flatnonzero(np.isclose(self.thresholds, threshold))
+        if len(matches) == 0:
+            raise ValueError(f"Threshold {threshold} was not accumulated (have {self.thresholds.tolist()})")
+        return matches[0]
+
+    def confusion_matrix(self, threshold=0.5):
+        """[[tn, fp], [fn, tp]], as sklearn.metrics.confusion_matrix."""
+        return self.confusion[self.threshold_index(threshold)].reshape(2, 2)
+
+    def classification_report(self, threshold=0.5):
+        """Same layout as sklearn's classification_report(output_dict=True)."""
+        tn, fp, fn, tp = self.confusion[self.threshold_index(threshold)].tolist()
+        total = tn + fp + fn + tp
+
+        def scores(true_pos, false_pos, false_neg):
+            precision = true_pos / (true_pos + false_pos) if true_pos + false_pos else 0.0
+            recall = true_pos / (true_pos + false_neg) if true_pos + false_neg else 0.0
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+            return {"precision": precision, "recall": recall, "f1-score": f1,
+                    "support": int(true_pos + false_neg)}
+
+        report = {"0": scores(tn, fn, fp), "1": scores(tp, fp, fn)}
+        report["accuracy"] = (tp + tn) / total if total else 0.0
+        for name, weights in (("macro avg", (1, 1)), ("weighted avg", (tn + fp, fn + tp))):
+            weight_sum = sum(weights) or 1
+            report[name] = {
+                metric: sum(w * report[label][metric] for w, label in zip(weights, ("0", "1"))) / weight_sum
+                for metric in ("precision", "recall", "f1-score")
+            }
+            report[name]["support"] = int(total)
+        return report
+
+    def roc_curve(self):
+        """(fpr, tpr, thresholds) with one point per non-empty bin edge, highest threshold first."""
+        negatives, positives = self.hist[0][::-1], self.hist[1][::-1]
+        keep = (negatives + positives) > 0
+        fps = np.cumsum(negatives)[keep]
+        tps = np.cumsum(positives)[keep]
+        fpr = np.concatenate([[0.0], fps / max(fps[-1], 1)]) if len(fps) else np.array([0.0])
+        tpr = np.concatenate([[0.0], tps / max(tps[-1], 1)]) if len(tps) else np.array([0.0])
+        lower_edges = (np.arange(self.n_bins)[::-1][keep]) / self.n_bins
+        return fpr, tpr, np.concatenate([[np.inf], lower_edges])
+
+    def auc(self):
+        """Area under the binned ROC curve (scores within a bin count as ties)."""
+        fpr, tpr, _ = self.roc_curve()
+        return float(np.trapezoid(tpr, fpr))
+
+    def rebin(self, values, n_bins):
+        if self.n_bins % n_bins:
+            raise ValueError(f"{n_bins} bins do not divide {self.n_bins}")
+        return values.reshape(n_bins, self.n_bins // n_bins).sum(axis=1)
+
+    def calibration_curve(self, n_bins=10):
+        """(fraction of positives, mean predicted probability) per non-empty uniform bin."""
+        counts = self.rebin(self.hist[0] + self.hist[1], n_bins)
+        positives = self.rebin(self.hist[1], n_bins)
+        prob_sums = self.rebin(self.prob_sum[0] + self.prob_sum[1], n_bins)
+        nonzero = counts > 0
+        return positives[nonzero] / counts[nonzero], prob_sums[nonzero] / counts[nonzero]
+
+    def score_histogram(self, n_bins=20):
+        """(bin edges, negative counts, positive counts, unlabeled counts) on n_bins uniform bins."""
+        edges = np.linspace(0.0, 1.0, n_bins + 1)
+        return (edges, self.rebin(self.hist[0], n_bins), self.rebin(self.hist[1], n_bins),
+                self.rebin(self.unlabeled, n_bins))
+
+
+def evaluate_range(query, lo, hi, predictor, thresholds, n_bins, chunk_size):
+    """
+    Worker: accumulate rows with lo <= id <= hi. query selects (id, label,
+    score) or, when a predictor is given, (id, label, *features) to be scored.
+    """
+    from utils.db import engine
+
+    # Fresh connections in a forked worker; never reuse the parent's pool
+    engine.dispose(close=False)
+    acc = EvalAccumulator(thresholds, n_bins)
+
+    with engine.connect() as conn:
+        # Plain DB-API tuples: numpy converts them far faster than Row objects
+        cursor = conn.connection.cursor()
+        after_id = lo - 1
+        while True:
+            rows = cursor.execute(query, (after_id, hi, chunk_size)).fetchall()
+            if not rows:
+                break
+            data = np.array(rows, dtype=np.float64)  # NULL -> nan
+            if predictor is not None:
+                probs = predictor.predict_proba(np.nan_to_num(data[:, 2:], nan=0.0))
+            else:
+                probs = data[:, 2]
+            acc.update(probs, data[:, 1])
+            after_id = int(data[-1, 0])
+    return acc
+
+
+def evaluate_query(query, id_bounds, predictor=None, thresholds=DEFAULT_THRESHOLDS, n_bins=NUM_BINS,
+                   chunk_size=CHUNK_SIZE, workers=None):
+    """
+    Split [min id, max id] into one range per worker, evaluate them in
+    parallel and merge. There are no more workers than chunk_size-sized
+    id ranges, and a single range is evaluated in process, so a small
+    table does not pay for starting worker processes. The predictor (any
+    utils.predictors model) is pickled to the workers.
+    """
+    lo, hi = id_bounds
+    acc = EvalAccumulator(thresholds, n_bins)
+    if lo is None:
+        return acc
+
+    n_chunks = -(-(hi - lo + 1) // chunk_size)
+    workers = max(1, min(workers or os.cpu_count() or 1, n_chunks))
+    edges = np.linspace(lo, hi + 1, workers + 1).astype(np.int64)
+    args = [(query, int(start), int(stop) - 1, predictor, thresholds, n_bins, chunk_size)
+            for start, stop in zip(edges[:-1], edges[1:]) if stop > start]
+
+    if len(args) == 1:
+        return acc.merge(evaluate_range(*args[0]))
+    context = multiprocessing.get_context(START_METHOD)
+    with ProcessPoolExecutor(max_workers=len(args), mp_context=context) as pool:
+        for partial in pool.map(evaluate_range, *zip(*args)):
+            acc.merge(partial)
+    return acc
+
+
+def id_bounds(table, where="1"):
+    from utils.db import engine
+
+    with engine.connect() as conn:
+        return tuple(conn.exec_driver_sql(f"SELECT min(id), max(id) FROM {table} WHERE {where}").one())
+
+
+def evaluate_training_data(predictor, split=None, **kwargs):
+    """Score training_quotations (optionally only the train/validation split) with a predictor."""
+    where = hash_split_condition(split)
+    query = (
+        f"SELECT id, won, {', '.join(predictor.feature_names)} FROM training_quotations "
+        f"WHERE id > ? AND id <= ? AND {where} ORDER BY id LIMIT ?"
+    )
+    return evaluate_query(query, id_bounds("training_quotations"), predictor=predictor, **kwargs)
+
+
+def evaluate_scored_quotes(**kwargs):
+    """Stored scores of compiled real quotes; labels are real_quotation_data.won (usually unknown)."""
+    query = (
+        "SELECT qs.id, rq.won, qs.won FROM quote_scores qs "
+        "JOIN real_quotation_data rq ON rq.quotation_response_id = qs.id "
+        "WHERE qs.id > ? AND qs.id <= ? ORDER BY qs.id LIMIT ?"
+    )
+    return evaluate_query(query, id_bounds("quote_scores"), **kwargs)
+
+
+if __name__ == "__main__":
+    import time
+    from utils.model_registry import HotModel
+
+    version, predictor = HotModel().get()
+    for split in ("train", "validation"):
+        started = time.perf_counter()
+        acc = evaluate_training_data(predictor, split=split)
+        report = acc.classification_report()
+        print(f"{split:<10} rows={acc.n_labeled} auc={acc.auc():.4f} f1={report['1']['f1-score']:.4f} "
+              f"accuracy={report['accuracy']:.4f} ({time.perf_counter() - started:.2f}s)")
@@ -0,0 +1,116 @@
+"""
+Out-of-core training data loading.
+
+The train/validation split and the undersampling of the majority class are
+done inside SQLite by hashing the row id, so Python only ever receives the
+sampled rows, streamed in chunks as typed NumPy arrays. Peak memory follows
+the size of the sampled training set, not of training_quotations.
+
+- split: a row is in validation when its split bucket, a multiplicative
+  hash of the id, falls below VALIDATION_FRACTION of the hash range. The
+  hash does not depend on the label, so both classes are split in the same
+  proportion (stratified in expectation) and membership never changes as
+  the table grows.
+- undersampling: within the train split, majority-class rows are kept when
+  a second, independent hash of the id falls below
+  minority count / majority count, giving balanced classes in expectation.
+  It is the same rows on every run.
+"""
+import numpy as np
+
+from utils.db import engine
+
+TABLE = "training_quotations"
+FEATURE_COLUMNS = ['unit_price', 'delivery_days', 'performance_score', 'response_time',
+                   'rfq_complexity_score', 'is_urgent', 'is_custom']
+LABEL_COLUMN = "won"
+
+# Rows per fetch; a chunk is converted to arrays before the next one is read
+CHUNK_SIZE = 200_000
+
+VALIDATION_FRACTION = 0.2
+HASH_MODULUS = 2 ** 32
+# Multipliers keep every intermediate product inside SQLite's signed 64-bit range
+SPLIT_MULTIPLIER = 2654435761
+SAMPLE_MULTIPLIER = 73244475
+
+
+def split_bucket(id_column="id"):
+    """SQL expression: multiplicative hash of the id in [0, 2**32)."""
+    return f"(({id_column} * {SPLIT_MULTIPLIER}) % {HASH_MODULUS})"
+
+
+def sample_bucket(id_column="id"):
+    """SQL expression: a second hash in [0, 2**32), mixed so it is independent of the split bucket."""
+    h = split_bucket(id_column)
+    # xor-shift (a ^ b == (a | b) - (a & b)) then multiply, as in common integer hashes
+    mixed = f"(({h} | ({h} >> 16)) - ({h} & ({h} >> 16)))"
+    return f"(({mixed} * {SAMPLE_MULTIPLIER}) % {HASH_MODULUS})"
+
+
+def hash_split_condition(split, id_column="id"):
+    """SQL predicate selecting the "train" or "validation" rows (None: no filter)."""
+    if split is None:
+        return "1"
+    cutoff = int(VALIDATION_FRACTION * HASH_MODULUS)
+    if split == "validation":
+        return f"{split_bucket(id_column)} < {cutoff}"
+    if split == "train":
+        return f"{split_bucket(id_column)} >= {cutoff}"
+    raise ValueError(f"Unknown split: {split}")
+
+
+def class_counts(conn, split):
+    """{label: rows} in a split, counted by SQLite."""
+    rows = conn.exec_driver_sql(
+        f"SELECT {LABEL_COLUMN}, count(*) FROM {TABLE} WHERE {hash_split_condition(split)} GROUP BY 1"
+    ).all()
+    return {int(label): count for label, count in rows if label is not None}
+
+
+def undersample_condition(counts):
+    """SQL predicate keeping every minority row and a hash-chosen share of the majority class."""
+    if len(counts) < 2:
+        return "1"
+    minority = min(counts, key=counts.get)
+    majority = max(counts, key=counts.get)
+    keep_fraction = counts[minority] / counts[majority]
+    cutoff = int(keep_fraction * HASH_MODULUS)
+    return f"({LABEL_COLUMN} = {minority} OR {sample_bucket()} < {cutoff})"
+
+
+def iter_training_chunks(split="train", undersample=True, chunk_size=CHUNK_SIZE, after_id=0):
+    """
+    Yield (ids int64 [n], X float64 [n, features], y int8 [n]) chunks of a
+    split in id order, starting after after_id and undersampled in SQL when
+    requested. Rows with a NULL label are skipped.
+    """
+    with engine.connect() as conn:
+        where = [hash_split_condition(split), f"{LABEL_COLUMN} IS NOT NULL"]
+        if undersample:
+            where.append(undersample_condition(class_counts(conn, split)))
+        query = (
+            f"SELECT id, {LABEL_COLUMN}, {', '.join(FEATURE_COLUMNS)} FROM {TABLE} "
+            f"WHERE id > ? AND {' AND '.join(where)} ORDER BY id LIMIT ?"
+        )
+
+        # Plain DB-API tuples: numpy converts them far faster than Row objects
+        cursor = conn.connection.cursor()
+        while True:
+            rows = cursor.execute(query, (after_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            data = np.array(rows, dtype=np.float64)
+            after_id = int(data[-1, 0])
+            yield data[:, 0].astype(np.int64), np.nan_to_num(data[:, 2:], nan=0.0), data[:, 1].astype(np.int8)
+
+
+def load_training_arrays(split="train", undersample=True, chunk_size=CHUNK_SIZE):
+    """Concatenate iter_training_chunks into (X, y); only the sampled rows are held in memory."""
+    X_chunks, y_chunks = [], []
+    for _, X, y in iter_training_chunks(split, undersample, chunk_size):
+        X_chunks.append(X)
+        y_chunks.append(y)
+    if not X_chunks:
+        return np.empty((0, len(FEATURE_COLUMNS))), np.empty(0, dtype=np.int8)
+    return np.concatenate(X_chunks), np.concatenate(y_chunks)
@@ -1,65 +1,212 @@
+import argparse
+import tempfile
+import time
 from pathlib import Path
-import os
-import pandas as pd
-import sqlite3
+import numpy as np
 import joblib
 
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, StratifiedKFold
 from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
 from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import classification_report
-from imblearn.under_sampling import RandomUnderSampler
 
-from utils.paths import DB_PATH
-
-# === Load data from SQLite database ===
-conn = sqlite3.connect(DB_PATH)
-df = pd.read_sql_query("SELECT * FROM training_quotations", conn)
-df_test = pd.read_sql_query("SELECT * FROM real_quotation_data", conn)
-conn.close()
+from utils.model_registry import CURRENT_POINTER, promote, read_pointer, register_model, set_candidate
+from utils.scoring_kernel import KERNEL_PATH, ScoringKernel
+from utils.streaming_eval import evaluate_training_data
+from utils.training_data import FEATURE_COLUMNS, load_training_arrays
 
 # === Define feature and target columns ===
 binary_columns = ['is_urgent', 'is_custom']
 non_binary_columns = ['unit_price', 'delivery_days', 'performance_score', 'response_time', 'rfq_complexity_score']
 
-X = df.drop(columns=['id', 'won'])
-y = df['won']
-
-# === Split data ===
-X_train_full, X_val_full, y_train, y_val = train_test_split(
-    X, y, test_size=0.2, stratify=y, random_state=42
-)
-
-# === Undersample training data ===
-undersampler = RandomUnderSampler(random_state=42)
-X_train_us, y_train_us = undersampler.fit_resample(X_train_full, y_train)
+BASE_DIR = Path(__file__).resolve().parent.parent
+models_dir = BASE_DIR / "models"
 
-# === Scale non-binary columns ===
-scaler = MinMaxScaler()
-X_train_us_scaled = X_train_us.copy()
-X_val_scaled = X_val_full.copy()
+MODEL_PATH = models_dir / "best_logistic_model.pkl"
+SCALER_PATH = models_dir / "minmax_scaler.pkl"
 
-X_train_us_scaled[non_binary_columns] = scaler.fit_transform(X_train_us[non_binary_columns])
-X_val_scaled[non_binary_columns] = scaler.transform(X_val_full[non_binary_columns])
+# === Hyperparameter search ===
+# "grid":    exhaustive GridSearchCV (2 penalties x 6 C x 2 solvers x 5 folds, cold starts)
+# "halving": HalvingGridSearchCV over the same grid; candidates are dropped on growing subsamples
+# "path":    per fold and penalty, one model warm-started along increasing C, saga/lbfgs only.
+#            liblinear penalizes the intercept and saga/lbfgs do not, so "path" searches a
+#            slightly different model family than "grid"/"halving" and may pick other params.
+SEARCH_MODES = ("grid", "halving", "path")
+DEFAULT_SEARCH_MODE = "path"
 
-# === Logistic Regression with Grid Search ===
-param_grid = {
+PARAM_GRID = {
     'penalty': ['l1', 'l2'],
     'C': [0.001, 0.01, 0.1, 1, 10, 100],
     'solver': ['liblinear', 'saga']
 }
+CV_FOLDS = 5
 
-logreg = LogisticRegression(max_iter=1000, random_state=42)
-grid_search = GridSearchCV(logreg, param_grid, cv=5, scoring='f1', n_jobs=-1, verbose=0)
-grid_search.fit(X_train_us_scaled, y_train_us)
+# Warm-startable solver per penalty for the path search (liblinear cannot warm start)
+PATH_SOLVERS = {'l1': 'saga', 'l2': 'lbfgs'}
 
-# === Save best model and scaler ===
-BASE_DIR = Path(__file__).resolve().parent.parent
-models_dir = BASE_DIR / "models"
-models_dir.mkdir(exist_ok=True)
+def export_kernel(model, scaler, feature_columns, path=KERNEL_PATH):
+    """Fuse scaler and model into the NumPy scoring kernel artifact used for scoring."""
+    kernel = ScoringKernel.from_sklearn(model, scaler, list(feature_columns), non_binary_columns)
+    kernel.save(path)
+    return kernel
+
+def cached_folds(X, y, n_splits=CV_FOLDS):
+    """Materialize the CV folds once as contiguous arrays, reused by every candidate."""
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+    return [
+        (np.ascontiguousarray(X[train_idx]), y[train_idx], np.ascontiguousarray(X[test_idx]), y[test_idx])
+        for train_idx, test_idx in splitter.split(X, y)
+    ]
+
+def path_search(X, y, param_grid=PARAM_GRID):
+    """
+    Warm-started regularization path: for each fold and penalty a single
+    model is refit along increasing C, starting from the previous solution.
+    The solver axis is not searched: PATH_SOLVERS picks a warm-startable one
+    per penalty. These leave the intercept unpenalized, unlike liblinear,
+    so liblinear candidates of the grid are not covered (use "grid" or
+    "halving" for them). Returns (best params, per-candidate rows).
+    """
+    folds = cached_folds(X, y)
+    Cs = sorted(param_grid['C'])
+    results = {(penalty, C): {"scores": [], "seconds": 0.0} for penalty in param_grid['penalty'] for C in Cs}
+
+    for X_tr, y_tr, X_te, y_te in folds:
+        for penalty in param_grid['penalty']:
+            model = LogisticRegression(penalty=penalty, solver=PATH_SOLVERS[penalty], warm_start=True,
+                                       max_iter=1000, random_state=42)
+            for C in Cs:
+                started = time.perf_counter()
+                model.set_params(C=C).fit(X_tr, y_tr)
+                results[penalty, C]["seconds"] += time.perf_counter() - started
+                results[penalty, C]["scores"].append(f1_score(y_te, model.predict(X_te)))
+
+    rows = [
+        {"params": {"penalty": penalty, "C": C, "solver": PATH_SOLVERS[penalty]},
+         "mean_f1": float(np.mean(r["scores"])), "seconds": r["seconds"]}
+        for (penalty, C), r in results.items()
+    ]
+    best = max(rows, key=lambda row: row["mean_f1"])
+    return best["params"], rows
+
+def cv_search(X, y, mode, param_grid=PARAM_GRID):
+    """GridSearchCV or HalvingGridSearchCV over the grid; returns (best params, per-candidate rows)."""
+    logreg = LogisticRegression(max_iter=1000, random_state=42)
+    cv = StratifiedKFold(n_splits=CV_FOLDS, shuffle=True, random_state=42)
+    if mode == "halving":
+        search = HalvingGridSearchCV(logreg, param_grid, cv=cv, scoring='f1', factor=3,
+                                     random_state=42, n_jobs=-1, verbose=0)
+    else:
+        search = GridSearchCV(logreg, param_grid, cv=cv, scoring='f1', n_jobs=-1, verbose=0)
+    search.fit(X, y)
+
+    cv_results = search.cv_results_
+    rows = [
+        {"params": params, "mean_f1": float(score),
+         # total fit + score time over the folds this candidate was evaluated on
+         "seconds": float((fit + score_time) * CV_FOLDS)}
+        for params, score, fit, score_time in zip(
+            cv_results['params'], cv_results['mean_test_score'],
+            cv_results['mean_fit_time'], cv_results['mean_score_time'])
+    ]
+    if mode == "halving":
+        # Keep the last (largest-resource) evaluation of each candidate
+        latest = {}
+        for row, n_resources in zip(rows, cv_results['n_resources']):
+            row["n_samples"] = int(n_resources)
+            latest[tuple(sorted(row["params"].items()))] = row
+        rows = list(latest.values())
+    return search.best_params_, rows
+
+def search_hyperparameters(X, y, mode=DEFAULT_SEARCH_MODE):
+    """Run the selected search, print per-candidate timings and return the best params."""
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode {mode!r}, expected one of {SEARCH_MODES}")
+    started = time.perf_counter()
+    if mode == "path":
+        best_params, rows = path_search(X, y)
+    else:
+        best_params, rows = cv_search(X, y, mode)
+    elapsed = time.perf_counter() - started
+
+    print(f"{'candidate':<40} {'mean F1':>8} {'time (s)':>9}")
+    for row in sorted(rows, key=lambda row: -row["mean_f1"]):
+        params = ", ".join(f"{k}={v}" for k, v in sorted(row["params"].items()))
+        print(f"{params:<40} {row['mean_f1']:>8.4f} {row['seconds']:>9.2f}")
+    print(f"{mode} search: {len(rows)} candidates in {elapsed:.2f}s, best {best_params}")
+    return best_params, elapsed
+
+def fit_logistic(X_train, y_train, search=DEFAULT_SEARCH_MODE):
+    """
+    Scale the non-binary columns, search hyperparameters and refit the best
+    LogisticRegression on all rows. Returns (model, scaler, params, search seconds).
+    """
+    # === Scale non-binary columns ===
+    scaled = [FEATURE_COLUMNS.index(col) for col in non_binary_columns]
+    scaler = MinMaxScaler()
+    X_train_scaled = X_train.copy()
+    X_train_scaled[:, scaled] = scaler.fit_transform(X_train[:, scaled])
+
+    # === Logistic Regression: search on the cached arrays, then refit the best on all training rows ===
+    best_params, search_seconds = search_hyperparameters(X_train_scaled, y_train, search)
+    best_model = LogisticRegression(max_iter=1000, random_state=42, **best_params)
+    best_model.fit(X_train_scaled, y_train)
+    return best_model, scaler, best_params, search_seconds
+
+def train_model(as_candidate=False, search=DEFAULT_SEARCH_MODE):
+    """
+    Train and register the fused kernel in the model registry. The new
+    version becomes CURRENT, and the model files in models/ are replaced,
+    or CANDIDATE (shadow-scored only) when as_candidate is set, in which
+    case it is written to the registry only. A candidate is still promoted
+    when no model is CURRENT yet, so a fresh tree has one to score with.
+    search picks the hyperparameter search (see SEARCH_MODES).
+    """
+    # === Load the train split, undersampled in SQLite ===
+    X_train, y_train = load_training_arrays("train", undersample=True)
+    best_model, scaler, best_params, search_seconds = fit_logistic(X_train, y_train, search)
+    kernel = ScoringKernel.from_sklearn(best_model, scaler, list(FEATURE_COLUMNS), non_binary_columns)
+
+    # === Register the version with its validation metrics (streamed, never loaded whole) ===
+    val = evaluate_training_data(kernel, split="validation")
+    report = val.classification_report()
+    metadata = {
+        "metrics": {
+            "val_f1": report["1"]["f1-score"],
+            "val_auc": val.auc(),
+            "val_accuracy": report["accuracy"],
+        },
+        "training_rows": len(X_train),
+        "params": best_params,
+        "search": {"mode": search, "seconds": search_seconds},
+    }
+    # The sklearn pickles go along with the version; a candidate must not
+    # overwrite the live files in models/
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [Path(tmp) / MODEL_PATH.name, Path(tmp) / SCALER_PATH.name]
+        joblib.dump(best_model, files[0])
+        joblib.dump(scaler, files[1])
+        version = register_model(kernel, metadata, files=files)
 
-joblib.dump(grid_search.best_estimator_, models_dir / "best_logistic_model.pkl")
-joblib.dump(scaler, models_dir / "minmax_scaler.pkl")
+    if as_candidate and read_pointer(CURRENT_POINTER) is not None:
+        set_candidate(version)
+        print(f"✅ Model registered as CANDIDATE (version {version}); models/ left unchanged")
+        return
 
-print("✅ Model and scaler saved successfully in models/")
+    # === Save best model, scaler and kernel ===
+    models_dir.mkdir(exist_ok=True)
+    joblib.dump(best_model, MODEL_PATH)
+    joblib.dump(scaler, SCALER_PATH)
+    export_kernel(best_model, scaler, FEATURE_COLUMNS)
+    promote(version)
+    print(f"✅ Model, scaler and scoring kernel saved in models/ (version {version}, CURRENT)")
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the win-probability model")
+    parser.add_argument("--candidate", action="store_true",
+                        help="register as CANDIDATE for shadow scoring instead of promoting")
+    parser.add_argument("--search", choices=SEARCH_MODES, default=DEFAULT_SEARCH_MODE,
+                        help="hyperparameter search strategy")
+    args = parser.parse_args()
+    train_model(as_candidate=args.candidate, search=args.search)
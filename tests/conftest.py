@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+# Modules import each other as utils.*, as with PYTHONPATH=src
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from utils.db import Base  # noqa: E402
+import utils.models  # noqa: E402,F401 (registers the tables on Base.metadata)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path of a fresh SQLite database holding every table of utils.models."""
+    path = tmp_path / "quotations.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def db_engine(db_path):
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    yield engine
+    engine.dispose()
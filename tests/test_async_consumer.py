@@ -0,0 +1,88 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+import utils.async_consumer as async_consumer
+import utils.consumer as consumer
+from utils.async_consumer import CRMConsumer, load_checkpoint
+from utils.models import ClientRequest
+
+FEED = [{"customer_id": f"C{i}", "product_type": "Flyer", "quantity": 10, "delivery_deadline": "2025-01-31",
+         "specifications": "A5, 170g", "color_spec": "4x4"} for i in range(23)]
+
+
+def feed_client(requested, feed=FEED):
+    """AsyncClient serving feed as the simulated CRM page endpoint, recording the cursors asked for."""
+    def page(request):
+        cursor, limit = int(request.url.params["cursor"]), int(request.url.params["limit"])
+        requested.append(cursor)
+        next_cursor = cursor + limit
+        return httpx.Response(200, json={"items": feed[cursor:next_cursor],
+                                         "next_cursor": next_cursor if next_cursor < len(feed) else None})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(page), base_url="http://crm")
+
+
+@pytest.fixture
+def stored(db_engine, monkeypatch):
+    """customer_ids saved by save_to_db, in the test database."""
+    monkeypatch.setattr(consumer, "SessionLocal", sessionmaker(bind=db_engine))
+
+    def customer_ids():
+        with db_engine.connect() as conn:
+            return sorted(conn.execute(select(ClientRequest.customer_id)).scalars(), key=lambda c: int(c[1:]))
+
+    return customer_ids
+
+
+def drain(crm, requested, max_pages=None):
+    async def run():
+        async with feed_client(requested) as client:
+            return await crm.drain(client, max_pages=max_pages)
+
+    return asyncio.run(asyncio.wait_for(run(), timeout=10))
+
+
+def test_drain_reads_every_page_and_checkpoints_the_end(stored, tmp_path):
+    crm = CRMConsumer(url="/page", page_size=5, max_in_flight=3, queue_size=1,
+                      checkpoint_path=str(tmp_path / "checkpoint.json"))
+    requested = []
+
+    checkpoint, at_end = drain(crm, requested)
+
+    assert (checkpoint, at_end) == (23, True)
+    assert sorted(requested)[:5] == [0, 5, 10, 15, 20]
+    assert crm.totals["pages"] == 5 and crm.totals["inserted"] == 23
+    assert stored() == [entry["customer_id"] for entry in FEED]
+    assert load_checkpoint(crm.checkpoint_path) == 23
+
+
+def test_drain_resumes_from_the_checkpoint(stored, tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    first = CRMConsumer(url="/page", page_size=5, max_in_flight=1, checkpoint_path=path)
+    assert drain(first, [], max_pages=2) == (10, False)
+
+    requested = []
+    second = CRMConsumer(url="/page", page_size=5, max_in_flight=2, checkpoint_path=path)
+    assert drain(second, requested) == (23, True)
+    assert min(requested) == 10
+    assert second.totals["inserted"] == 13 and second.totals["skipped"] == 0
+    assert stored() == [entry["customer_id"] for entry in FEED]
+
+
+def test_failed_save_stops_the_fetchers_and_raises(stored, tmp_path, monkeypatch):
+    def failing_save(items):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(async_consumer, "save_to_db", failing_save)
+    crm = CRMConsumer(url="/page", page_size=1, max_in_flight=3, queue_size=1,
+                      checkpoint_path=str(tmp_path / "checkpoint.json"))
+
+    # Without cancellation the fetchers would block on the full queue until the timeout
+    with pytest.raises(RuntimeError, match="database is locked"):
+        drain(crm, [])
+    assert load_checkpoint(crm.checkpoint_path) == 0
+    assert stored() == []
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from utils.db import get_async_db
+from utils.main import app
+
+
+@pytest.fixture
+def client(db_engine, db_path):
+    with db_engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO client_requests (id, customer_id, product_type, quantity, deadline, is_custom) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(i, f"C{i}", "Flyer" if i % 3 else "Poster", 10 * i, datetime(2025, 1, 1) + timedelta(days=i), i % 2)
+             # Gaps in the ids: pages must follow ids, not offsets
+             for i in range(1, 60, 2)])
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    sessions = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def test_db():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = test_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def read_all(client, **params):
+    ids, after_id = [], 0
+    while True:
+        page = client.get("/hubspot/client_requests", params={"after_id": after_id, **params}).json()
+        ids += [item["id"] for item in page["items"]]
+        if page["next_cursor"] is None:
+            return ids
+        after_id = page["next_cursor"]
+
+
+def test_pages_cover_every_row_once_in_id_order(client):
+    assert read_all(client, limit=7) == list(range(1, 60, 2))
+
+
+def test_last_full_page_has_no_next_cursor(client):
+    page = client.get("/hubspot/client_requests", params={"limit": 30}).json()
+    assert len(page["items"]) == 30
+    assert page["next_cursor"] is None
+
+
+def test_filters_apply_across_pages(client):
+    expected = [i for i in range(1, 60, 2) if i % 3 == 0]
+    assert read_all(client, limit=2, product_type="Poster") == expected
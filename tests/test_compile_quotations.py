@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from utils.compile_suppliers_quotations import compile_test_dataset
+from utils.models import (ClientRequest, QuotationResponse, RealQuotationData, RFQDetails, RFQSent,
+                          Supplier)
+
+
+def add_response(db, response_id):
+    sent_at = datetime(2025, 1, 1, 8)
+    db.add_all([
+        ClientRequest(id=response_id, product_type="Flyer", quantity=100, is_custom=False),
+        RFQSent(id=response_id, client_request_id=response_id, supplier_id=1, sent_at=sent_at),
+        RFQDetails(rfq_id=response_id, response_deadline=datetime(2025, 1, 10)),
+        QuotationResponse(id=response_id, rfq_id=response_id, unit_price=1.5, delivery_days=4,
+                          received_at=datetime(2025, 1, 1, 20)),
+    ])
+
+
+def test_legacy_rows_are_replaced_once_and_reruns_add_nothing(db_engine):
+    with Session(db_engine) as db:
+        db.add(Supplier(id=1, name="S1", performance_score=4.0))
+        add_response(db, 1)
+        add_response(db, 2)
+        # Compiled before quotation_response_id existed, twice (old runs re-appended every RFQ)
+        db.add_all([RealQuotationData(unit_price=1.5, delivery_days=4) for _ in range(2)])
+        db.commit()
+
+        compile_test_dataset(db)
+        compile_test_dataset(db)
+
+        rows = db.execute(select(RealQuotationData.quotation_response_id, RealQuotationData.response_time)).all()
+    assert sorted(rows) == [(1, 12.0), (2, 12.0)]
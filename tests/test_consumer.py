@@ -0,0 +1,31 @@
+from utils.consumer import parse_crm_batch
+
+
+def entry(customer_id, quantity, deadline="2025-01-31"):
+    return {"customer_id": customer_id, "product_type": "Flyer", "quantity": quantity,
+            "delivery_deadline": deadline, "specifications": "A5, 170g", "color_spec": "4x4"}
+
+
+def test_invalid_entries_are_counted_not_raised():
+    df, invalid = parse_crm_batch([
+        entry("C1", "12"),
+        entry("C2", "a dozen"),     # non-numeric quantity
+        entry("C3", None),          # missing quantity: 0
+        entry("C4", 5, "someday"),  # bad deadline
+        entry("", 5),               # no customer
+    ])
+    assert invalid == 3
+    assert df["customer_id"].tolist() == ["C1", "C3"]
+    assert df["quantity"].tolist() == [12, 0]
+
+
+def test_fractional_quantities_are_invalid_not_truncated():
+    df, invalid = parse_crm_batch([
+        entry("C1", "2.5"),
+        entry("C2", 0.5),
+        entry("C3", "3.0"),         # whole number written as a float
+        entry("C4", 7),
+    ])
+    assert invalid == 2
+    assert df["customer_id"].tolist() == ["C3", "C4"]
+    assert df["quantity"].tolist() == [3, 7]
@@ -0,0 +1,20 @@
+from sqlalchemy import text
+
+import utils.dashboard_artifacts as dashboard_artifacts
+from utils.dashboard_artifacts import current_artifact_key
+
+
+def test_artifact_key_follows_model_and_training_data(db_engine, monkeypatch):
+    monkeypatch.setattr(dashboard_artifacts, "engine", db_engine)
+    insert = text("INSERT INTO training_quotations (unit_price, won) VALUES (:price, 0)")
+    with db_engine.begin() as conn:
+        conn.execute(insert, {"price": 10.0})
+
+    key = current_artifact_key("v1")
+    assert current_artifact_key("v1") == key
+    assert current_artifact_key("v2") != key
+
+    # Same model, new training rows
+    with db_engine.begin() as conn:
+        conn.execute(insert, {"price": 12.0})
+    assert current_artifact_key("v1") != key
@@ -0,0 +1,38 @@
+import dataclasses
+
+from sqlalchemy import text
+
+import utils.generate_training_dataset as generate_training_dataset
+import utils.stage_manifest as stage_manifest
+from utils.pipeline import STAGES, run_pipeline
+from utils.stage_manifest import StageManifest
+
+
+def test_rerun_without_new_data_skips_training(db_engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_training_dataset, "engine", db_engine)
+    monkeypatch.setattr(stage_manifest, "engine", db_engine)
+
+    model_file = tmp_path / "model.bin"
+    fits = []
+
+    def train():
+        fits.append(len(fits))
+        model_file.write_bytes(b"model")
+
+    # The real training_data stage, and the train stage's inputs with a stub fit
+    by_name = {stage.name: stage for stage in STAGES}
+    stages = [
+        dataclasses.replace(by_name["training_data"], deps=[]),
+        dataclasses.replace(by_name["train"], run=train, outputs=[model_file]),
+    ]
+    manifest_path = tmp_path / "manifest.json"
+
+    first = dict((name, status) for name, status, *_ in run_pipeline(stages, manifest=StageManifest(manifest_path)))
+    second = dict((name, status) for name, status, *_ in run_pipeline(stages, manifest=StageManifest(manifest_path)))
+
+    assert first == {"training_data": "ok", "train": "ok"}
+    assert second == {"training_data": "ok", "train": "cached"}
+    assert fits == [0]
+    with db_engine.connect() as conn:
+        rows = conn.execute(text("SELECT count(*) FROM training_quotations")).scalar()
+    assert rows == generate_training_dataset.NUM_SAMPLES
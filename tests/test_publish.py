@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import inspect
+
+import utils.publish as publish
+from utils.models import SelectedQuote
+
+
+def quote(client_request_id, supplier_id=1):
+    return {
+        "client_request_id": client_request_id, "customer_id": str(client_request_id),
+        "supplier_id": supplier_id, "supplier_name": "AlphaPrint", "supplier_performance_score": 4.0,
+        "quotation_response_id": client_request_id, "unit_price": 10.0, "rfq_sent_at": datetime(2025, 1, 1),
+        "heuristic_score": 4.0, "delivery_days": 5, "profit_margin": 0.1, "markup": 1.1,
+        "expected_profit": None,
+    }
+
+
+@pytest.fixture
+def engine(db_engine, monkeypatch):
+    monkeypatch.setattr(publish, "engine", db_engine)
+    return db_engine
+
+
+def selected_ids(engine):
+    with engine.connect() as conn:
+        return [row[0] for row in conn.exec_driver_sql(
+            "SELECT client_request_id FROM selected_quotes ORDER BY client_request_id")]
+
+
+def test_publish_replaces_rows_and_bumps_the_version(engine):
+    assert publish.publish_rows(SelectedQuote, [quote(1), quote(2)]) == 1
+    assert publish.publish_rows(SelectedQuote, [quote(3)]) == 2
+    assert selected_ids(engine) == [3]
+
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT version, rows FROM publications WHERE table_name = 'selected_quotes' ORDER BY version").all()
+    assert [tuple(row) for row in rows] == [(1, 2), (2, 1)]
+
+
+def staging_tables(engine):
+    return [name for name in inspect(engine).get_table_names() if publish.STAGING_SUFFIX in name]
+
+
+def test_publish_leaves_no_staging_table_and_keeps_indexes(engine):
+    publish.publish_rows(SelectedQuote, [quote(1)], chunk_size=1)
+    assert staging_tables(engine) == []
+    inspector = inspect(engine)
+    expected = {index.name for index in SelectedQuote.__table__.indexes}
+    assert expected <= {index["name"] for index in inspector.get_indexes("selected_quotes")}
+
+
+def test_failed_publish_keeps_the_previous_table(engine):
+    publish.publish_rows(SelectedQuote, [quote(1)])
+    with pytest.raises(Exception):
+        publish.publish_rows(SelectedQuote, [quote(2), {"no_such_column": 1}])
+    assert selected_ids(engine) == [1]
+    assert staging_tables(engine) == []
+
+
+class PublishMidway(list):
+    """Rows that let another publisher run to completion while the first one is still staging."""
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) and not getattr(self, "interrupted", False):
+            self.interrupted = True
+            publish.publish_rows(SelectedQuote, [quote(9)])
+        return super().__getitem__(index)
+
+
+def test_concurrent_publishers_do_not_destroy_each_others_staging(engine):
+    version = publish.publish_rows(SelectedQuote, PublishMidway([quote(1), quote(2)]), chunk_size=1)
+    # The interleaved publisher got version 1; the last swap wins
+    assert version == 2
+    assert selected_ids(engine) == [1, 2]
+    assert staging_tables(engine) == []
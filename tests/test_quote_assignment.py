@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+from utils.quote_assignment import assign_quotes, supplier_limits
+
+
+def random_candidates(rng, requests, candidates, suppliers):
+    supplier_id = np.concatenate([rng.choice(suppliers, candidates, replace=False) for _ in range(requests)])
+    return pd.DataFrame({
+        "id": np.arange(requests * candidates),
+        "client_request_id": np.repeat(np.arange(requests), candidates) + 100,
+        "supplier_id": supplier_id,
+        "final_score": rng.random(requests * candidates),
+    })
+
+
+def milp_optimum(candidates, limit):
+    """(served requests, total score) of the best assignment, served requests first."""
+    rows, _ = pd.factorize(candidates["client_request_id"])
+    suppliers = candidates["supplier_id"].to_numpy()
+    scores = candidates["final_score"].to_numpy()
+    n = len(candidates)
+    columns = np.arange(n)
+    A = sp.vstack([
+        sp.csr_matrix((np.ones(n), (rows, columns))),
+        sp.csr_matrix((np.ones(n), (suppliers, columns)), shape=(suppliers.max() + 1, n)),
+    ])
+    upper = np.r_[np.ones(rows.max() + 1), np.full(suppliers.max() + 1, limit)]
+    # Serving a request is worth more than any score total
+    weight = scores + n
+    result = milp(-weight, constraints=LinearConstraint(A, -np.inf, upper),
+                  integrality=np.ones(n), bounds=Bounds(0, 1))
+    chosen = result.x > 0.5
+    return int(chosen.sum()), scores[chosen].sum()
+
+
+def test_without_limits_every_request_gets_its_best_quote():
+    candidates = random_candidates(np.random.default_rng(0), 50, 5, 10)
+    chosen = assign_quotes(candidates)
+    expected = candidates.loc[candidates.groupby("client_request_id")["final_score"].idxmax()]
+    assert chosen["id"].tolist() == expected["id"].tolist()
+
+
+def test_ties_go_to_the_first_candidate():
+    candidates = pd.DataFrame({"client_request_id": [1, 1, 1], "supplier_id": [7, 8, 9],
+                               "final_score": [0.5, 0.9, 0.9]})
+    assert assign_quotes(candidates).index.tolist() == [1]
+    assert assign_quotes(candidates, capacity={7: 1, 8: 1, 9: 1}).index.tolist() == [1]
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_capacity_matches_the_milp_optimum(seed):
+    rng = np.random.default_rng(seed)
+    candidates = random_candidates(rng, 60, 4, 12)
+    limit = 3
+    chosen = assign_quotes(candidates, capacity=dict.fromkeys(range(12), limit))
+
+    assert chosen["client_request_id"].is_unique
+    assert chosen["supplier_id"].value_counts().max() <= limit
+    served, score = milp_optimum(candidates, limit)
+    assert len(chosen) == served
+    assert chosen["final_score"].sum() == pytest.approx(score)
+
+
+def test_suppliers_missing_from_capacity_are_unlimited():
+    candidates = pd.DataFrame({"client_request_id": [1, 1, 2, 2, 3, 3],
+                               "supplier_id": [7, 8, 7, 8, 7, 8],
+                               "final_score": [0.9, 0.1, 0.9, 0.1, 0.9, 0.1]})
+    chosen = assign_quotes(candidates, capacity={7: 1})
+    assert sorted(chosen["supplier_id"]) == [7, 8, 8]
+
+
+def test_full_suppliers_leave_requests_unserved():
+    candidates = pd.DataFrame({"client_request_id": [1, 2, 3], "supplier_id": [7, 7, 7],
+                               "final_score": [0.3, 0.9, 0.5]})
+    chosen = assign_quotes(candidates, capacity={7: 2})
+    assert sorted(chosen["client_request_id"]) == [2, 3]
+
+
+def test_max_share_is_taken_of_the_total_requests():
+    limit = supplier_limits(pd.Index([7, 8]), max_share=0.1, n_requests=40)
+    assert limit.tolist() == [4, 4]
+
+    # 10 requests with a candidate out of 40: 10% of all requests is 4 per supplier
+    candidates = pd.DataFrame({"client_request_id": np.arange(10), "supplier_id": 7, "final_score": 1.0})
+    assert len(assign_quotes(candidates, max_share=0.1)) == 1
+    assert len(assign_quotes(candidates, max_share=0.1, total_requests=40)) == 4
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+import numpy as np
+
+from utils.scoring_service import MicroBatcher
+
+
+def batcher(max_batch_size=4, max_wait_ms=5.0):
+    calls = []
+
+    def predict(X):
+        calls.append(len(X))
+        return X[:, 0] * 2
+
+    return MicroBatcher(predict, max_batch_size, max_wait_ms), calls
+
+
+def test_lone_request_waits_at_most_max_wait():
+    micro, calls = batcher(max_wait_ms=5.0)
+
+    async def score():
+        started = time.perf_counter()
+        probs = await micro.submit(np.array([[1.0]]))
+        return probs, time.perf_counter() - started
+
+    probs, elapsed = asyncio.run(score())
+    assert probs.tolist() == [2.0]
+    assert calls == [1]
+    assert 0.004 <= elapsed < 0.05
+
+
+def test_concurrent_requests_share_a_batch_and_full_batches_do_not_wait():
+    micro, calls = batcher(max_batch_size=4, max_wait_ms=200.0)
+
+    async def score():
+        started = time.perf_counter()
+        results = await asyncio.gather(*(micro.submit(np.array([[float(i)]])) for i in range(6)))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(score())
+    assert [r.tolist() for r in results[:4]] == [[0.0], [2.0], [4.0], [6.0]]
+    # The first four fill a batch and are scored at once; the other two wait for the timer
+    assert calls == [4, 2]
+    assert [r.tolist() for r in results[4:]] == [[8.0], [10.0]]
+    assert 0.2 <= elapsed < 1.0
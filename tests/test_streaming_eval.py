@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from sklearn.metrics import confusion_matrix, roc_auc_score
+from sqlalchemy import text
+
+import utils.db
+import utils.streaming_eval as streaming_eval
+from utils.streaming_eval import EvalAccumulator
+
+
+@pytest.fixture
+def scores():
+    rng = np.random.default_rng(1)
+    labels = rng.integers(0, 2, 5_000)
+    probs = np.clip(0.3 * labels + rng.random(5_000) * 0.7, 0, 1)
+    return probs, labels
+
+
+def test_merged_chunks_equal_one_pass(scores):
+    probs, labels = scores
+    whole = EvalAccumulator(thresholds=(0.3, 0.5)).update(probs, labels)
+    merged = EvalAccumulator(thresholds=(0.3, 0.5))
+    for part in np.array_split(np.arange(len(probs)), 7):
+        merged.merge(EvalAccumulator(thresholds=(0.3, 0.5)).update(probs[part], labels[part]))
+
+    np.testing.assert_array_equal(merged.hist, whole.hist)
+    np.testing.assert_array_equal(merged.confusion, whole.confusion)
+    np.testing.assert_allclose(merged.prob_sum, whole.prob_sum)
+    assert merged.auc() == whole.auc()
+
+
+def test_metrics_match_sklearn(scores):
+    probs, labels = scores
+    acc = EvalAccumulator().update(probs, labels)
+    np.testing.assert_array_equal(acc.confusion_matrix(0.5), confusion_matrix(labels, probs > 0.5))
+    # Exact up to ties within a bin
+    assert acc.auc() == pytest.approx(roc_auc_score(labels, probs), abs=1e-3)
+
+
+def test_unlabeled_rows_only_feed_the_unlabeled_histogram():
+    acc = EvalAccumulator().update([0.2, 0.8, 0.9], [np.nan, 1, np.nan])
+    assert acc.n_labeled == 1
+    assert acc.unlabeled.sum() == 2
+    assert acc.confusion_matrix().tolist() == [[0, 0], [0, 1]]
+
+
+def test_merge_rejects_different_thresholds():
+    with pytest.raises(ValueError):
+        EvalAccumulator(thresholds=(0.5,)).merge(EvalAccumulator(thresholds=(0.4,)))
+
+
+class RecordingPool:
+    """In-process stand-in for ProcessPoolExecutor that records its size."""
+    sizes = []
+
+    def __init__(self, max_workers, mp_context=None):
+        self.sizes.append(max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
+
+
+def test_pool_is_capped_at_the_number_of_chunks(db_engine, monkeypatch):
+    monkeypatch.setattr(utils.db, "engine", db_engine)
+    monkeypatch.setattr(streaming_eval, "ProcessPoolExecutor", RecordingPool)
+    RecordingPool.sizes = []
+    with db_engine.begin() as conn:
+        for i in range(1, 7):
+            conn.execute(text("INSERT INTO quote_scores (id, won) VALUES (:i, :p)"), {"i": i, "p": i / 10})
+            conn.execute(text("INSERT INTO real_quotation_data (quotation_response_id, won) VALUES (:i, :w)"),
+                         {"i": i, "w": i % 2})
+
+    # One chunk: evaluated in process, no pool
+    single = streaming_eval.evaluate_scored_quotes(workers=4, chunk_size=10)
+    assert RecordingPool.sizes == []
+    # Three chunks of two ids: three workers, not four
+    split = streaming_eval.evaluate_scored_quotes(workers=4, chunk_size=2)
+    assert RecordingPool.sizes == [3]
+
+    assert single.n_labeled == split.n_labeled == 6
+    np.testing.assert_array_equal(single.confusion, split.confusion)